@@ -30,12 +30,15 @@
 
 from . import bltest
 from . import commands
+from . import imagepack
+from . import mcuboot
 from . import memoryrange
 from . import peripherals
 from . import properties
+from . import sdp
 from . import status
 from . import model
 from . import target
 
-__all__ = ["bltest", "commands", "memoryrange", "peripherals", "properties", "status", "model", "target"]
+__all__ = ["bltest", "commands", "imagepack", "mcuboot", "memoryrange", "peripherals", "properties", "sdp", "status", "model", "target"]
 
@@ -33,8 +33,13 @@ import os
 import copy
 import json
 import time
+import collections
+from . import commands
+from . import mcuboot
 from . import peripherals
 from . import peripheralspeed
+from . import properties
+from . import sdp
 import subprocess
 sys.path.append(os.path.abspath(".."))
 from utils import filetools
@@ -50,6 +55,84 @@ kCmdResponse_Value = "value"
 kBlhostError_NoOutput = -3
 kBlhostError_ReturnedError = -4
 
+# blhost commands that BootloaderDevice runs over its own UART connection instead of the tool.
+kNativeUartCommandDict = {
+    'flash-erase-all'          : commands.kCommandTag_FlashEraseAll,
+    'flash-erase-region'       : commands.kCommandTag_FlashEraseRegion,
+    'read-memory'              : commands.kCommandTag_ReadMemory,
+    'write-memory'             : commands.kCommandTag_WriteMemory,
+    'fill-memory'              : commands.kCommandTag_FillMemory,
+    'get-property'             : commands.kCommandTag_GetProperty,
+    'receive-sb-file'          : commands.kCommandTag_ReceiveSBFile,
+    'execute'                  : commands.kCommandTag_Execute,
+    'call'                     : commands.kCommandTag_Call,
+    'reset'                    : commands.kCommandTag_Reset,
+    'set-property'             : commands.kCommandTag_SetProperty,
+    'flash-erase-all-unsecure' : commands.kCommandTag_FlashEraseAllUnsecure,
+    'flash-read-once'          : commands.kCommandTag_FlashReadOnce,
+    'configure-memory'         : commands.kCommandTag_ConfigureMemory,
+    'reliable-update'          : commands.kCommandTag_ReliableUpdate,
+    'load-image'               : None,
+}
+
+# Commands whose time is dominated by moving fileLength bytes over the link, so they can calibrate it.
+kLinkCalibrationCommandList = ['read-memory', 'write-memory', 'load-image', 'write-file', 'dcd-write']
+
+## @brief Transfers shorter than this are mostly command latency and do not calibrate the link.
+kLinkCalibrationMinBytes = 4096
+## @brief Share of the nominal line rate assumed until the link is calibrated.
+kUncalibratedLinkEfficiency = 0.25
+## @brief Deadlines allow this many times the expected transfer time.
+kTransferTimeoutFactor = 2
+## @brief Fixed part of every deadline, also the timeout of commands without a data phase.
+kCommandTimeoutInSeconds = 5
+## @brief Assumed flash programming rate, 10ms per KB page.
+kFlashProgramBytesPerSecond = 100 * 1024
+## @brief Assumed erase time of one flash sector.
+kFlashSectorEraseSeconds = 0.1
+## @brief Time allowed for whatever the commands in an SB file do.
+kSbFileProcessSeconds = 100
+
+# Measured link throughput in bytes per second, keyed by the '-p' or '-u' argument (port and speed).
+# Bootloader objects are recreated on every connect, the measurement outlives them.
+_linkThroughputDict = {}
+
+##
+# @brief Measured throughput of a link, None if no transfer calibrated it yet.
+def getLinkThroughput(linkKey):
+    return _linkThroughputDict.get(linkKey)
+
+##
+# @brief Record a transfer of length bytes in seconds, averaged with earlier ones.
+def updateLinkThroughput(linkKey, length, seconds):
+    bytesPerSecond = length / max(seconds, 0.001)
+    if linkKey in _linkThroughputDict:
+        bytesPerSecond = (bytesPerSecond + _linkThroughputDict[linkKey]) / 2
+    _linkThroughputDict[linkKey] = bytesPerSecond
+
+def clearLinkThroughput():
+    _linkThroughputDict.clear()
+
+## @brief Progress of a data phase is reported at most this often, except when it completes.
+kProgressIntervalInSeconds = 0.1
+## @brief A progress estimated from the link throughput stops short of this share until the tool exits.
+kEstimatedProgressLimit = 0.99
+
+##
+# @brief Progress of the data phase of a command, passed to Bootloader.progressCallback.
+#
+# bytesPerSecond and secondsLeft are None until some data has moved. isEstimated is set when the
+# tool reports nothing while it runs and bytesDone is extrapolated from the link throughput.
+CommandProgress = collections.namedtuple('CommandProgress', ['command', 'bytesDone', 'bytesTotal',
+                                                             'bytesPerSecond', 'secondsLeft', 'isEstimated'])
+
+# fill-memory pattern unit to the multiplier that repeats it over a word.
+kFillMemoryUnitDict = {
+    'byte'  : 0x01010101,
+    'short' : 0x00010001,
+    'word'  : 0x00000001,
+}
+
 ##
 # @brief Factory for creating a bootloader object.
 #
@@ -58,11 +141,12 @@ kBlhostError_ReturnedError = -4
 # @param peripheral
 # @param port
 # @param loadTarget
-def createBootloader(target, vectorsDir, peripheral, speed=None, port=None, vid=None, pid=None, usePing=True):
+# @param useNativeUart Talk to a UART bootloader or ROM directly instead of through blhost/sdphost.
+def createBootloader(target, vectorsDir, peripheral, speed=None, port=None, vid=None, pid=None, usePing=True, useNativeUart=True):
     if peripheral.split(',')[0] in peripherals.Peripherals:
-        return BootloaderDevice(target, vectorsDir, peripheral, speed, port, vid, pid, usePing)
+        return BootloaderDevice(target, vectorsDir, peripheral, speed, port, vid, pid, usePing, useNativeUart)
     elif peripheral.split(',')[0] in peripherals.PeripheralsSDP:
-        return BootloaderDeviceSDP(target, vectorsDir, peripheral, speed, port, vid, pid)
+        return BootloaderDeviceSDP(target, vectorsDir, peripheral, speed, port, vid, pid, useNativeUart)
     else:
         raise ValueError("Unrecognized peripheral '{}'".format(peripheral.split(',')[0]))
 
@@ -116,6 +200,18 @@ class Bootloader(object):
         ## The eraseLength will use to calculate timeout of waiting response of blhost for executing flash-erase-all/region, etc
         self.eraseLength = 0
 
+        ## Length of the transfer in flight if it calibrates the link throughput, otherwise 0
+        self._calibrationLength = 0
+
+        ## Called with a CommandProgress during the data phase of a command, from the thread running it.
+        self.progressCallback = None
+
+        self._progressCommand = None
+        self._progressLength = 0
+        self._progressStartTime = 0
+        self._progressReportTime = 0
+        self._progressThroughput = None
+
     def __enter__(self):
         return self
 
@@ -140,14 +236,26 @@ class Bootloader(object):
             if range.start <= start < range.start + range.length:
                 return range
 
+    ##
+    # @brief The first complete JSON object in the output of the tool, None if there is none.
+    #
+    # The tool may print other text around it, braces included.
+    def _findJsonResults(self, output):
+        decoder = json.JSONDecoder()
+        start = output.find('{')
+        while start >= 0:
+            try:
+                return decoder.raw_decode(output, start)[0]
+            except ValueError:
+                start = output.find('{', start + 1)
+        return None
+
     ##
     # @brief Utility function to return the JSON formatted results.
     def _parseResults(self, output):
         if self.toolStatus == 0:
-            jsonResults = output[output.find('{'):output.rfind('}')+1]
-
-            if len(jsonResults):
-                actualResults = json.loads(jsonResults)
+            actualResults = self._findJsonResults(output)
+            if actualResults != None:
                 return actualResults
 
             # No json was found, create artificial results.
@@ -209,49 +317,107 @@ class Bootloader(object):
             pass
         return peripheral, peripheralSpeed
 
+    ##
+    # @brief Key of the link the commands go over, the '-p' or '-u' argument of the tool.
+    def _getLinkKey(self):
+        for option in ['-p', '-u']:
+            if option in self._commandArgs:
+                return self._commandArgs[self._commandArgs.index(option) + 1]
+        return None
+
+    ##
+    # @brief Throughput the link is expected to reach in bytes per second.
+    def _getExpectedThroughput(self, args):
+        linkThroughput = getLinkThroughput(self._getLinkKey())
+        if linkThroughput == None:
+            peripheral, peripheralSpeed = self._getPeripheralAndSpeed(args)
+            if peripheral == peripherals.kPeripheral_USB:
+                linkThroughput = peripheralSpeed / 8.0 * kUncalibratedLinkEfficiency
+            else:
+                linkThroughput = max(peripheralSpeed, 9600) / 10.0 * kUncalibratedLinkEfficiency
+        return linkThroughput
+
     ##
     # @brief set timeout for waiting results from blhost
     #
+    # Transfers get a deadline from their length and the link throughput measured on earlier
+    # transfers, or a fraction of the nominal line rate before the first one.
+    #
     # @param args    command argument list
     def _setTimeoutAutomatically(self, args):
-        peripheral, peripheralSpeed = self._getPeripheralAndSpeed(args)
         fileLength = self.fileLength
-        # The max file length should be less than max length of all actual memory
-        maxLength = self.target.memoryRange['ocram'].length;
-        if self.target.memoryRange.has_key('flash'):
-            maxLength = max(maxLength, self.target.memoryRange['flash'].length)
-        if self.target.memoryRange.has_key('spiFlash'):
-            maxLength = max(maxLength, self.target.memoryRange['spiFlash'].length)
-        fileLength = min(fileLength, maxLength)
-
-        timeout = 10
-        compensateSeconds = 20   # this value is used for compensating deviation
+        linkThroughput = self._getExpectedThroughput(args)
+
+        self._calibrationLength = 0
         if 'receive-sb-file' in args:
-            timeout = 100 # don't know what is in SB file, so give it a long time
+            timeout = fileLength / linkThroughput * kTransferTimeoutFactor + kSbFileProcessSeconds # don't know what is in SB file
         elif fileLength > 0:
-            actualLength  = int(fileLength) * 1.25 #actual length includes file length and other overhead such as framing header
-            baseFileLength = 40960
-            multiplicationFactors = actualLength / baseFileLength
-            if peripheral == peripherals.kPeripheral_UART:
-                fixedProcessSeconds = 7
-                basePeripheralSpeed = 115200
-                if peripheralSpeed != 9600:# this is an exception
-                    timeout = (fixedProcessSeconds + 3.5 * basePeripheralSpeed / peripheralSpeed) * multiplicationFactors + compensateSeconds
-                else: # below is a workaround
-                    timeout = (fixedProcessSeconds + 3.5 * basePeripheralSpeed / peripheralSpeed) * 1.5 * multiplicationFactors + compensateSeconds
-            elif peripheral == peripherals.kPeripheral_USB:
-                fixedProcessSeconds = 9
-                timeout = fixedProcessSeconds *  multiplicationFactors + compensateSeconds
+            timeout = fileLength / linkThroughput * kTransferTimeoutFactor + kCommandTimeoutInSeconds
+            region = None
+            if args[0] == 'write-memory':
+                region = self._getRegion(int(str(args[1]), 0))
+            if region != None and region.isFlash:
+                # Programming time is not part of the link throughput
+                timeout += fileLength / kFlashProgramBytesPerSecond * kTransferTimeoutFactor
+            elif args[0] in kLinkCalibrationCommandList and fileLength >= kLinkCalibrationMinBytes:
+                self._calibrationLength = fileLength
         elif self.eraseLength > 0:
-            # assume target takes 20ms to erase one block, typical time is less than this value, according to RM, this value is 14ms
-            timeout = 0.1 * self.eraseLength / self.target.memoryRange["flash"].flashSectorSize + compensateSeconds
-        else:  # for other commands, 10 seconds timeout is enough
-            timeout = 10 # default timeout value : 10 seconds
+            sectorSize = 0
+            if 'flash' in self.target.memoryRange:
+                sectorSize = self.target.memoryRange['flash'].flashSectorSize
+            timeout = kFlashSectorEraseSeconds * self.eraseLength / max(sectorSize, 4096) + kCommandTimeoutInSeconds
+        else:
+            timeout = kCommandTimeoutInSeconds
 
         self.fileLength = 0
         self.eraseLength = 0
 
-        self.timeout = int(timeout)
+        self.timeout = timeout
+
+    ##
+    # @brief Feed the time of the last command to the link throughput if it was a calibrating transfer.
+    def _calibrateLink(self, seconds):
+        if self._calibrationLength > 0 and self.commandStatus == 0:
+            updateLinkThroughput(self._getLinkKey(), self._calibrationLength, seconds)
+        self._calibrationLength = 0
+
+    ##
+    # @brief Start the progress of a command, before _setTimeoutAutomatically() consumes fileLength.
+    def _startProgress(self, args):
+        self._progressCommand = args[0]
+        self._progressLength = self.fileLength
+        self._progressStartTime = time.time()
+        self._progressReportTime = 0
+        self._progressThroughput = self._getExpectedThroughput(args)
+
+    ##
+    # @brief Report bytesDone of the data phase in flight to progressCallback.
+    #
+    # Commands without a data phase report nothing.
+    def _reportProgress(self, bytesDone, isEstimated=False):
+        if self.progressCallback == None or self._progressLength <= 0:
+            return
+        now = time.time()
+        bytesDone = min(bytesDone, self._progressLength)
+        if bytesDone < self._progressLength and now - self._progressReportTime < kProgressIntervalInSeconds:
+            return
+        self._progressReportTime = now
+        bytesPerSecond = None
+        secondsLeft = None
+        if isEstimated:
+            bytesPerSecond = self._progressThroughput
+        elif bytesDone > 0:
+            bytesPerSecond = bytesDone / max(now - self._progressStartTime, 0.001)
+        if bytesPerSecond != None:
+            secondsLeft = (self._progressLength - bytesDone) / bytesPerSecond
+        self.progressCallback(CommandProgress(self._progressCommand, bytesDone, self._progressLength,
+                                              bytesPerSecond, secondsLeft, isEstimated))
+
+    ##
+    # @brief Report the progress of a tool that prints nothing until it exits.
+    def _reportEstimatedProgress(self):
+        bytesDone = (time.time() - self._progressStartTime) * self._progressThroughput
+        self._reportProgress(int(min(bytesDone, self._progressLength * kEstimatedProgressLimit)), True)
 
     ##
     # @brief set max timeout for waiting results from blhost
@@ -280,7 +446,7 @@ class Bootloader(object):
     # @param args List of bootloader command arguments.
     # @return List of arguments to set the timeout appropriate for the bootloader command.
     def _getTimeoutArgument(self, args):
-        self._setMaxTimeout(args)
+        self._setTimeoutAutomatically(args)
         argsList = ['-t', str(int(self.timeout * 1000))]
         return argsList
 
@@ -291,6 +457,7 @@ class Bootloader(object):
     def _executeCommand(self, *args):
         # Make a copy of the base args so we don't mess up the original.
         theArgs = copy.copy(self._commandArgs)
+        self._startProgress(args)
 
         # Modify args with command-specific timeout, and append the command params.
         for i, a in enumerate(self._getTimeoutArgument(args)):
@@ -302,10 +469,25 @@ class Bootloader(object):
         print ("Executing:", " ".join(theArgs))
         commandString = str("Executing " + " ".join(theArgs))
 
-        # Execute the command.
+        # Execute the command, the output is collected while the progress is estimated.
+        startTime = time.time()
         process = subprocess.Popen(theArgs, stdout=subprocess.PIPE, stderr=subprocess.STDOUT)
-        self.commandOutput = process.communicate()[0].decode()
+        try:
+            while True:
+                try:
+                    output = process.communicate(timeout=kProgressIntervalInSeconds)[0]
+                    break
+                except subprocess.TimeoutExpired:
+                    self._reportEstimatedProgress()
+        except BaseException:
+            # progressCallback gave up on the command, do not leave the tool behind
+            process.kill()
+            process.communicate()
+            raise
+        self.commandOutput = output.decode()
         self.toolStatus = process.returncode
+        if self.toolStatus == 0:
+            self._reportProgress(self._progressLength)
 
         print ('toolStatus:', self.toolStatus)
         print ('commandOutput:', self.commandOutput)
@@ -316,6 +498,47 @@ class Bootloader(object):
         # Set some attributes based on results dict.
         self.commandStatus = self.commandResults[kCmdResponse_Status][kCmdResponse_Value]
         self.commandStatusDescription = self.commandResults[kCmdResponse_Status][kCmdResponse_Description]
+        self._calibrateLink(time.time() - startTime)
+
+        return self.commandStatus, self.commandResults[kCmdResponse_Response], commandString
+
+    ##
+    # @brief Run a command through the _executeNativeCommand() of the subclass instead of the tool.
+    #
+    # The results are shaped like the JSON output of the tool.
+    def _executeInProcess(self, *args):
+        self._startProgress(args)
+        self._setTimeoutAutomatically(args)
+        commandString = str("Executing " + " ".join([str(x) for x in args]))
+        print ("Executing:", " ".join([str(x) for x in args]))
+        startTime = time.time()
+
+        try:
+            commandStatus, response = self._executeNativeCommand(args[0], args[1:])
+            self.commandResults = {
+                    kCmdResponse_Command : args[0],
+                    kCmdResponse_Status : {
+                                kCmdResponse_Value : commandStatus,
+                                kCmdResponse_Description : '%d (0x%x)' % (commandStatus, commandStatus)
+                            },
+                    kCmdResponse_Response : response
+                }
+        except (mcuboot.McuBootError, sdp.SdpError) as e:
+            self.commandResults = {
+                    kCmdResponse_Command : args[0],
+                    kCmdResponse_Status : {
+                                kCmdResponse_Value : kBlhostError_NoOutput,
+                                kCmdResponse_Description : str(e)
+                            },
+                    kCmdResponse_Response : None
+                }
+        self.toolStatus = 0
+        self.commandOutput = json.dumps(self.commandResults)
+        print ('commandOutput:', self.commandOutput)
+
+        self.commandStatus = self.commandResults[kCmdResponse_Status][kCmdResponse_Value]
+        self.commandStatusDescription = self.commandResults[kCmdResponse_Status][kCmdResponse_Description]
+        self._calibrateLink(time.time() - startTime)
 
         return self.commandStatus, self.commandResults[kCmdResponse_Response], commandString
 
@@ -391,7 +614,8 @@ class Bootloader(object):
     # response = [ bytes-read ]
     #
     def fillMemory(self, address, length, pattern, unit='word'):
-        self.fileLength = length
+        # The target fills the memory itself, no data goes over the link, so the fixed command timeout applies
+        self.fileLength = 0
         self.eraseLength = 0
         return self._executeCommand('fill-memory', address, length, pattern, unit)
 
@@ -514,13 +738,16 @@ class Bootloader(object):
 # @brief The bootloader running on a real device.
 class BootloaderDevice(Bootloader):
 
-    def __init__(self, target, vectorsDir, peripheral, speed, port, vid, pid, usePing):
+    def __init__(self, target, vectorsDir, peripheral, speed, port, vid, pid, usePing, useNativeUart=True):
         super(BootloaderDevice, self).__init__(target, vectorsDir)
         self._speed = speed
         self._port = port
         self._vid = vid
         self._pid = pid
         self._usePing = usePing
+        self._useNativeUart = useNativeUart
+        ## In-process protocol client, kept open across commands. None if blhost is used.
+        self._nativeUart = None
         self._toolName = os.path.abspath(os.path.join(vectorsDir, '..', 'blhost'))
         self._commandArgs.append(self._toolName)
 
@@ -541,10 +768,12 @@ class BootloaderDevice(Bootloader):
             filetools.makeExecutable(self._toolName)
 
         self._commandArgs.extend(['-j', '--'])
+        self._updateNativeUart()
 
 
     def close(self):
-        self.target.close()
+        if self._nativeUart != None:
+            self._nativeUart.close()
 
     def __exit__(self, type, value, traceback):
         self.close()
@@ -579,7 +808,49 @@ class BootloaderDevice(Bootloader):
             self._commandArgs.extend(['-p', self._port])
 
         self._commandArgs.extend(['-j', '--'])
+        self._updateNativeUart()
 
+    def _updateNativeUart(self):
+        if self._nativeUart != None:
+            self._nativeUart.close()
+            self._nativeUart = None
+        if self._useNativeUart and self.peripheral.split(',')[0] == peripherals.kPeripheral_UART:
+            self._nativeUart = mcuboot.McuBootUart(self._port, self._speed)
+            self._nativeUart.progressFunc = self._reportProgress
+
+    def _executeCommand(self, *args):
+        if self._nativeUart == None or args[0] not in kNativeUartCommandDict:
+            return super(BootloaderDevice, self)._executeCommand(*args)
+        return self._executeInProcess(*args)
+
+    def _executeNativeCommand(self, command, args):
+        tag = kNativeUartCommandDict[command]
+        if command == 'load-image':
+            with open(args[0], 'rb') as fileObj:
+                return self._nativeUart.loadImage(fileObj.read()), []
+        elif command == 'write-memory':
+            with open(args[1], 'rb') as fileObj:
+                data = fileObj.read()
+            params = [int(str(args[0]), 0), len(data), int(str(args[2]), 0)]
+            commandStatus, response, inData = self._nativeUart.command(tag, params, data, self.timeout)
+        elif command == 'receive-sb-file':
+            with open(args[0], 'rb') as fileObj:
+                data = fileObj.read()
+            commandStatus, response, inData = self._nativeUart.command(tag, [len(data)], data, self.timeout)
+        elif command == 'read-memory':
+            params = [int(str(args[0]), 0), int(str(args[1]), 0), int(str(args[3]), 0)]
+            commandStatus, response, inData = self._nativeUart.command(tag, params, None, self.timeout)
+            if inData != None:
+                with open(args[2], 'wb') as fileObj:
+                    fileObj.write(inData)
+        elif command == 'fill-memory':
+            pattern = int(str(args[2]), 0) * kFillMemoryUnitDict[str(args[3])] & 0xffffffff
+            params = [int(str(args[0]), 0), int(str(args[1]), 0), pattern]
+            commandStatus, response, inData = self._nativeUart.command(tag, params, None, self.timeout)
+        else:
+            params = [int(str(x), 0) for x in args]
+            commandStatus, response, inData = self._nativeUart.command(tag, params, None, self.timeout)
+        return commandStatus, response
 
     ##
     # @ brief change peripheral
@@ -625,6 +896,8 @@ class BootloaderDevice(Bootloader):
             else:
                 portArgs.append(str(baudrate))
             self._commandArgs[portArgIndex] = ','.join(portArgs)
+            if self._nativeUart != None:
+                self._nativeUart.setPort(self._port, baudrate)
         else:
             raise ValueError('Requires a UART peripheral.')
 
@@ -634,6 +907,14 @@ class BootloaderDevice(Bootloader):
     def setTimeoutValue(self, timeoutSeconds):
         self.timeout = timeoutSeconds
 
+    ##
+    # @brief Set how long the native UART client waits for a ping response.
+    #
+    # Has no effect when blhost is used.
+    def setPingTimeout(self, timeoutSeconds):
+        if self._nativeUart != None:
+            self._nativeUart.pingTimeout = timeoutSeconds
+
     ##
     # @brief Read memory from device using a read-memory command.
     #
@@ -661,12 +942,14 @@ class BootloaderDevice(Bootloader):
 # @brief The bootloader running on a real device, SDP mode.
 class BootloaderDeviceSDP(Bootloader):
 
-    def __init__(self, target, vectorsDir, peripheral, speed, port, vid, pid):
+    def __init__(self, target, vectorsDir, peripheral, speed, port, vid, pid, useNativeUart=True):
         super(BootloaderDeviceSDP, self).__init__(target, vectorsDir)
         self._speed = speed
         self._port = port
         self._vid = vid
         self._pid = pid
+        ## In-process protocol client, kept open across commands. None if sdphost is used.
+        self._nativeUart = None
         self._toolName = os.path.abspath(os.path.join(vectorsDir, '..', 'sdphost'))
         self._commandArgs.append(self._toolName)
         self.peripheral = peripheral
@@ -685,10 +968,53 @@ class BootloaderDeviceSDP(Bootloader):
 
         self._commandArgs.extend(['-j', '--'])
 
+        if useNativeUart and peripheralDevice == peripherals.kPeripheral_SDP_UART:
+            self._nativeUart = sdp.SdpUart(self._port, self._speed)
+            self._nativeUart.progressFunc = self._reportProgress
+
+    def close(self):
+        if self._nativeUart != None:
+            self._nativeUart.close()
+
     def __exit__(self, type, value, traceback):
         self.close()
         return False # Don't suppress exceptions
 
+    ##
+    # @brief Set how long the native UART client waits for an error-status response.
+    #
+    # Has no effect when sdphost is used.
+    def setPingTimeout(self, timeoutSeconds):
+        if self._nativeUart != None:
+            self._nativeUart.pingTimeout = timeoutSeconds
+
+    def _executeCommand(self, *args):
+        if self._nativeUart == None:
+            return super(BootloaderDeviceSDP, self)._executeCommand(*args)
+        return self._executeInProcess(*args)
+
+    def _executeNativeCommand(self, command, args):
+        if command == 'error-status':
+            return self._nativeUart.errorStatus()
+        elif command == 'write-file' or command == 'dcd-write':
+            with open(args[1], 'rb') as fileObj:
+                data = fileObj.read()
+            if command == 'write-file':
+                return self._nativeUart.writeFile(int(str(args[0]), 0), data)
+            return self._nativeUart.dcdWrite(int(str(args[0]), 0), data)
+        elif command == 'read-register':
+            habMode, response, data = self._nativeUart.readRegister(int(str(args[0]), 0), int(str(args[1]), 0), int(str(args[2]), 0))
+            with open(args[3], 'wb') as fileObj:
+                fileObj.write(data)
+            return habMode, response
+        elif command == 'write-register':
+            return self._nativeUart.writeRegister(int(str(args[0]), 0), int(str(args[1]), 0), int(str(args[2]), 0))
+        elif command == 'skip-dcd-header':
+            return self._nativeUart.skipDcdHeader()
+        elif command == 'jump-address':
+            return self._nativeUart.jumpAddress(int(str(args[0]), 0))
+        raise ValueError("Unrecognized SDP command '{}'".format(command))
+
     def _updatePeripheralSpeed(self):
         peripheral = self.peripheral.split(',')[0]
         if type(self._speed) == type(''):
@@ -736,6 +1062,7 @@ class BootloaderDeviceSDP(Bootloader):
     ##
     # @brief SDP write-file command
     def writeFile(self, address, filePath):
+        self.fileLength = os.path.getsize(filePath)
         return self._executeCommand('write-file', address, filePath)
 
     ##
@@ -746,6 +1073,7 @@ class BootloaderDeviceSDP(Bootloader):
     ##
     # @brief SDP dcd-write command
     def dcdWrite(self, address, filePath):
+        self.fileLength = os.path.getsize(filePath)
         return self._executeCommand('dcd-write', address, filePath)
 
     ##
@@ -44,13 +44,13 @@ kCommandTag_Call                  = 0x0a
 kCommandTag_Reset                 = 0x0b
 kCommandTag_SetProperty           = 0x0c
 kCommandTag_FlashEraseAllUnsecure = 0x0d
-kCommandTag_FlashProgramOnce      = 0x0e,
-kCommandTag_FlashReadOnce         = 0x0f,
-kCommandTag_FlashReadResource     = 0x10,
-kCommandTag_ConfigureMemory       = 0x11,
-kCommandTag_ReliableUpdate        = 0x12,
-kCommandTag_GenerateKeyBlob       = 0x13,
-kCommandTag_KeyProvisoning        = 0x15,
+kCommandTag_FlashProgramOnce      = 0x0e
+kCommandTag_FlashReadOnce         = 0x0f
+kCommandTag_FlashReadResource     = 0x10
+kCommandTag_ConfigureMemory       = 0x11
+kCommandTag_ReliableUpdate        = 0x12
+kCommandTag_GenerateKeyBlob       = 0x13
+kCommandTag_KeyProvisoning        = 0x15
 
 Command = namedtuple('Command', 'tag, propertyMask, name')
 
@@ -0,0 +1,171 @@
+#! /usr/bin/env python
+
+# Copyright 2022 NXP
+# All rights reserved.
+#
+# SPDX-License-Identifier: BSD-3-Clause
+
+import struct
+import zlib
+import hashlib
+
+##
+# @brief Packed image container, expanded into place on target by the decompressor stub.
+#
+# The header holds the magic, flags, destination and jump address, size and crc32 of the image,
+# size and crc32 of the base image a delta applies to, and the number of records. Each record
+# is the offset and size of a run of the image and the size of its raw deflate stream, followed
+# by the stream. Streams may refer back up to 32KB before their run, to memory the stub has
+# already written (or left untouched in a delta).
+kPackedImageMagic = b'MTPK'
+kPackedImageFlag_Delta = 0x01
+kPackedImageHeaderStruct = struct.Struct('<4sIIIIIIII')
+kPackedImageRecordStruct = struct.Struct('<III')
+
+## @brief Deflate window, also how far back a record may look into memory.
+kDeflateWindowSize = 32 * 1024
+kDeflateLevel = 9
+
+## @brief Granularity of the delta, only runs of blocks that differ from the base are sent.
+kDeltaBlockSize = 256
+## @brief Unchanged gaps shorter than this are sent anyway, a new record costs more than they do.
+kDeltaMinGapBlocks = 2
+
+## @brief Packed images kept by getPackedImage(), oldest dropped first.
+kPackedImageCacheEntries = 8
+
+## @brief Container is malformed or does not apply to the given base.
+class PackedImageError(Exception):
+    pass
+
+##
+# @brief Trailer at the end of boot_decompressor.bin, the magic and a word of kDecompressorFeature_* flags.
+#
+# A stub without the trailer has none of the features.
+kDecompressorTrailerMagic = b'MTDC'
+kDecompressorTrailerStruct = struct.Struct('<4sI')
+
+## @brief The stub checks size and crc32 of the base in memory before applying a delta, and refuses it on a mismatch.
+kDecompressorFeature_VerifyBase = 0x01
+
+##
+# @brief kDecompressorFeature_* flags announced by the trailer of a decompressor stub image.
+def getDecompressorFeatures(stubData):
+    if len(stubData) < kDecompressorTrailerStruct.size:
+        return 0
+    magic, features = kDecompressorTrailerStruct.unpack_from(stubData, len(stubData) - kDecompressorTrailerStruct.size)
+    if magic != kDecompressorTrailerMagic:
+        return 0
+    return features
+
+def _deflate(data, zdict):
+    if zdict:
+        compressor = zlib.compressobj(kDeflateLevel, zlib.DEFLATED, -15, 9, zlib.Z_DEFAULT_STRATEGY, zdict)
+    else:
+        compressor = zlib.compressobj(kDeflateLevel, zlib.DEFLATED, -15, 9)
+    return compressor.compress(data) + compressor.flush()
+
+def _inflate(data, zdict):
+    if zdict:
+        decompressor = zlib.decompressobj(-15, zdict)
+    else:
+        decompressor = zlib.decompressobj(-15)
+    return decompressor.decompress(data) + decompressor.flush()
+
+##
+# @brief Runs of blocks where imageData differs from baseData, as [(offset, size)].
+def _getChangedRuns(imageData, baseData):
+    runs = []
+    for offset in range(0, len(imageData), kDeltaBlockSize):
+        if imageData[offset:offset + kDeltaBlockSize] == baseData[offset:offset + kDeltaBlockSize]:
+            continue
+        size = min(kDeltaBlockSize, len(imageData) - offset)
+        if runs and offset - (runs[-1][0] + runs[-1][1]) < kDeltaMinGapBlocks * kDeltaBlockSize:
+            runs[-1] = (runs[-1][0], offset + size - runs[-1][0])
+        else:
+            runs.append((offset, size))
+    return runs
+
+##
+# @brief Pack an image for the decompressor stub.
+#
+# @param baseData The image already at destAddr, only what differs from it is sent. None for a
+#                 full image.
+def packImage(imageData, destAddr, jumpAddr, baseData=None):
+    imageData = bytes(imageData)
+    flags = 0
+    baseSize = 0
+    baseCrc32 = 0
+    if baseData != None:
+        flags |= kPackedImageFlag_Delta
+        baseSize = len(baseData)
+        baseCrc32 = zlib.crc32(baseData) & 0xFFFFFFFF
+        runs = _getChangedRuns(imageData, bytes(baseData))
+    else:
+        runs = [(0, len(imageData))]
+    records = []
+    for offset, size in runs:
+        # Whatever is in memory before the run is the new image by the time the stub gets there
+        stream = _deflate(imageData[offset:offset + size], imageData[max(0, offset - kDeflateWindowSize):offset])
+        records.append(kPackedImageRecordStruct.pack(offset, size, len(stream)) + stream)
+    header = kPackedImageHeaderStruct.pack(kPackedImageMagic, flags, destAddr, jumpAddr, len(imageData),
+                                           zlib.crc32(imageData) & 0xFFFFFFFF, baseSize, baseCrc32, len(records))
+    return header + b''.join(records)
+
+##
+# @brief Expand a packed image the way the decompressor stub does.
+#
+# @return A tuple of (destAddr, jumpAddr, imageData).
+def unpackImage(packedData, baseData=None):
+    if len(packedData) < kPackedImageHeaderStruct.size:
+        raise PackedImageError('Truncated header.')
+    magic, flags, destAddr, jumpAddr, imageSize, imageCrc32, baseSize, baseCrc32, recordCount = \
+        kPackedImageHeaderStruct.unpack_from(packedData)
+    if magic != kPackedImageMagic:
+        raise PackedImageError('Bad magic.')
+    if flags & kPackedImageFlag_Delta:
+        if baseData == None or len(baseData) != baseSize or (zlib.crc32(baseData) & 0xFFFFFFFF) != baseCrc32:
+            raise PackedImageError('Delta does not apply to this base image.')
+        memory = bytearray(baseData[0:imageSize])
+        memory += bytes(imageSize - len(memory))
+    else:
+        memory = bytearray(imageSize)
+    position = kPackedImageHeaderStruct.size
+    for idx in range(recordCount):
+        if len(packedData) < position + kPackedImageRecordStruct.size:
+            raise PackedImageError('Truncated record.')
+        offset, size, streamSize = kPackedImageRecordStruct.unpack_from(packedData, position)
+        position += kPackedImageRecordStruct.size
+        if offset + size > imageSize:
+            raise PackedImageError('Record outside the image.')
+        try:
+            data = _inflate(packedData[position:position + streamSize], bytes(memory[max(0, offset - kDeflateWindowSize):offset]))
+        except zlib.error as e:
+            raise PackedImageError(str(e))
+        if len(data) != size:
+            raise PackedImageError('Record expands to %d bytes instead of %d.' % (len(data), size))
+        memory[offset:offset + size] = data
+        position += streamSize
+    if (zlib.crc32(memory) & 0xFFFFFFFF) != imageCrc32:
+        raise PackedImageError('Image crc mismatch.')
+    return destAddr, jumpAddr, bytes(memory)
+
+# (image digest, base digest, destAddr, jumpAddr) -> packed image, in insertion order
+_packedImageCache = {}
+
+##
+# @brief packImage() with the result cached by the hash of the image and base.
+#
+# Deflate at the best level takes a while on large images, a reconnect with the same file reuses it.
+def getPackedImage(imageData, destAddr, jumpAddr, baseData=None):
+    baseDigest = None
+    if baseData != None:
+        baseDigest = hashlib.sha1(baseData).digest()
+    key = (hashlib.sha1(imageData).digest(), baseDigest, destAddr, jumpAddr)
+    packedData = _packedImageCache.get(key)
+    if packedData == None:
+        packedData = packImage(imageData, destAddr, jumpAddr, baseData)
+        while len(_packedImageCache) >= kPackedImageCacheEntries:
+            del _packedImageCache[next(iter(_packedImageCache))]
+        _packedImageCache[key] = packedData
+    return packedData
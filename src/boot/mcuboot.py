@@ -0,0 +1,275 @@
+#! /usr/bin/env python
+
+# Copyright 2022 NXP
+# All rights reserved.
+#
+# SPDX-License-Identifier: BSD-3-Clause
+
+import struct
+import binascii
+import time
+import serial
+from . import commands
+from . import properties
+from . import status
+
+## @brief MCUboot serial framing constants.
+kFramingStartByte = 0x5a
+
+kFramingPacketType_Ack          = 0xa1
+kFramingPacketType_Nak          = 0xa2
+kFramingPacketType_AckAbort     = 0xa3
+kFramingPacketType_Command      = 0xa4
+kFramingPacketType_Data         = 0xa5
+kFramingPacketType_Ping         = 0xa6
+kFramingPacketType_PingResponse = 0xa7
+
+## @brief Start byte, packet type, protocol version bugfix/minor/major/name, options and crc16.
+kPingResponseStruct = struct.Struct('<BBBBBcHH')
+## @brief Command or response tag, flags, reserved and parameter count.
+kCommandHeaderStruct = struct.Struct('<BBBB')
+
+kCommandFlag_None         = 0x00
+kCommandFlag_HasDataPhase = 0x01
+
+## @brief Response tags sent by the bootloader.
+kResponseTag_Generic        = 0xa0
+kResponseTag_ReadMemory     = 0xa3
+kResponseTag_GetProperty    = 0xa7
+kResponseTag_FlashReadOnce  = 0xaf
+
+## @brief Packet size used for data phases until the bootloader reports its own.
+kMinPacketSize = 32
+
+kPingTimeoutInSeconds = 0.5
+kAckTimeoutInSeconds = 2
+kResponseTimeoutInSeconds = 10
+kMaxNakRetries = 3
+
+## @brief Protocol level failure, the bootloader did not answer or answered garbage.
+class McuBootError(Exception):
+    pass
+
+##
+# @brief Compute the crc16 (XMODEM) used by the framing layer.
+def calculateCrc16(data, crc=0):
+    return binascii.crc_hqx(bytes(data), crc)
+
+##
+# @brief Host side of the MCUboot serial protocol over one pyserial port.
+#
+# The port is opened and pinged on the first command and then kept open, so a session of
+# several commands pays for the port setup and autobaud detection only once.
+class McuBootUart(object):
+
+    def __init__(self, port, baudrate, pingTimeout=kPingTimeoutInSeconds):
+        self.port = port
+        self.baudrate = int(baudrate)
+        self.pingTimeout = pingTimeout
+        self.responseTimeout = kResponseTimeoutInSeconds
+        self.maxPacketSize = None
+        self.protocolVersion = None
+        ## Called with the bytes moved so far after each data packet, None to not report progress.
+        self.progressFunc = None
+        self._serial = None
+
+    def isOpen(self):
+        return self._serial != None
+
+    def open(self):
+        if self._serial == None:
+            self._serial = serial.Serial(self.port, self.baudrate, timeout=kAckTimeoutInSeconds)
+            self.maxPacketSize = None
+
+    def close(self):
+        if self._serial != None:
+            self._serial.close()
+            self._serial = None
+        self.protocolVersion = None
+
+    ##
+    # @brief Reconfigure the port, the next command reopens and pings again.
+    def setPort(self, port, baudrate):
+        self.close()
+        self.port = port
+        self.baudrate = int(baudrate)
+
+    def _read(self, length, deadline):
+        data = bytearray()
+        while len(data) < length:
+            remaining = deadline - time.time()
+            if remaining <= 0:
+                raise McuBootError('Timeout waiting for the bootloader.')
+            self._serial.timeout = remaining
+            data += self._serial.read(length - len(data))
+        return bytes(data)
+
+    def _readStartByte(self, deadline):
+        # Anything before the start byte is line noise
+        while True:
+            if self._read(1, deadline)[0] == kFramingStartByte:
+                return
+
+    def _writeAck(self, packetType=kFramingPacketType_Ack):
+        self._serial.write(bytes([kFramingStartByte, packetType]))
+
+    ##
+    # @brief Ping the bootloader, which also lets it detect the baudrate.
+    #
+    # @return The protocol version as (name, major, minor, bugfix).
+    def ping(self):
+        self.open()
+        self._serial.reset_input_buffer()
+        self._serial.write(bytes([kFramingStartByte, kFramingPacketType_Ping]))
+        deadline = time.time() + self.pingTimeout
+        while True:
+            self._readStartByte(deadline)
+            if self._read(1, deadline)[0] == kFramingPacketType_PingResponse:
+                break
+        response = bytes([kFramingStartByte, kFramingPacketType_PingResponse]) + self._read(kPingResponseStruct.size - 2, deadline)
+        start, packetType, bugfix, minor, major, name, options, crc = kPingResponseStruct.unpack(response)
+        if crc != calculateCrc16(response[0:kPingResponseStruct.size - 2]):
+            raise McuBootError('Ping response crc mismatch.')
+        self.protocolVersion = (name.decode('ascii', 'replace'), major, minor, bugfix)
+        return self.protocolVersion
+
+    def _connect(self):
+        if self.protocolVersion == None:
+            self.ping()
+
+    def _writePacket(self, packetType, payload):
+        header = struct.pack('<BBH', kFramingStartByte, packetType, len(payload))
+        crc = calculateCrc16(payload, calculateCrc16(header))
+        packet = header + struct.pack('<H', crc) + payload
+        for retry in range(kMaxNakRetries + 1):
+            self._serial.write(packet)
+            ackType = self._readAck()
+            if ackType != kFramingPacketType_Nak:
+                return ackType
+        raise McuBootError('Packet rejected by the bootloader.')
+
+    def _readAck(self):
+        deadline = time.time() + kAckTimeoutInSeconds
+        while True:
+            self._readStartByte(deadline)
+            packetType = self._read(1, deadline)[0]
+            if packetType in (kFramingPacketType_Ack, kFramingPacketType_Nak, kFramingPacketType_AckAbort):
+                return packetType
+
+    def _readPacket(self, timeout):
+        # Returns (packetType, payload) of the next command or data packet, acked.
+        deadline = time.time() + timeout
+        while True:
+            self._readStartByte(deadline)
+            packetType = self._read(1, deadline)[0]
+            if packetType != kFramingPacketType_Command and packetType != kFramingPacketType_Data:
+                continue
+            length, crc = struct.unpack('<HH', self._read(4, deadline))
+            payload = self._read(length, deadline)
+            header = struct.pack('<BBH', kFramingStartByte, packetType, length)
+            if crc != calculateCrc16(payload, calculateCrc16(header)):
+                self._writeAck(kFramingPacketType_Nak)
+                continue
+            self._writeAck()
+            return packetType, payload
+
+    def _readResponse(self, timeout):
+        # Returns (tag, flags, [status, values...]) of the next response packet.
+        while True:
+            packetType, payload = self._readPacket(timeout)
+            if packetType == kFramingPacketType_Command and len(payload) >= kCommandHeaderStruct.size:
+                break
+        tag, flags, reserved, paramCount = kCommandHeaderStruct.unpack_from(payload)
+        if len(payload) < kCommandHeaderStruct.size + paramCount * 4:
+            raise McuBootError('Truncated response.')
+        params = list(struct.unpack_from('<%dI' % paramCount, payload, kCommandHeaderStruct.size))
+        if len(params) == 0:
+            raise McuBootError('Response without status.')
+        return tag, flags, params
+
+    def _writeCommand(self, tag, flags, params):
+        payload = kCommandHeaderStruct.pack(tag, flags, 0, len(params)) + struct.pack('<%dI' % len(params), *params)
+        self._writePacket(kFramingPacketType_Command, payload)
+
+    ##
+    # @brief Send one command and collect its response, with an optional data phase.
+    #
+    # @param outData Bytes sent in the data phase of the command.
+    # @return A tuple of (status, response values, data read in the data phase).
+    def command(self, tag, params=(), outData=None, timeout=None):
+        if timeout == None:
+            timeout = self.responseTimeout
+        return self._runGuarded(self._command, tag, params, outData, timeout)
+
+    ##
+    # @brief Stream a boot image in data packets with no command, as load-image does.
+    def loadImage(self, data):
+        return self._runGuarded(self._loadImage, data)
+
+    def _runGuarded(self, func, *args):
+        # After any failure the bootloader state is unknown, so the next command starts over with a ping.
+        # The port is only reopened after a port error, a silent board is simply pinged again.
+        try:
+            self._connect()
+            return func(*args)
+        except McuBootError:
+            self.protocolVersion = None
+            raise
+        except (serial.SerialException, OSError) as e:
+            self.close()
+            raise McuBootError(str(e))
+
+    def _command(self, tag, params, outData, timeout):
+        if outData != None:
+            packetSize = self._getMaxPacketSize()
+            self._writeCommand(tag, kCommandFlag_HasDataPhase, params)
+            responseTag, flags, values = self._readResponse(timeout)
+            if values[0] != status.kStatus_Success:
+                return values[0], values[1:], None
+            for offset in range(0, len(outData), packetSize):
+                if self._writePacket(kFramingPacketType_Data, outData[offset:offset + packetSize]) == kFramingPacketType_AckAbort:
+                    break
+                self._reportProgress(min(offset + packetSize, len(outData)))
+            responseTag, flags, values = self._readResponse(timeout)
+            if values[0] != status.kStatus_Success:
+                return values[0], [], None
+            return values[0], [len(outData)], None
+        self._writeCommand(tag, kCommandFlag_None, params)
+        responseTag, flags, values = self._readResponse(timeout)
+        if responseTag == kResponseTag_Generic:
+            # Only echoes the command tag
+            return values[0], [], None
+        inData = None
+        if flags & kCommandFlag_HasDataPhase and values[0] == status.kStatus_Success and len(values) > 1:
+            inData = bytearray()
+            while len(inData) < values[1]:
+                packetType, payload = self._readPacket(timeout)
+                if packetType == kFramingPacketType_Data:
+                    inData += payload
+                    self._reportProgress(len(inData))
+            responseTag, flags, values = self._readResponse(timeout)
+            if values[0] != status.kStatus_Success:
+                return values[0], [], None
+            values = [values[0], len(inData)]
+        return values[0], values[1:], inData
+
+    def _getMaxPacketSize(self):
+        if self.maxPacketSize == None:
+            self.maxPacketSize = kMinPacketSize
+            self._writeCommand(commands.kCommandTag_GetProperty, kCommandFlag_None, [properties.kPropertyTag_MaxPacketSize, 0])
+            responseTag, flags, values = self._readResponse(self.responseTimeout)
+            if values[0] == status.kStatus_Success and len(values) > 1 and values[1] >= kMinPacketSize:
+                self.maxPacketSize = values[1]
+        return self.maxPacketSize
+
+    def _loadImage(self, data):
+        packetSize = self._getMaxPacketSize()
+        for offset in range(0, len(data), packetSize):
+            if self._writePacket(kFramingPacketType_Data, data[offset:offset + packetSize]) == kFramingPacketType_AckAbort:
+                return status.kStatus_AbortDataPhase
+            self._reportProgress(min(offset + packetSize, len(data)))
+        return status.kStatus_Success
+
+    def _reportProgress(self, length):
+        if self.progressFunc != None:
+            self.progressFunc(length)
@@ -61,7 +61,7 @@ class MemoryRange(object):
             else:
                 self.sizeInFile = 0
         else:
-            self.sizeInFile = self.sizeInFile
+            self.sizeInFile = sizeInFile
 
         self.isFlash = isFlash
         self.flashSectorSize = flashSectorSize
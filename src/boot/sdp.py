@@ -0,0 +1,224 @@
+#! /usr/bin/env python
+
+# Copyright 2022 NXP
+# All rights reserved.
+#
+# SPDX-License-Identifier: BSD-3-Clause
+
+import struct
+import time
+import serial
+from . import status
+
+## @brief SDP command types, sent big endian in both bytes.
+kSdpCommand_ReadRegister  = 0x0101
+kSdpCommand_WriteRegister = 0x0202
+kSdpCommand_WriteFile     = 0x0404
+kSdpCommand_ErrorStatus   = 0x0505
+kSdpCommand_DcdWrite      = 0x0a0a
+kSdpCommand_JumpAddress   = 0x0b0b
+kSdpCommand_SkipDcdHeader = 0x0c0c
+
+## @brief Command type, address, format, data count, data and a reserved byte.
+kSdpCommandStruct = struct.Struct('>HIBIIx')
+## @brief HAB mode and status words come back little endian.
+kSdpWordStruct = struct.Struct('<I')
+
+## @brief Bytes of file data carried by one write-file command.
+kWriteFileChunkSize = 0x10000
+## @brief Chunks go to the port in slices of this size, so their progress can be reported.
+kWriteFileSliceSize = 0x800
+
+kResponseTimeoutInSeconds = 1
+## @brief Extra time allowed on top of the line time of a data phase.
+kDataPhaseMarginInSeconds = 2
+
+## @brief Protocol level failure, the ROM did not answer or answered garbage.
+class SdpError(Exception):
+    pass
+
+##
+# @brief Host side of the serial download protocol over one pyserial port.
+#
+# Unlike sdphost the port is opened on the first command and kept open, and write-file
+# hands the data to the port in large chunks.
+class SdpUart(object):
+
+    def __init__(self, port, baudrate, responseTimeout=kResponseTimeoutInSeconds, chunkSize=kWriteFileChunkSize):
+        self.port = port
+        self.baudrate = int(baudrate)
+        self.responseTimeout = responseTimeout
+        ## error-status is what callers ping the ROM with, so it may wait less than other commands.
+        self.pingTimeout = responseTimeout
+        self.chunkSize = chunkSize
+        ## Called with the bytes written so far during write-file, None to not report progress.
+        self.progressFunc = None
+        self._serial = None
+        self._isFlushNeeded = False
+
+    def isOpen(self):
+        return self._serial != None
+
+    def open(self):
+        if self._serial == None:
+            self._serial = serial.Serial(self.port, self.baudrate, timeout=self.responseTimeout)
+
+    def close(self):
+        if self._serial != None:
+            self._serial.close()
+            self._serial = None
+
+    ##
+    # @brief Reconfigure the port, the next command reopens it.
+    def setPort(self, port, baudrate):
+        self.close()
+        self.port = port
+        self.baudrate = int(baudrate)
+
+    def _lineSeconds(self, length):
+        return length * 10.0 / self.baudrate
+
+    def _read(self, length, timeout):
+        deadline = time.time() + timeout
+        data = bytearray()
+        while len(data) < length:
+            remaining = deadline - time.time()
+            if remaining <= 0:
+                raise SdpError('Timeout waiting for the ROM.')
+            self._serial.timeout = remaining
+            data += self._serial.read(length - len(data))
+        return bytes(data)
+
+    def _readWord(self, timeout=None):
+        if timeout == None:
+            timeout = self.responseTimeout
+        return kSdpWordStruct.unpack(self._read(kSdpWordStruct.size, timeout))[0]
+
+    def _readHabMode(self, timeout=None):
+        habMode = self._readWord(timeout)
+        if habMode != status.kSDP_Status_HabEnabled and habMode != status.kSDP_Status_HabDisabled:
+            raise SdpError('Unexpected HAB mode 0x%08x.' % habMode)
+        return habMode
+
+    def _writeCommand(self, command, address=0, format=0, dataCount=0, data=0):
+        self._serial.write(kSdpCommandStruct.pack(command, address, format, dataCount, data))
+
+    def _runGuarded(self, func, *args):
+        # Any failure leaves the ROM in an unknown state, so stale input is flushed next time.
+        # The port is only reopened after a port error.
+        try:
+            if self._serial == None:
+                self.open()
+                self._isFlushNeeded = True
+            if self._isFlushNeeded:
+                self._serial.reset_input_buffer()
+                self._isFlushNeeded = False
+            return func(*args)
+        except SdpError:
+            self._isFlushNeeded = True
+            raise
+        except (serial.SerialException, OSError) as e:
+            self.close()
+            raise SdpError(str(e))
+
+    ##
+    # @brief error-status command.
+    #
+    # @return A tuple of (HAB mode, [error status]).
+    def errorStatus(self):
+        return self._runGuarded(self._errorStatus)
+
+    def _errorStatus(self):
+        self._writeCommand(kSdpCommand_ErrorStatus)
+        habMode = self._readHabMode(self.pingTimeout)
+        return habMode, [self._readWord(self.pingTimeout)]
+
+    ##
+    # @brief write-file command, data is split into chunkSize commands at consecutive addresses.
+    #
+    # @return A tuple of (HAB mode, [complete status]). The status of the first failing chunk
+    #         replaces the HAB mode.
+    def writeFile(self, address, data):
+        return self._runGuarded(self._writeFile, address, data)
+
+    def _writeFile(self, address, data):
+        habMode, response = status.kSDP_Status_HabDisabled, []
+        data = memoryview(data)
+        for offset in range(0, len(data), self.chunkSize):
+            chunk = data[offset:offset + self.chunkSize]
+            self._writeCommand(kSdpCommand_WriteFile, address + offset, 0, len(chunk))
+            for sliceOffset in range(0, len(chunk), kWriteFileSliceSize):
+                self._serial.write(chunk[sliceOffset:sliceOffset + kWriteFileSliceSize])
+                if self.progressFunc != None:
+                    self.progressFunc(offset + min(sliceOffset + kWriteFileSliceSize, len(chunk)))
+            timeout = self._lineSeconds(len(chunk)) + kDataPhaseMarginInSeconds
+            habMode = self._readHabMode(timeout)
+            completeStatus = self._readWord()
+            response = [completeStatus]
+            if completeStatus != status.kSDP_Response_WriteFileComplete:
+                return completeStatus, response
+        return habMode, response
+
+    ##
+    # @brief dcd-write command.
+    def dcdWrite(self, address, data):
+        return self._runGuarded(self._dcdWrite, address, data)
+
+    def _dcdWrite(self, address, data):
+        self._writeCommand(kSdpCommand_DcdWrite, address, 0, len(data))
+        self._serial.write(data)
+        habMode = self._readHabMode(self._lineSeconds(len(data)) + kDataPhaseMarginInSeconds)
+        completeStatus = self._readWord()
+        if completeStatus != status.kSDP_Response_WriteComplete:
+            return completeStatus, [completeStatus]
+        return habMode, [completeStatus]
+
+    ##
+    # @brief read-register command.
+    #
+    # @return A tuple of (HAB mode, [words read]) and the raw bytes read.
+    def readRegister(self, address, format, numBytes):
+        return self._runGuarded(self._readRegister, address, format, numBytes)
+
+    def _readRegister(self, address, format, numBytes):
+        self._writeCommand(kSdpCommand_ReadRegister, address, format, numBytes)
+        habMode = self._readHabMode()
+        # The ROM always sends whole words
+        length = (numBytes + 3) & ~3
+        data = self._read(length, self._lineSeconds(length) + self.responseTimeout)
+        return habMode, list(struct.unpack('<%dI' % (length // 4), data)), data[0:numBytes]
+
+    ##
+    # @brief write-register command.
+    def writeRegister(self, address, format, value):
+        return self._runGuarded(self._writeRegister, address, format, value)
+
+    def _writeRegister(self, address, format, value):
+        self._writeCommand(kSdpCommand_WriteRegister, address, format, format // 8, value)
+        habMode = self._readHabMode()
+        completeStatus = self._readWord()
+        if completeStatus != status.kSDP_Response_WriteComplete:
+            return completeStatus, [completeStatus]
+        return habMode, [completeStatus]
+
+    ##
+    # @brief skip-dcd-header command.
+    def skipDcdHeader(self):
+        return self._runGuarded(self._skipDcdHeader)
+
+    def _skipDcdHeader(self):
+        self._writeCommand(kSdpCommand_SkipDcdHeader)
+        habMode = self._readHabMode()
+        ackStatus = self._readWord()
+        if ackStatus != status.kSDP_Response_OkAck:
+            return ackStatus, [ackStatus]
+        return habMode, [ackStatus]
+
+    ##
+    # @brief jump-address command. The ROM only answers with its HAB mode before it jumps.
+    def jumpAddress(self, address):
+        return self._runGuarded(self._jumpAddress, address)
+
+    def _jumpAddress(self, address):
+        self._writeCommand(kSdpCommand_JumpAddress, address)
+        return self._readHabMode(), []
@@ -55,6 +55,9 @@ class Target(object):
         self.firmwareLoadAddr = misc.get_dict_default(kwargs, 'firmwareLoadAddr', None)
         self.firmwareJumpAddr = misc.get_dict_default(kwargs, 'firmwareJumpAddr', None)
         self.firmwareInitialSp = misc.get_dict_default(kwargs, 'firmwareInitialSp', None)
+        self.decompressorLoadAddr = misc.get_dict_default(kwargs, 'decompressorLoadAddr', None)
+        self.decompressorJumpAddr = misc.get_dict_default(kwargs, 'decompressorJumpAddr', None)
+        self.packedImageLoadAddr = misc.get_dict_default(kwargs, 'packedImageLoadAddr', None)
         self.supportedPeripheralSpeed_uart = misc.get_dict_default(kwargs, 'supportedPeripheralSpeed_uart', None)
         self.flexspiNorDevice = misc.get_dict_default(kwargs, 'flexspiNorDevice', None)
         self.flexspiNorMemBase = misc.get_dict_default(kwargs, 'flexspiNorMemBase0', None)
@@ -63,6 +66,16 @@ class Target(object):
         self.isSipFlexspiNorDevice = misc.get_dict_default(kwargs, 'isSipFlexspiNorDevice', None)
         self.mixspiConnDict = misc.get_dict_default(kwargs, 'mixspiConnDict', None)
 
+    ##
+    # @brief Make the target read-only, it can then be shared between windows and threads.
+    def freeze(self):
+        self._isFrozen = True
+
+    def __setattr__(self, name, value):
+        if getattr(self, '_isFrozen', False):
+            raise AttributeError("Target %s is shared and read-only" % self.cpu)
+        object.__setattr__(self, name, value)
+
     ##
     # @brief Check if a command is supported by the target.
     #
@@ -8,6 +8,7 @@ from PyQt5.Qt import *
 from ui import uidef
 from ui import uilang
 from ui import uivar
+from ui import uipacket
 from ui import ui_cfg_conn
 from ui import ui_cfg_pin_test
 from ui import ui_cfg_rw_test
@@ -15,8 +16,6 @@ from ui import ui_cfg_perf_test
 from ui import ui_cfg_stress_test
 from run import runcore
 
-kRetryPingTimes = 5
-
 class memTesterMain(runcore.memTesterRun):
 
     def __init__(self, parent=None):
@@ -24,6 +23,7 @@ class memTesterMain(runcore.memTesterRun):
         self._register_callbacks()
         self.isDeviceConnected = False
         self.goAction = None
+        self.subWindowDict = {}
         self._setupMcuTargets()
         self.isLoadFirmwareEnabled = True
         self.isShowCmdPacketEnabled = False
@@ -50,6 +50,10 @@ class memTesterMain(runcore.memTesterRun):
         self.pushButton_stressTest.clicked.connect(self.callbackStressTest)
         self.pushButton_Go.clicked.connect(self.callbackGo)
         self.pushButton_clearScreen.clicked.connect(self.clearContentOfScreens)
+        self.menuToolsAction_runTestPlan.triggered.connect(self.callbackRunTestPlan)
+        self.menuToolsAction_reliableLink.triggered.connect(self.callbackSetReliableLinkOpt)
+        self.menuToolsAction_waitForBoard.triggered.connect(self.callbackSetWaitForBoardOpt)
+        self.menuToolsAction_packedDownload.triggered.connect(self.callbackSetPackedDownloadOpt)
 
     def _setupMcuTargets( self ):
         self.setTargetSetupValue()
@@ -58,52 +62,93 @@ class memTesterMain(runcore.memTesterRun):
         self.updateCpuSpeedInfo()
         self.updateUartPadInfo()
 
+    def _getSubWindow( self, subWindowClass, title ):
+        # Sub-windows are built the first time they are shown, not at startup
+        subWindow = self.subWindowDict.get(subWindowClass)
+        if subWindow == None:
+            subWindow = subWindowClass(None)
+            subWindow.setWindowTitle(title)
+            self.subWindowDict[subWindowClass] = subWindow
+        return subWindow
+
     def callbackSetMcuDevice( self ):
         self._setupMcuTargets()
 
     def callbackMixspiConnectionConfiguration( self ):
         self.showContentOnSecPacketWin(u"【Action】: Click <MixSPI Connnect Configuration> button.")
+        mixspiConnCfgFrame = self._getSubWindow(ui_cfg_conn.memTesterUiConn, u"MixSPI Connection Configuration")
         mixspiConnCfgFrame.setNecessaryInfo(self.mcuDevice, self.tgt.mixspiConnDict, self.textEdit_mixspiConnection)
         mixspiConnCfgFrame.show()
 
-    def _retryToPingBootloader( self ):
-        if not self.isLoadFirmwareEnabled:
-            return True
-        pingStatus = False
-        pingCnt = kRetryPingTimes
-        while (not pingStatus) and pingCnt > 0:
-            pingStatus = self.pingRom()
-            if pingStatus:
-                break
-            pingCnt = pingCnt - 1
-            time.sleep(2)
-        return pingStatus
-
     def callbackConnectToDevice( self ):
         if not self.isDeviceConnected:
+            if self.isConnecting():
+                self.showContentOnSecPacketWin(u"【Action】: Click <Stop> button to stop connecting.")
+                self.stopConnection()
+                return
             self.showContentOnSecPacketWin(u"【Action】: Click <Connect> button to load boot firmware.")
             self.updatePortSetupValue()
-            self.connectToDevice()
-            if self._retryToPingBootloader():
-                if self.jumpToFirmware():
-                    self.showContentOnSecPacketWin(u"【  Info 】: boot firmware is loaded.")
-                    self.openUartPort()
-                    self.isDeviceConnected = True
-                else:
-                    pass
-            else:
-                if (self.tgt.mcuSeries == uidef.kMcuSeries_iMXRT10yy) or \
-                   (self.tgt.mcuSeries == uidef.kMcuSeries_iMXRT11yy):
-                    self.showInfoMessage('Connection Error', uilang.kMsgLanguageContentDict['connectError_doubleCheckBmod'][0])
-                elif (self.tgt.mcuSeries == uidef.kMcuSeries_iMXRTxxx):
-                    self.showInfoMessage('Connection Error', uilang.kMsgLanguageContentDict['connectError_doubleCheckSerialMasterBoot'][0])
-                else:
-                    pass
+            if not self.isLoadFirmwareEnabled:
+                self._openFirmwarePort()
+                return
+            if self.isWaitForBoardEnabled:
+                self.showContentOnSecPacketWin(u"【  Info 】: Waiting for board, click <Stop> button to stop.")
+            # Firmware already running is looked for first, the bootloader is not reachable then anyway
+            self.startConnection(self.isWaitForBoardEnabled, True)
         else:
             self.showContentOnSecPacketWin(u"【Action】: Click <Reset> button to reboot system.")
             self.isDeviceConnected = False
             self.closeUartPort()
 
+    def _connectToResidentFirmware( self, firmwareInfo ):
+        firmwareVersion, imageSize, imageCrc32 = firmwareInfo
+        versionStr = uipacket.format_firmware_version(firmwareVersion)
+        if self.getFirmwareImageHash() != (imageSize, imageCrc32):
+            self.showContentOnSecPacketWin(u"【 Error 】: boot firmware " + versionStr + " is running but differs from boot_firmware.bin, reset board to reload it.")
+            return
+        self.showContentOnSecPacketWin(u"【  Info 】: boot firmware " + versionStr + " is already running, skip loading.")
+        self.openUartPort()
+        self.isDeviceConnected = True
+
+    def _openFirmwarePort( self ):
+        self.showContentOnSecPacketWin(u"【  Info 】: boot firmware is loaded.")
+        self.handleConnectionStage(uidef.kConnectStage_OpeningPort)
+        self.openUartPort()
+        self.resetActionProgress()
+        self.isDeviceConnected = True
+
+    def handleConnectionFinished( self, result, isFirmwareLoaded ):
+        if result.isCancelled:
+            if result.isDetected:
+                self.showContentOnSecPacketWin(u"【  Info 】: Connecting is stopped, reset board before connecting again.")
+            else:
+                self.showContentOnSecPacketWin(u"【  Info 】: Connecting is stopped.")
+            return
+        if result.firmwareInfo != None:
+            self._connectToResidentFirmware(result.firmwareInfo)
+            return
+        if result.isDetected:
+            self.showContentOnSecPacketWin(u"【  Info 】: Bootloader detected, " + result.report + ".")
+        else:
+            self.showContentOnSecPacketWin(u"【 Error 】: Bootloader not detected, " + result.report + ".")
+        if result.error != None:
+            self.showContentOnSecPacketWin(u"【 Error 】: boot firmware is not loaded, " + result.error + ".")
+            return
+        if result.isDetected:
+            if isFirmwareLoaded:
+                self._openFirmwarePort()
+                self.showContentOnSecPacketWin(u"【  Info 】: Connected in {:.2f} s.".format(time.time() - self.connectionStartTime))
+            else:
+                pass
+        else:
+            if (self.tgt.mcuSeries == uidef.kMcuSeries_iMXRT10yy) or \
+               (self.tgt.mcuSeries == uidef.kMcuSeries_iMXRT11yy):
+                self.showInfoMessage('Connection Error', uilang.kMsgLanguageContentDict['connectError_doubleCheckBmod'][0])
+            elif (self.tgt.mcuSeries == uidef.kMcuSeries_iMXRTxxx):
+                self.showInfoMessage('Connection Error', uilang.kMsgLanguageContentDict['connectError_doubleCheckSerialMasterBoot'][0])
+            else:
+                pass
+
     def callbackSetMemVendor( self ):
         self.setMemVendor()
 
@@ -113,7 +158,8 @@ class memTesterMain(runcore.memTesterRun):
     def callbackPinTest( self ):
         self.showContentOnSecPacketWin(u"【Action】: Click <Pin Test> button.")
         self.goAction = uidef.kGoAction_PinTest
-        pinTestFrame.show()
+        self._getSubWindow(ui_cfg_pin_test.memTesterUiPinTest, u"Pin Test").show()
+        self.showPinWaveform()
         self.resetAllActionButtonColor()
         self.setActionButtonColor(self.goAction)
 
@@ -132,25 +178,29 @@ class memTesterMain(runcore.memTesterRun):
     def callbackRwTest( self ):
         self.showContentOnSecPacketWin(u"【Action】: Click <R/W Test> button.")
         self.goAction = uidef.kGoAction_RwTest
-        rwTestFrame.show()
+        self._getSubWindow(ui_cfg_rw_test.memTesterUiRwTest, u"R/W Test").show()
         self.resetAllActionButtonColor()
         self.setActionButtonColor(self.goAction)
 
     def callbackPerfTest( self ):
         self.showContentOnSecPacketWin(u"【Action】: Click <Perf Test> button.")
         self.goAction = uidef.kGoAction_PerfTest
-        perfTestFrame.show()
+        self._getSubWindow(ui_cfg_perf_test.memTesterUiPerfTest, u"Perf Test").show()
         self.resetAllActionButtonColor()
         self.setActionButtonColor(self.goAction)
 
     def callbackStressTest( self ):
         self.showContentOnSecPacketWin(u"【Action】: Click <Stress Test> button.")
         self.goAction = uidef.kGoAction_StressTest
-        stressTestFrame.show()
+        self._getSubWindow(ui_cfg_stress_test.memTesterUiStressTest, u"Stress Test").show()
         self.resetAllActionButtonColor()
         self.setActionButtonColor(self.goAction)
 
     def callbackGo( self ):
+        if self.isCommandQueueRunning():
+            self.showContentOnSecPacketWin(u"【Action】: Click <Stop> button.")
+            self.stopCommandQueue()
+            return
         if self.goAction == None:
             return
         if self.isGoActionWorking():
@@ -162,30 +212,32 @@ class memTesterMain(runcore.memTesterRun):
             return
         else:
             self.showContentOnSecPacketWin(u"【Action】: Click <Go> button.")
-        if self.goAction == uidef.kGoAction_PinTest:
-            self.sendPinTestPacket()
-        elif self.goAction == uidef.kGoAction_ConfigSystem:
-            if self.updateTargetSetupValue():
-                self.sendConfigSystemPacket()
-            else:
-                return
-        elif self.goAction == uidef.kGoAction_MemRegs:
-            self.sendMemRegsPacket()
-        elif self.goAction == uidef.kGoAction_RwTest:
-            self.sendRwTestPacket()
-        elif self.goAction == uidef.kGoAction_PerfTest:
-            self.sendPerfTestPacket()
-        elif self.goAction == uidef.kGoAction_StressTest:
-            self.sendStressTestPacket()
-        else:
+        if not self.sendGoActionPacket(self.goAction):
             return
         self.updateGoActionButton()
 
+    def callbackRunTestPlan( self ):
+        self.showContentOnSecPacketWin(u"【Action】: Click <Run Test Plan> menu.")
+        if not self.isDeviceConnected:
+            self.showInfoMessage('Test Plan', 'Please connect to device first.')
+            return
+        if self.isGoActionWorking() or not self.runCommandQueue(uidef.kTestPlan_Default):
+            self.showInfoMessage('Test Plan', 'Another test is still running.')
+
     def _deinitToolToExit( self ):
         uivar.setAdvancedSettings(uidef.kAdvancedSettings_Tool, self.toolCommDict)
         uivar.deinitVar()
 
+    def changeEvent(self, event):
+        # Model scripts may have been edited outside the tool, only their stamps are checked here
+        if event.type() == QEvent.ActivationChange and self.isActiveWindow():
+            self.refreshMemModels()
+        QMainWindow.changeEvent(self, event)
+
     def closeEvent(self, event):
+        # The worker emits into this window, let it finish before the window goes
+        self.stopConnection()
+        self.connectionPool.waitForDone()
         self._deinitToolToExit()
         event.accept()
 
@@ -195,6 +247,15 @@ class memTesterMain(runcore.memTesterRun):
     def callbackSetShowCmdPacketOpt( self ):
         self.setShowCmdPacketOpt()
 
+    def callbackSetReliableLinkOpt( self ):
+        self.setReliableLinkOpt()
+
+    def callbackSetWaitForBoardOpt( self ):
+        self.setWaitForBoardOpt()
+
+    def callbackSetPackedDownloadOpt( self ):
+        self.setPackedDownloadOpt()
+
     def callbackShowHomePage(self):
         self.showAboutMessage(uilang.kMsgLanguageContentDict['homePage_title'][0], uilang.kMsgLanguageContentDict['homePage_info'][0] )
 
@@ -213,16 +274,6 @@ if __name__ == '__main__':
     mainWin = memTesterMain(None)
     mainWin.setWindowTitle(u"MCU Mem Test Utility v1.0")
     mainWin.show()
-    mixspiConnCfgFrame = ui_cfg_conn.memTesterUiConn(None)
-    mixspiConnCfgFrame.setWindowTitle(u"MixSPI Connection Configuration")
-    pinTestFrame = ui_cfg_pin_test.memTesterUiPinTest(None)
-    pinTestFrame.setWindowTitle(u"Pin Test")
-    rwTestFrame = ui_cfg_rw_test.memTesterUiRwTest(None)
-    rwTestFrame.setWindowTitle(u"R/W Test")
-    perfTestFrame = ui_cfg_perf_test.memTesterUiPerfTest(None)
-    perfTestFrame.setWindowTitle(u"Perf Test")
-    stressTestFrame = ui_cfg_stress_test.memTesterUiStressTest(None)
-    stressTestFrame.setWindowTitle(u"Stress Test")
 
     #whnd = ctypes.windll.kernel32.GetConsoleWindow()
     #if whnd != 0:
@@ -7,6 +7,7 @@
 
 from . import runcore
 from . import rundef
+from . import runprov
 
-__all__ = ["runcore", "rundef"]
+__all__ = ["runcore", "rundef", "runprov"]
 
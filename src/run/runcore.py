@@ -9,17 +9,27 @@
 import sys
 import os
 import array
+import time
+import binascii
+import tempfile
+import threading
+import collections
+from PyQt5.QtCore import QTimer, QObject, QRunnable, QThreadPool, pyqtSignal
 from . import rundef
 sys.path.append(os.path.abspath(".."))
 import boot
 from ui import uicore
 from ui import uidef
 from ui import uilang
+from ui import uivar
+from ui import uipacket
+from ui import ui_cfg_perf_test
 from boot import bltest
 from boot import target
 from utils import misc
+from utils import elf
 
-def createTarget(device, exeBinRoot):
+def _getTargetCpu(device):
     cpu = "MIMXRT1052"
     if device == uidef.kMcuDevice_iMXRT500:
         cpu = "MIMXRT595"
@@ -49,6 +59,9 @@ def createTarget(device, exeBinRoot):
         cpu = "MIMXRT1189"
     else:
         pass
+    return cpu
+
+def _findTargetBaseDir(cpu, exeBinRoot):
     targetBaseDir = os.path.join(os.path.dirname(os.path.dirname(__file__)), 'targets', cpu)
 
     # Check for existing target directory.
@@ -57,6 +70,9 @@ def createTarget(device, exeBinRoot):
         if not os.path.isdir(targetBaseDir):
             raise ValueError("Missing target directory at path %s" % targetBaseDir)
 
+    return targetBaseDir
+
+def _buildTarget(targetBaseDir):
     targetConfigFile = os.path.join(targetBaseDir, 'bltargetconfig.py')
 
     # Check for config file existence.
@@ -68,103 +84,653 @@ def createTarget(device, exeBinRoot):
     targetConfig['__file__'] = targetConfigFile
     targetConfig['__name__'] = 'bltargetconfig'
 
-    # Execute the target config script.
-    misc.execfile(targetConfigFile, globals(), targetConfig)
+    # Execute the target config script, on a copy of our globals as execfile() overwrites __file__.
+    misc.execfile(targetConfigFile, globals().copy(), targetConfig)
 
     # Create the target object.
     tgt = target.Target(**targetConfig)
+    tgt.freeze()
+
+    return tgt
+
+# targetBaseDir -> (config file [mtime_ns, size], shared Target)
+s_targetCache = {}
+s_targetCacheLock = threading.Lock()
+
+def createTarget(device, exeBinRoot):
+    # Targets are built once per config file and shared, an edited bltargetconfig.py is run again
+    targetBaseDir = _findTargetBaseDir(_getTargetCpu(device), exeBinRoot)
+    try:
+        fileStat = os.stat(os.path.join(targetBaseDir, 'bltargetconfig.py'))
+        stamp = [fileStat.st_mtime_ns, fileStat.st_size]
+    except OSError:
+        stamp = None
+    with s_targetCacheLock:
+        cached = s_targetCache.get(targetBaseDir)
+        if cached != None and stamp != None and cached[0] == stamp:
+            return cached[1], targetBaseDir
+        tgt = _buildTarget(targetBaseDir)
+        s_targetCache[targetBaseDir] = (stamp, tgt)
 
     return tgt, targetBaseDir
 
+def preloadTargets(exeBinRoot, devices=uidef.kMcuDevice_v1_0):
+    # Builds the targets of all devices on a background thread so that switching device is a lookup.
+    # Devices without a target directory are skipped, createTarget() reports them when selected.
+    def _preload():
+        for device in devices:
+            try:
+                createTarget(device, exeBinRoot)
+            except Exception:
+                pass
+    preloader = threading.Thread(target=_preload, daemon=True)
+    preloader.start()
+    return preloader
+
+def createBootDevice(tgt, exeTopRoot, uartComPort, uartBaudrate):
+    # The ROM of i.MXRT10yy talks SDP, the others talk MCUboot
+    usbVid = ''
+    usbPid = ''
+    bootDevice = None
+    if tgt.mcuSeries == uidef.kMcuSeries_iMXRT10yy:
+        sdphostVectorsDir = os.path.join(exeTopRoot, 'tools', 'sdphost', 'win', 'vectors')
+        bootDevice = bltest.createBootloader(tgt,
+                                             sdphostVectorsDir,
+                                             'sdp_uart',
+                                             uartBaudrate, uartComPort,
+                                             usbVid, usbPid)
+    elif (tgt.mcuSeries == uidef.kMcuSeries_iMXRT11yy) or \
+         (tgt.mcuSeries == uidef.kMcuSeries_iMXRTxxx):
+        blhostVectorsDir = os.path.join(exeTopRoot, 'tools', 'blhost2_6', 'win', 'vectors')
+        bootDevice = bltest.createBootloader(tgt,
+                                             blhostVectorsDir,
+                                             'uart',
+                                             uartBaudrate, uartComPort,
+                                             usbVid, usbPid,
+                                             True)
+    else:
+        pass
+    if bootDevice != None:
+        # Detection pings often, a missed ping should not hold up the next one
+        bootDevice.setPingTimeout(rundef.kBootloaderPingTimeoutInSeconds)
+    return bootDevice
+
+def pingBootDevice(tgt, bootDevice):
+    if tgt.mcuSeries == uidef.kMcuSeries_iMXRT10yy:
+        status, results, cmdStr = bootDevice.errorStatus()
+        return (status == boot.status.kSDP_Status_HabEnabled or status == boot.status.kSDP_Status_HabDisabled)
+    elif (tgt.mcuSeries == uidef.kMcuSeries_iMXRT11yy) or \
+         (tgt.mcuSeries == uidef.kMcuSeries_iMXRTxxx):
+        status, results, cmdStr = bootDevice.getProperty(boot.properties.kPropertyTag_CurrentVersion)
+        return (status == boot.status.kStatus_Success)
+    else:
+        return False
+
+def loadBootFirmware(tgt, bootDevice, firmwareBinFile):
+    firmwareLoadAddr = tgt.firmwareLoadAddr
+    firmwareJumpAddr = tgt.firmwareJumpAddr
+    firmwareInitialSp = tgt.firmwareInitialSp
+    if tgt.mcuSeries == uidef.kMcuSeries_iMXRT10yy:
+        status, results, cmdStr = bootDevice.writeFile(firmwareLoadAddr, firmwareBinFile)
+        if status != boot.status.kSDP_Status_HabEnabled and status != boot.status.kSDP_Status_HabDisabled:
+            return False
+        status, results, cmdStr = bootDevice.jumpAddress(firmwareJumpAddr)
+        if status != boot.status.kSDP_Status_HabEnabled and status != boot.status.kSDP_Status_HabDisabled:
+            return False
+    elif tgt.mcuSeries == uidef.kMcuSeries_iMXRT11yy:
+        status, results, cmdStr = bootDevice.loadImage(firmwareBinFile)
+        if status != boot.status.kStatus_Success:
+            return False
+    elif tgt.mcuSeries == uidef.kMcuSeries_iMXRTxxx:
+        status, results, cmdStr = bootDevice.writeMemory(firmwareLoadAddr, firmwareBinFile)
+        if status != boot.status.kStatus_Success:
+            return False
+        #status, results, cmdStr = bootDevice.execute(firmwareJumpAddr, 0, firmwareInitialSp)
+        #if status != boot.status.kStatus_Success:
+        #    return False
+    else:
+        pass
+    return True
+
+def isPackedDownloadSupported(tgt, cpuDir):
+    # i.MXRT11yy ROM only takes boot images through load-image, the stub cannot go in first there
+    if (tgt.mcuSeries != uidef.kMcuSeries_iMXRT10yy) and \
+       (tgt.mcuSeries != uidef.kMcuSeries_iMXRTxxx):
+        return False
+    if tgt.decompressorLoadAddr == None or tgt.packedImageLoadAddr == None:
+        return False
+    return os.path.isfile(os.path.join(cpuDir, 'boot_decompressor.bin'))
+
+def isDeltaDownloadSupported(cpuDir):
+    # Memory may have changed since the last load (reset, test runs), a delta is only sent to a
+    # stub that checks the base it applies to
+    with open(os.path.join(cpuDir, 'boot_decompressor.bin'), 'rb') as fileObj:
+        stubData = fileObj.read()
+    return (boot.imagepack.getDecompressorFeatures(stubData) & boot.imagepack.kDecompressorFeature_VerifyBase) != 0
+
+def _isSdpStatusOk(status):
+    return (status == boot.status.kSDP_Status_HabEnabled or status == boot.status.kSDP_Status_HabDisabled)
+
+def _writeTempBinFile(data):
+    # bltest commands take the data to send as a file
+    fileObj = tempfile.NamedTemporaryFile(suffix='.bin', delete=False)
+    fileObj.write(data)
+    fileObj.close()
+    return fileObj.name
+
+def loadPackedBootFirmware(tgt, cpuDir, bootDevice, packedData):
+    # The decompressor stub goes in first, then the packed image, the stub expands it into
+    # firmwareLoadAddr and starts it.
+    decompressorBinFile = os.path.join(cpuDir, 'boot_decompressor.bin')
+    packedBinFile = _writeTempBinFile(packedData)
+    try:
+        if tgt.mcuSeries == uidef.kMcuSeries_iMXRT10yy:
+            status, results, cmdStr = bootDevice.writeFile(tgt.decompressorLoadAddr, decompressorBinFile)
+            if not _isSdpStatusOk(status):
+                return False
+            status, results, cmdStr = bootDevice.writeFile(tgt.packedImageLoadAddr, packedBinFile)
+            if not _isSdpStatusOk(status):
+                return False
+            status, results, cmdStr = bootDevice.jumpAddress(tgt.decompressorJumpAddr)
+            if not _isSdpStatusOk(status):
+                return False
+        elif tgt.mcuSeries == uidef.kMcuSeries_iMXRTxxx:
+            status, results, cmdStr = bootDevice.writeMemory(tgt.decompressorLoadAddr, decompressorBinFile)
+            if status != boot.status.kStatus_Success:
+                return False
+            status, results, cmdStr = bootDevice.writeMemory(tgt.packedImageLoadAddr, packedBinFile)
+            if status != boot.status.kStatus_Success:
+                return False
+            status, results, cmdStr = bootDevice.execute(tgt.decompressorJumpAddr, tgt.packedImageLoadAddr, tgt.firmwareInitialSp)
+            if status != boot.status.kStatus_Success:
+                return False
+        else:
+            return False
+    finally:
+        os.remove(packedBinFile)
+    return True
+
+def confirmFirmwareImage(uartComPort, imageData):
+    # Polls the handshake of the firmware a delta was expanded into, True if it runs imageData
+    imageHash = (len(imageData), binascii.crc32(imageData) & 0xFFFFFFFF)
+    deadline = time.time() + uidef.kPackedImageConfirmTimeoutInSeconds
+    while time.time() < deadline:
+        firmwareInfo = uicore.queryResidentFirmware(uartComPort)
+        if firmwareInfo != None:
+            return (firmwareInfo[1], firmwareInfo[2]) == imageHash
+    return False
+
+def readElfLoadRanges(elfFile):
+    # Returns [(address, data)] of the PT_LOAD segments, at their load address and with contiguous
+    # ones merged. Only file contents are sent, .bss and NOLOAD sections are up to the firmware.
+    elfObj = elf.ELFObject()
+    with open(elfFile, 'rb') as fileObj:
+        elfObj.fromFile(fileObj)
+    segments = [segment for segment in elfObj.getProgrammableSections() if segment.p_filesz > 0]
+    if len(segments) == 0:
+        raise elf.ELFException("No PT_LOAD segment with data")
+    segments.sort(key=lambda segment: segment.p_paddr)
+    memoryRanges = boot.memoryrange.coalesceRangeList([boot.memoryrange.MemoryRange(segment.p_paddr, segment.p_filesz) for segment in segments])
+    loadRanges = []
+    for memoryRange in memoryRanges:
+        data = bytearray(memoryRange.length)
+        for segment in segments:
+            if memoryRange.start <= segment.p_paddr <= memoryRange.end:
+                offset = segment.p_paddr - memoryRange.start
+                data[offset:offset + segment.p_filesz] = segment.data
+        loadRanges.append((memoryRange.start, bytes(data)))
+    return loadRanges
+
+def isElfDownloadSupported(tgt):
+    # i.MXRT11yy ROM only takes boot images through load-image
+    return (tgt.mcuSeries == uidef.kMcuSeries_iMXRT10yy) or \
+           (tgt.mcuSeries == uidef.kMcuSeries_iMXRTxxx)
+
+def loadElfBootFirmware(tgt, bootDevice, loadRanges):
+    for address, data in loadRanges:
+        rangeBinFile = _writeTempBinFile(data)
+        try:
+            if tgt.mcuSeries == uidef.kMcuSeries_iMXRT10yy:
+                status, results, cmdStr = bootDevice.writeFile(address, rangeBinFile)
+                if not _isSdpStatusOk(status):
+                    return False
+            elif tgt.mcuSeries == uidef.kMcuSeries_iMXRTxxx:
+                status, results, cmdStr = bootDevice.writeMemory(address, rangeBinFile)
+                if status != boot.status.kStatus_Success:
+                    return False
+            else:
+                return False
+        finally:
+            os.remove(rangeBinFile)
+    if tgt.mcuSeries == uidef.kMcuSeries_iMXRT10yy:
+        status, results, cmdStr = bootDevice.jumpAddress(tgt.firmwareJumpAddr)
+        if not _isSdpStatusOk(status):
+            return False
+    return True
+
+def _getComPorts():
+    import serial.tools.list_ports
+    return [comport.device for comport in serial.tools.list_ports.comports()]
+
+# The connection was stopped with connectionWorker.cancel()
+class connectionCancelled(Exception):
+    pass
+
+class connectionSignals(QObject):
+    stageChanged = pyqtSignal(str)
+    portChanged = pyqtSignal(str)
+    progress = pyqtSignal(object)
+    finished = pyqtSignal(object)
+
+# Where the connection pipeline got to, passed with connectionSignals.finished. loadResult is
+# what loadFunc returned, None if it did not run. error is the message of an unexpected failure.
+# firmwareInfo is what uicore.queryResidentFirmware() found, the ROM is not pinged then.
+connectionResult = collections.namedtuple('connectionResult', ['isDetected', 'isCancelled', 'loadResult', 'report', 'error', 'firmwareInfo'])
+
+class connectionWorker(QRunnable):
+    # Waits for the board, pings its ROM until it answers and runs loadFunc(bootDevice) on it, all
+    # on a pool thread. With isQueryResident, firmware left running on the board is looked for
+    # first. The boot device is closed before finished is emitted, so the port is free for the
+    # firmware by then.
+
+    def __init__(self, tgt, exeTopRoot, uartComPort, uartBaudrate, loadFunc=None, isWaitForBoard=False, isQueryResident=False):
+        super(connectionWorker, self).__init__()
+        # The pool owns the runnable, signals is a QObject of its own so it can outlive it
+        self.signals = connectionSignals()
+        self.tgt = tgt
+        self.exeTopRoot = exeTopRoot
+        self.uartComPort = uartComPort
+        self.uartBaudrate = uartBaudrate
+        self.loadFunc = loadFunc
+        self.isWaitForBoard = isWaitForBoard
+        self.isQueryResident = isQueryResident
+        self.pingAttempts = []
+        self.startTime = None
+        self._cancelEvent = threading.Event()
+
+    def cancel( self ):
+        # Takes effect at the next ping or data packet, a command in flight is not waited for
+        self._cancelEvent.set()
+
+    def isCancelled( self ):
+        return self._cancelEvent.is_set()
+
+    def _sleep( self, seconds ):
+        if self._cancelEvent.wait(seconds):
+            raise connectionCancelled()
+
+    def _reportProgress( self, progress ):
+        # Raising here abandons the transfer, the ROM is left waiting for the rest of it
+        if self._cancelEvent.is_set():
+            raise connectionCancelled()
+        self.signals.progress.emit(progress)
+
+    def _waitForComPort( self, deadline ):
+        # Returns True once the port exists, or switches to a newly enumerated one
+        knownPorts = _getComPorts()
+        while time.time() < deadline:
+            ports = _getComPorts()
+            if self.uartComPort in ports:
+                return True
+            newPorts = [port for port in ports if port not in knownPorts]
+            if newPorts:
+                self.uartComPort = newPorts[0]
+                self.signals.portChanged.emit(self.uartComPort)
+                return True
+            knownPorts = ports
+            self._sleep(rundef.kBootloaderPollIntervalInMs / 1000.0)
+        return False
+
+    def _pingUntilDetected( self, bootDevice, deadline ):
+        while True:
+            if self._cancelEvent.is_set():
+                raise connectionCancelled()
+            attemptStartTime = time.time()
+            isDetected = pingBootDevice(self.tgt, bootDevice)
+            self.pingAttempts.append(time.time() - attemptStartTime)
+            if isDetected or time.time() >= deadline:
+                return isDetected
+            self._sleep(rundef.kBootloaderPollIntervalInMs / 1000.0)
+
+    def getDetectionReport( self ):
+        elapsedTime = time.time() - self.startTime
+        if not self.pingAttempts:
+            return "no ping attempts in %.2f s" % (elapsedTime)
+        return "%d ping attempts in %.2f s, %d ms each on average, %d ms at most, %d ms for the last" % \
+               (len(self.pingAttempts), elapsedTime, sum(self.pingAttempts) / len(self.pingAttempts) * 1000,
+                max(self.pingAttempts) * 1000, self.pingAttempts[-1] * 1000)
+
+    def run( self ):
+        self.startTime = time.time()
+        isDetected = False
+        loadResult = None
+        error = None
+        firmwareInfo = None
+        bootDevice = None
+        try:
+            if self.isWaitForBoard:
+                self.signals.stageChanged.emit(uidef.kConnectStage_WaitingForBoard)
+                deadline = self.startTime + rundef.kBootloaderWaitForBoardTimeoutInSeconds
+                isPortFound = self._waitForComPort(deadline)
+            else:
+                deadline = self.startTime + rundef.kBootloaderDetectTimeoutInSeconds
+                isPortFound = True
+            if isPortFound and self.isQueryResident:
+                self.signals.stageChanged.emit(uidef.kConnectStage_Handshaking)
+                firmwareInfo = uicore.queryResidentFirmware(self.uartComPort)
+            if isPortFound and firmwareInfo == None:
+                bootDevice = createBootDevice(self.tgt, self.exeTopRoot, self.uartComPort, self.uartBaudrate)
+                self.signals.stageChanged.emit(uidef.kConnectStage_Pinging)
+                isDetected = self._pingUntilDetected(bootDevice, deadline)
+            if isDetected and self.loadFunc != None:
+                self.signals.stageChanged.emit(uidef.kConnectStage_Loading)
+                bootDevice.progressCallback = self._reportProgress
+                loadResult = self.loadFunc(bootDevice)
+        except connectionCancelled:
+            pass
+        except Exception as e:
+            error = str(e)
+        finally:
+            if bootDevice != None:
+                bootDevice.close()
+        report = self.getDetectionReport()
+        self.signals.finished.emit(connectionResult(isDetected, self.isCancelled(), loadResult, report, error, firmwareInfo))
+
+# cpuDir -> (mtime in ns, size, crc32) of its boot_firmware.bin
+s_firmwareImageHashCache = {}
+# uartComPort -> (cpu, image data) last loaded there, the base of a delta download
+s_loadedImageDict = {}
+
+kGoActionCommandTagDict = {uidef.kGoAction_PinTest:      uipacket.kCommandTag_PinTest,
+                           uidef.kGoAction_ConfigSystem: uipacket.kCommandTag_ConfigSystem,
+                           uidef.kGoAction_MemRegs:      uipacket.kCommandTag_AccessMemRegs,
+                           uidef.kGoAction_RwTest:       uipacket.kCommandTag_RunRwTest,
+                           uidef.kGoAction_PerfTest:     uipacket.kCommandTag_RunPerfTest,
+                           uidef.kGoAction_StressTest:   uipacket.kCommandTag_RunStressTest,
+                          }
+
 class memTesterRun(uicore.memTesterUi):
 
     def __init__(self, parent=None):
         super(memTesterRun, self).__init__(parent)
+        self.commandTimer = QTimer(self)
+        self.commandTimer.setSingleShot(True)
+        self.commandTimer.timeout.connect(self._handleCommandTimeout)
+        self.connectionPool = QThreadPool(self)
         self.initFuncRun()
+        if rundef.kPreloadTargetsAtStartup:
+            preloadTargets(self.exeBinRoot)
 
     def initFuncRun( self ):
-        self.blhost = None
-        self.sdphost = None
         self.tgt = None
         self.cpuDir = None
-        self.sdphostVectorsDir = os.path.join(self.exeTopRoot, 'tools', 'sdphost', 'win', 'vectors')
-        self.blhostVectorsDir = os.path.join(self.exeTopRoot, 'tools', 'blhost2_6', 'win', 'vectors')
+        self.commandQueue = []
+        self.commandGoAction = None
+        self.commandTestId = None
+        self.isCommandAcked = False
+        self.commandQueueStartTime = None
+        self.commandTimer.stop()
+        self.connectionWorker = None
+        self.connectionStartTime = None
+        self.firmwareLoadDoneFunc = None
         self.createMcuTarget()
 
     def createMcuTarget( self ):
         self.tgt, self.cpuDir = createTarget(self.mcuDevice, self.exeBinRoot)
+        self.setPackedDownloadAvailable(isPackedDownloadSupported(self.tgt, self.cpuDir))
+
+    def isConnecting( self ):
+        return self.connectionWorker != None
 
-    def connectToDevice( self ):
-        # Create the target object.
+    def startConnection( self, isWaitForBoard=False, isQueryResident=False ):
+        # The pipeline runs on connectionPool and reports back through handleConnectionStage()
+        # and handleConnectionFinished(), the event loop keeps going meanwhile.
         self.createMcuTarget()
-        xhost = None
-        if self.tgt.mcuSeries == uidef.kMcuSeries_iMXRT10yy:
-            xhost = 'sdp_'
-        elif (self.tgt.mcuSeries == uidef.kMcuSeries_iMXRT11yy) or \
-             (self.tgt.mcuSeries == uidef.kMcuSeries_iMXRTxxx):
-            xhost = ''
-        else:
-            pass
+        loadFunc = None
+        self.firmwareLoadDoneFunc = None
+        if self.isLoadFirmwareEnabled:
+            loadFunc, self.firmwareLoadDoneFunc = self._prepareFirmwareLoad()
+        worker = connectionWorker(self.tgt, self.exeTopRoot, self.uartComPort, int(self.uartBaudrate), loadFunc, isWaitForBoard, isQueryResident)
+        worker.signals.stageChanged.connect(self.handleConnectionStage)
+        worker.signals.portChanged.connect(self._switchComPort)
+        worker.signals.progress.connect(self.showActionProgress)
+        worker.signals.finished.connect(self._finishConnection)
+        self.connectionWorker = worker
+        self.connectionStartTime = time.time()
+        self.comboBox_mcuDevice.setEnabled(False)
+        self.pushButton_connect.setText('Stop')
+        self.connectionPool.start(worker)
 
-        xPeripheral = xhost + 'uart'
-        uartComPort = self.uartComPort
-        uartBaudrate = int(self.uartBaudrate)
-        usbVid = ''
-        usbPid = ''
-
-        if self.tgt.mcuSeries == uidef.kMcuSeries_iMXRT10yy:
-            self.sdphost = bltest.createBootloader(self.tgt,
-                                                   self.sdphostVectorsDir,
-                                                   xPeripheral,
-                                                   uartBaudrate, uartComPort,
-                                                   usbVid, usbPid)
-        elif (self.tgt.mcuSeries == uidef.kMcuSeries_iMXRT11yy) or \
-             (self.tgt.mcuSeries == uidef.kMcuSeries_iMXRTxxx):
-            self.blhost = bltest.createBootloader(self.tgt,
-                                                  self.blhostVectorsDir,
-                                                  xPeripheral,
-                                                  uartBaudrate, uartComPort,
-                                                  usbVid, usbPid,
-                                                  True)
-        else:
-            pass
+    def stopConnection( self ):
+        # Returns at once, handleConnectionFinished() follows when the worker gets to a stop
+        if self.connectionWorker != None:
+            self.connectionWorker.cancel()
 
-    def pingRom( self ):
-        if self.tgt.mcuSeries == uidef.kMcuSeries_iMXRT10yy:
-            status, results, cmdStr = self.sdphost.errorStatus()
-            return (status == boot.status.kSDP_Status_HabEnabled or status == boot.status.kSDP_Status_HabDisabled)
-        elif (self.tgt.mcuSeries == uidef.kMcuSeries_iMXRT11yy) or \
-             (self.tgt.mcuSeries == uidef.kMcuSeries_iMXRTxxx):
-            status, results, cmdStr = self.blhost.getProperty(boot.properties.kPropertyTag_CurrentVersion)
-            return (status == boot.status.kStatus_Success)
-        else:
-            pass
+    def _switchComPort( self, uartComPort ):
+        # Wait for board mode picked up a newly enumerated port
+        self.adjustPortSetupValue()
+        self.comboBox_comPort.setCurrentIndex(self.comboBox_comPort.findText(uartComPort))
+        self.updatePortSetupValue()
 
-    def jumpToFirmware( self ):
-        if not self.isLoadFirmwareEnabled:
-            return True
+    def _finishConnection( self, result ):
+        self.connectionWorker = None
+        self.resetActionProgress()
+        self.comboBox_mcuDevice.setEnabled(True)
+        self.pushButton_connect.setText('Connect')
+        isFirmwareLoaded = False
+        if result.isDetected and not result.isCancelled and result.error == None:
+            isFirmwareLoaded = self.firmwareLoadDoneFunc(result.loadResult)
+        self.firmwareLoadDoneFunc = None
+        self.handleConnectionFinished(result, isFirmwareLoaded)
+
+    def handleConnectionStage( self, stage ):
+        self.showConnectionStage(stage)
+
+    def handleConnectionFinished( self, result, isFirmwareLoaded ):
+        pass
+
+    def getFirmwareImageHash( self ):
+        # Returns (imageSize, imageCrc32) of boot_firmware.bin, or None if there is no such file
+        firmwareBinFile = os.path.join(self.cpuDir, 'boot_firmware.bin')
+        try:
+            fileStat = os.stat(firmwareBinFile)
+        except OSError:
+            return None
+        imageHash = s_firmwareImageHashCache.get(self.cpuDir)
+        # st_mtime is a float and loses the nanoseconds, a rebuild within its resolution would be missed
+        if imageHash == None or imageHash[0] != fileStat.st_mtime_ns or imageHash[1] != fileStat.st_size:
+            with open(firmwareBinFile, 'rb') as fileObj:
+                imageCrc32 = binascii.crc32(fileObj.read()) & 0xFFFFFFFF
+            imageHash = (fileStat.st_mtime_ns, fileStat.st_size, imageCrc32)
+            s_firmwareImageHashCache[self.cpuDir] = imageHash
+        return imageHash[1], imageHash[2]
+
+    def _prepareFirmwareLoad( self ):
+        # Returns (loadFunc, doneFunc). loadFunc(bootDevice) runs on the connection worker and must
+        # not touch the GUI, doneFunc(what loadFunc returned) runs back here and returns whether
+        # the firmware is loaded.
         firmwareBinFile = os.path.join(self.cpuDir, 'boot_firmware.bin')
-        firmwareLoadAddr = self.tgt.firmwareLoadAddr
-        firmwareJumpAddr = self.tgt.firmwareJumpAddr
-        firmwareInitialSp = self.tgt.firmwareInitialSp
-        if self.tgt.mcuSeries == uidef.kMcuSeries_iMXRT10yy:
-            status, results, cmdStr = self.sdphost.writeFile(firmwareLoadAddr, firmwareBinFile)
-            if status != boot.status.kSDP_Status_HabEnabled and status != boot.status.kSDP_Status_HabDisabled:
+        if self.isPackedDownloadEnabled:
+            if isPackedDownloadSupported(self.tgt, self.cpuDir):
+                return self._preparePackedFirmwareLoad(firmwareBinFile)
+            self.showContentOnSecPacketWin(u"【  Info 】: packed download is not available for " + self.tgt.cpu + ", boot firmware is sent in full.")
+        firmwareElfFile = os.path.join(self.cpuDir, 'boot_firmware.elf')
+        if os.path.isfile(firmwareElfFile) and isElfDownloadSupported(self.tgt):
+            return self._prepareElfFirmwareLoad(firmwareElfFile)
+        tgt = self.tgt
+        def loadFunc(bootDevice):
+            return loadBootFirmware(tgt, bootDevice, firmwareBinFile)
+        def doneFunc(isLoaded):
+            if isLoaded:
+                with open(firmwareBinFile, 'rb') as fileObj:
+                    s_loadedImageDict[self.uartComPort] = (self.tgt.cpu, fileObj.read())
+            return isLoaded
+        return loadFunc, doneFunc
+
+    def _preparePackedFirmwareLoad( self, firmwareBinFile ):
+        with open(firmwareBinFile, 'rb') as fileObj:
+            imageData = fileObj.read()
+        loadedImage = s_loadedImageDict.get(self.uartComPort)
+        baseData = None
+        if loadedImage != None and loadedImage[0] == self.tgt.cpu and isDeltaDownloadSupported(self.cpuDir):
+            baseData = loadedImage[1]
+        tgt = self.tgt
+        cpuDir = self.cpuDir
+        uartComPort = self.uartComPort
+        def loadFunc(bootDevice):
+            # Packing a large image takes a while too, so it is done here rather than up front
+            packedData = boot.imagepack.getPackedImage(imageData, tgt.firmwareLoadAddr, tgt.firmwareJumpAddr, baseData)
+            isLoaded = loadPackedBootFirmware(tgt, cpuDir, bootDevice, packedData)
+            isConfirmed = None
+            if isLoaded and baseData != None:
+                # The stub refuses a delta if the base is not in memory any more, the firmware answering
+                # the handshake is the only sign it was applied. The port is the firmware's from now on.
+                bootDevice.close()
+                isConfirmed = confirmFirmwareImage(uartComPort, imageData)
+            return isLoaded, len(packedData), isConfirmed
+        def doneFunc(loadResult):
+            isLoaded, packedSize, isConfirmed = loadResult
+            # Whatever happened, the image on the board is not known any more
+            s_loadedImageDict.pop(uartComPort, None)
+            if not isLoaded:
                 return False
-            status, results, cmdStr = self.sdphost.jumpAddress(firmwareJumpAddr)
-            if status != boot.status.kSDP_Status_HabEnabled and status != boot.status.kSDP_Status_HabDisabled:
+            modeStr = u"packed"
+            if baseData != None:
+                modeStr = u"as a delta"
+            self.showContentOnSecPacketWin(u"【  Info 】: boot firmware is sent " + modeStr + u", {} bytes instead of {}.".format(packedSize, len(imageData)))
+            if isConfirmed == False:
+                self.showContentOnSecPacketWin(u"【 Error 】: boot firmware does not answer after delta download, reset board to send it in full.")
                 return False
-        elif self.tgt.mcuSeries == uidef.kMcuSeries_iMXRT11yy:
-            status, results, cmdStr = self.blhost.loadImage(firmwareBinFile)
-            if status != boot.status.kStatus_Success:
+            s_loadedImageDict[uartComPort] = (tgt.cpu, imageData)
+            return True
+        return loadFunc, doneFunc
+
+    def _prepareElfFirmwareLoad( self, firmwareElfFile ):
+        # Not a flat image, so no base for a delta download either
+        s_loadedImageDict.pop(self.uartComPort, None)
+        tgt = self.tgt
+        def loadFunc(bootDevice):
+            try:
+                loadRanges = readElfLoadRanges(firmwareElfFile)
+            except elf.ELFException as e:
+                return False, None, str(e)
+            return loadElfBootFirmware(tgt, bootDevice, loadRanges), loadRanges, None
+        def doneFunc(loadResult):
+            isLoaded, loadRanges, parseError = loadResult
+            if parseError != None:
+                self.showContentOnSecPacketWin(u"【 Error 】: boot_firmware.elf cannot be parsed, " + parseError + ".")
                 return False
-        elif self.tgt.mcuSeries == uidef.kMcuSeries_iMXRTxxx:
-            status, results, cmdStr = self.blhost.writeMemory(firmwareLoadAddr, firmwareBinFile)
-            if status != boot.status.kStatus_Success:
+            if not isLoaded:
                 return False
-            #status, results, cmdStr = self.blhost.execute(firmwareJumpAddr, 0, firmwareInitialSp)
-            #if status != boot.status.kStatus_Success:
-            #    return False
+            loadSize = sum([len(data) for address, data in loadRanges])
+            spanSize = loadRanges[-1][0] + len(loadRanges[-1][1]) - loadRanges[0][0] if loadRanges else 0
+            self.showContentOnSecPacketWin(u"【  Info 】: boot firmware is sent from ELF, {} bytes in {} ranges spanning {} bytes.".format(loadSize, len(loadRanges), spanSize))
+            return True
+        return loadFunc, doneFunc
+
+    def sendGoActionPacket( self, goAction ):
+        if goAction == uidef.kGoAction_PinTest:
+            self.sendPinTestPacket()
+        elif goAction == uidef.kGoAction_ConfigSystem:
+            if self.updateTargetSetupValue():
+                self.sendConfigSystemPacket()
+            else:
+                return False
+        elif goAction == uidef.kGoAction_MemRegs:
+            self.sendMemRegsPacket()
+        elif goAction == uidef.kGoAction_RwTest:
+            self.sendRwTestPacket()
+        elif goAction == uidef.kGoAction_PerfTest:
+            self.sendPerfTestPacket()
+        elif goAction == uidef.kGoAction_StressTest:
+            self.sendStressTestPacket()
         else:
-            pass
+            return False
+        return True
+
+    def isCommandQueueRunning( self ):
+        return self.commandGoAction != None
+
+    def runCommandQueue( self, goActions ):
+        if self.isCommandQueueRunning():
+            return False
+        self.commandQueue = list(goActions)
+        self.commandQueueStartTime = time.time()
+        self._startNextCommand()
         return True
+
+    def _startNextCommand( self ):
+        self.commandTimer.stop()
+        self.isCommandAcked = False
+        if len(self.commandQueue) == 0:
+            self.commandGoAction = None
+            self.commandTestId = None
+            self.showContentOnSecPacketWin(u"【  Info 】: Command queue is done in {:.1f}s.".format(time.time() - self.commandQueueStartTime))
+            return
+        self.commandGoAction = self.commandQueue.pop(0)
+        self.commandTestId = self._getCommandTestId(self.commandGoAction)
+        # Select the step as if its button was clicked, so that its output goes to the right window
+        self.goAction = self.commandGoAction
+        self.resetAllActionButtonColor()
+        self.setActionButtonColor(self.goAction)
+        if not self.sendGoActionPacket(self.commandGoAction):
+            self._abortCommandQueue(u"step cannot be sent")
+            return
+        self.commandTimer.start(int(uidef.kCommandAckTimeoutInSeconds * 1000))
+
+    def _getCommandTestId( self, goAction ):
+        # Test id in the done record of a perf/stress step, mbw reports its sub test
+        if goAction == uidef.kGoAction_PerfTest:
+            perfTestCfgDict = uivar.getAdvancedSettings(uidef.kAdvancedSettings_PerfTest)
+            if perfTestCfgDict['testSet'] == ui_cfg_perf_test.kPerfTestSet_Mbw:
+                return perfTestCfgDict['subTestSet']
+            return perfTestCfgDict['testSet']
+        elif goAction == uidef.kGoAction_StressTest:
+            return uivar.getAdvancedSettings(uidef.kAdvancedSettings_StressTest)['testSet']
+        return None
+
+    def _abortCommandQueue( self, reason ):
+        self.commandTimer.stop()
+        self.showContentOnSecPacketWin(u"【 Error 】: Command queue is aborted at step " + str(self.commandGoAction) + ", " + reason + ".")
+        self.commandQueue = []
+        self.commandGoAction = None
+        self.commandTestId = None
+        self.isCommandAcked = False
+
+    def stopCommandQueue( self ):
+        if not self.isCommandQueueRunning():
+            return
+        if self.isCommandAcked:
+            self.sendTestStopPacket()
+        self._abortCommandQueue(u"stopped by user")
+
+    def handleCommandAck( self, commandTag, status ):
+        if not self.isCommandQueueRunning() or self.isCommandAcked or \
+           commandTag != kGoActionCommandTagDict[self.commandGoAction]:
+            return
+        if status != uipacket.kAckStatus_Success:
+            self._abortCommandQueue(u"firmware returns status " + str(status))
+            return
+        self.isCommandAcked = True
+        if self.commandGoAction in uidef.kCommandDoneTimeoutInSecondsDict:
+            self.commandTimer.start(int(uidef.kCommandDoneTimeoutInSecondsDict[self.commandGoAction] * 1000))
+        else:
+            self._startNextCommand()
+
+    def handleTestDone( self, record ):
+        # A late record of an earlier or timed out step must not complete the current one
+        if not self.isCommandQueueRunning() or not self.isCommandAcked or \
+           not (self.commandGoAction in uidef.kCommandDoneTimeoutInSecondsDict) or \
+           record.testId != self.commandTestId:
+            return
+        self.showTestResultSummary()
+        self._startNextCommand()
+
+    def _handleCommandTimeout( self ):
+        if not self.isCommandQueueRunning():
+            return
+        if self.isCommandAcked:
+            self.sendTestStopPacket()
+            self._abortCommandQueue(u"test is not done in time")
+        else:
+            self._abortCommandQueue(u"no ack from firmware")
@@ -9,4 +9,12 @@ import sys, os
 kUartSpeed_Blhost  = ['115200', '57600', '19200', '9600', '4800']
 kUartSpeed_Sdphost = ['115200']
 
+# Bootloader detection on connect, one ping attempt every poll interval until the deadline
+kBootloaderPingTimeoutInSeconds = 0.05
+kBootloaderPollIntervalInMs = 30
+kBootloaderDetectTimeoutInSeconds = 3
+# Wait for board mode also waits for the COM port to show up
+kBootloaderWaitForBoardTimeoutInSeconds = 60
 
+# Build the targets of all devices in the background at startup, device switching is then a lookup
+kPreloadTargetsAtStartup = True
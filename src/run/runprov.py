@@ -0,0 +1,103 @@
+#! /usr/bin/env python
+# -*- coding: utf-8 -*-
+
+# Copyright 2022 NXP
+# All rights reserved.
+#
+# SPDX-License-Identifier: BSD-3-Clause
+
+import sys
+import os
+import time
+import collections
+import concurrent.futures
+from . import runcore
+from . import rundef
+sys.path.append(os.path.abspath(".."))
+from ui import uidef
+
+kProvisionStage_Ping = 'ping'
+kProvisionStage_Load = 'load'
+kProvisionStage_Done = 'done'
+
+# One row of the provisioning table, stage is where the board stopped
+provisionResult = collections.namedtuple('provisionResult', ['port', 'device', 'isSuccess', 'stage', 'message',
+                                                             'pingSeconds', 'loadSeconds', 'totalSeconds'])
+
+def provisionBoard(port, device, tgt, cpuDir, exeTopRoot, baudrate=uidef.kUartBaudrate_Default, firmwareBinFile=None,
+                   detectTimeout=rundef.kBootloaderDetectTimeoutInSeconds):
+    # Ping the ROM on port until it answers, then load and start the firmware, with its own bootloader object
+    startTime = time.time()
+    if firmwareBinFile == None:
+        firmwareBinFile = os.path.join(cpuDir, 'boot_firmware.bin')
+    stage = kProvisionStage_Ping
+    message = ''
+    pingSeconds = None
+    loadSeconds = None
+    bootDevice = runcore.createBootDevice(tgt, exeTopRoot, port, baudrate)
+    if bootDevice == None:
+        return provisionResult(port, device, False, stage, 'unsupported MCU series', None, None, time.time() - startTime)
+    try:
+        deadline = startTime + detectTimeout
+        while True:
+            isDetected = runcore.pingBootDevice(tgt, bootDevice)
+            if isDetected or time.time() >= deadline:
+                break
+            time.sleep(rundef.kBootloaderPollIntervalInMs / 1000.0)
+        pingSeconds = time.time() - startTime
+        if not isDetected:
+            message = 'no answer from ROM'
+        elif not os.path.isfile(firmwareBinFile):
+            message = 'missing ' + firmwareBinFile
+        else:
+            stage = kProvisionStage_Load
+            loadStartTime = time.time()
+            if runcore.loadBootFirmware(tgt, bootDevice, firmwareBinFile):
+                stage = kProvisionStage_Done
+            else:
+                message = 'firmware is not loaded'
+            loadSeconds = time.time() - loadStartTime
+    except Exception as e:
+        # One broken board must not take the rest of the rack down with it
+        message = str(e)
+    finally:
+        bootDevice.close()
+    return provisionResult(port, device, stage == kProvisionStage_Done, stage, message,
+                           pingSeconds, loadSeconds, time.time() - startTime)
+
+def provisionBoards(boards, exeBinRoot, exeTopRoot, baudrate=uidef.kUartBaudrate_Default, firmwareBinFile=None,
+                    maxWorkers=None):
+    # boards is a list of (port, device), all of them are pinged and loaded at the same time.
+    # Returns ([provisionResult] in the order of boards, wall time in seconds).
+    startTime = time.time()
+    # Target configs are scripts, run them once per device before the workers start
+    targetDict = {}
+    for port, device in boards:
+        if device not in targetDict:
+            targetDict[device] = runcore.createTarget(device, exeBinRoot)
+    if maxWorkers == None:
+        maxWorkers = max(1, len(boards))
+    with concurrent.futures.ThreadPoolExecutor(max_workers=maxWorkers) as executor:
+        futures = []
+        for port, device in boards:
+            tgt, cpuDir = targetDict[device]
+            futures.append(executor.submit(provisionBoard, port, device, tgt, cpuDir, exeTopRoot, baudrate, firmwareBinFile))
+        results = [future.result() for future in futures]
+    return results, time.time() - startTime
+
+def _formatSeconds(seconds):
+    if seconds == None:
+        return '-'
+    return '%.2f' % seconds
+
+def formatProvisionTable(results, wallSeconds):
+    rows = [('Port', 'Device', 'Result', 'Stage', 'Ping(s)', 'Load(s)', 'Total(s)', 'Message')]
+    for result in results:
+        rows.append((result.port, result.device, 'PASS' if result.isSuccess else 'FAIL', result.stage,
+                     _formatSeconds(result.pingSeconds), _formatSeconds(result.loadSeconds),
+                     _formatSeconds(result.totalSeconds), result.message))
+    widths = [max([len(row[idx]) for row in rows]) for idx in range(len(rows[0]))]
+    lines = ['  '.join([row[idx].ljust(widths[idx]) for idx in range(len(row))]).rstrip() for row in rows]
+    passed = len([result for result in results if result.isSuccess])
+    lines.append('%d of %d boards provisioned in %.2f s' % (passed, len(results), wallSeconds))
+    return '\n'.join(lines)
@@ -46,6 +46,10 @@ uartPeripheralPinStr = 'LPUART1 - GPIO_AD_B0[13:12]'
 firmwareLoadAddr = 0x00001e00
 firmwareJumpAddr = 0x00001e00
 firmwareInitialSp = None
+# Decompressor stub (IVT at its start) in DTCM, packed image in OCRAM above the ROM reserved region
+decompressorLoadAddr = 0x20000000
+decompressorJumpAddr = 0x20000000
+packedImageLoadAddr = 0x20208000
 availableCommands = 0x5EFDF
 supportedPeripheralSpeed_uart = [4800, 9600, 19200, 57600, 115200] # @todo Verify
 
@@ -46,6 +46,10 @@ uartPeripheralPinStr = 'Flexcomm0 UART - PIO0[2:1]'
 firmwareLoadAddr = 0x00080000
 firmwareJumpAddr = 0x00083175
 firmwareInitialSp = 0x20300000
+# Decompressor stub (Thumb entry at its start) and packed image in SRAM, clear of the firmware
+decompressorLoadAddr = 0x00040000
+decompressorJumpAddr = 0x00040001
+packedImageLoadAddr = 0x00200000
 availableCommands = 0x5EFDF
 supportedPeripheralSpeed_uart = [4800, 9600, 19200, 57600, 115200] # @todo Verify
 
@@ -0,0 +1,134 @@
+#! /usr/bin/env python
+# -*- coding: utf-8 -*-
+
+# Copyright 2022 NXP
+# All rights reserved.
+#
+# SPDX-License-Identifier: BSD-3-Clause
+
+import sys
+import os
+import time
+import math
+from . import uidef
+from . import uipacket
+
+kBulkState_Idle     = 0
+kBulkState_Starting = 1
+kBulkState_Sending  = 2
+kBulkState_Done     = 3
+kBulkState_Failed   = 4
+
+# Enough chunks in flight to keep the line busy for one ack round trip at this baudrate
+def get_bulk_window_chunks( baudrate, chunkSize=uidef.kBulkChunkSize ):
+    bytesPerRoundTrip = baudrate / 10.0 * uidef.kBulkRoundTripInSeconds
+    return max(2, min(uidef.kBulkMaxWindowChunks, int(math.ceil(bytesPerRoundTrip / chunkSize)) + 1))
+
+# Go-back-N sender: up to windowChunks chunks are sent ahead of the offset acked by firmware.
+# A nak or a timeout rewinds to the acked offset. After a failure the transfer can be resumed,
+# firmware answers the start packet with the offset it already has.
+class bulkTransfer(object):
+
+    def __init__( self, writeFunc, transferId, dataType, data, baudrate=uidef.kUartBaudrate_Default,
+                  chunkSize=uidef.kBulkChunkSize, windowChunks=None, clock=time.time ):
+        self.writeFunc = writeFunc
+        self.transferId = transferId
+        self.dataType = dataType
+        self.data = bytes(data)
+        self.baudrate = baudrate
+        self.chunkSize = chunkSize
+        if windowChunks == None:
+            windowChunks = get_bulk_window_chunks(baudrate, chunkSize)
+        self.windowChunks = windowChunks
+        self.clock = clock
+        self.state = kBulkState_Idle
+        self.ackedOffset = 0
+        self.sendOffset = 0
+        self.nakOffset = None
+        self.timeouts = 0
+        self.deadline = None
+        self.startTime = None
+        self.statsDict = {'chunks':0, 'resentChunks':0, 'naks':0, 'timeouts':0}
+
+    def isDone( self ):
+        return self.state == kBulkState_Done
+
+    def isFailed( self ):
+        return self.state == kBulkState_Failed
+
+    def isActive( self ):
+        return self.state == kBulkState_Starting or self.state == kBulkState_Sending
+
+    def start( self ):
+        # Also used to resume, the acked offset is taken from the firmware reply
+        self.state = kBulkState_Starting
+        self.timeouts = 0
+        self.nakOffset = None
+        if self.startTime == None:
+            self.startTime = self.clock()
+        self._sendStart()
+
+    def _sendStart( self ):
+        mypacket = uipacket.bulkStartPacket()
+        mypacket.set_members(self.transferId, self.dataType, self.chunkSize, self.data)
+        self._armDeadline(0)
+        self.writeFunc(mypacket.out_bytes())
+
+    def _armDeadline( self, bytesInFlight ):
+        self.deadline = self.clock() + uidef.kBulkAckTimeoutInSeconds + bytesInFlight * 10.0 / self.baudrate
+
+    def _fillWindow( self ):
+        windowEnd = min(len(self.data), self.ackedOffset + self.windowChunks * self.chunkSize)
+        self._armDeadline(windowEnd - self.ackedOffset)
+        while self.sendOffset < windowEnd:
+            # Advance first, writeFunc may deliver an ack before it returns
+            chunkStart = self.sendOffset
+            self.sendOffset = min(chunkStart + self.chunkSize, len(self.data))
+            self.statsDict['chunks'] += 1
+            self.writeFunc(uipacket.encode_bulk_data_packet(self.transferId, chunkStart, self.data[chunkStart:self.sendOffset]))
+
+    def _rewind( self ):
+        self.statsDict['resentChunks'] += int(math.ceil((self.sendOffset - self.ackedOffset) / float(self.chunkSize)))
+        self.sendOffset = self.ackedOffset
+        self._fillWindow()
+
+    def handleAck( self, transferId, status, nextOffset ):
+        if not self.isActive() or transferId != self.transferId:
+            return
+        if status == uipacket.kBulkStatus_Rejected or nextOffset > len(self.data):
+            self.state = kBulkState_Failed
+            return
+        if self.state == kBulkState_Starting:
+            # Whatever firmware already has from an earlier attempt is not sent again
+            self.state = kBulkState_Sending
+            self.ackedOffset = nextOffset
+            self.sendOffset = nextOffset
+        elif nextOffset > self.ackedOffset:
+            self.ackedOffset = nextOffset
+            self.timeouts = 0
+        if self.ackedOffset == len(self.data):
+            self.state = kBulkState_Done
+            self.deadline = None
+            return
+        if status != uipacket.kBulkStatus_Success:
+            # Chunks after a bad one are all naked too, rewind once per offset
+            self.statsDict['naks'] += 1
+            if self.nakOffset != nextOffset:
+                self.nakOffset = nextOffset
+                self._rewind()
+            return
+        self._fillWindow()
+
+    def poll( self ):
+        if not self.isActive() or self.clock() < self.deadline:
+            return
+        self.timeouts += 1
+        self.statsDict['timeouts'] += 1
+        if self.timeouts > uidef.kBulkMaxTimeouts:
+            # ackedOffset is kept, start() resumes from there
+            self.state = kBulkState_Failed
+        elif self.state == kBulkState_Starting:
+            self._sendStart()
+        else:
+            self.nakOffset = None
+            self._rewind()
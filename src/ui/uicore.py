@@ -8,24 +8,23 @@
 
 import sys
 import os
-import serial.tools.list_ports
+import time
+import hashlib
+import collections
+import serial
 from PyQt5.Qt import *
 from PyQt5.QtWidgets import *
 from PyQt5.QtCore import *
 from PyQt5.QtGui import *
 
-import matplotlib
-matplotlib.use("Qt5Agg")
-from matplotlib.backends.backend_qt5agg import FigureCanvasQTAgg as FigureCanvas
-from matplotlib.figure import Figure
-import matplotlib.pyplot as plt
-import matplotlib.animation as animation
-
 from . import uidef
 from . import uilang
 from . import uivar
 from . import uilut
 from . import uipacket
+from . import uiuart
+from . import uilink
+from . import uimodel
 from . import ui_def_flexspi_conn_rt500
 from . import ui_def_flexspi_conn_rt600
 from . import ui_def_xspi_conn_rt700
@@ -38,30 +37,17 @@ from boot import model
 from utils import misc
 
 s_serialPort = serial.Serial()
-s_recvInterval = 1
+s_recvTimeout = 0.02
 s_recvPinWave = [0] * 100
-s_isRecvAsciiMode = True
-s_recvUartMagic = ""
-
-def createModel(modelDescFile):
-    # Check for model file existence.
-    if not os.path.isfile(modelDescFile):
-        raise RuntimeError("Missing model file at path %s" % modelDescFile)
-
-    # Build locals dict by copying our locals and adjusting file path and name.
-    modelDesc = locals().copy()
-    modelDesc['__file__'] = modelDescFile
-
-    # Execute the model desc script.
-    misc.execfile(modelDescFile, globals(), modelDesc)
-
-    # Create the model object.
-    mdl = model.Model(**modelDesc)
-
-    return mdl
+s_uartPrintParser = uiuart.uartPrintParser()
+# Output the firmware sends inside reliable link data frames
+s_uartLinkPrintParser = uiuart.uartPrintParser()
+s_uartLink = uilink.reliableLink(s_serialPort.write)
+# fingerprint -> (packet bytes, mem model, mem lut), most recently used last
+s_configSystemPacketCache = collections.OrderedDict()
 
 class uartRecvWorker(QThread):
-    sinOut = pyqtSignal()
+    sinOut = pyqtSignal(bytes)
 
     def __init__(self, parent=None):
         super(uartRecvWorker, self).__init__(parent)
@@ -70,32 +56,53 @@ class uartRecvWorker(QThread):
     def __del__(self):
         self.working = False
 
+    def start(self):
+        # Armed here rather than in run(), so a stop() issued right after start() is not lost
+        self.working = True
+        super(uartRecvWorker, self).start()
+
+    def stop(self):
+        self.working = False
+        self.wait()
+
     def run(self):
-        while self.working == True:
-            self.sinOut.emit()
-            self.sleep(s_recvInterval)
-
-class pinWaveformFigure(FigureCanvas):
-
-    def __init__(self,width=5, height=4, dpi=100):
-        self.fig = Figure(figsize=(width, height), dpi=dpi)
-        super(pinWaveformFigure,self).__init__(self.fig)
-        self.axes = self.fig.add_subplot(111)
-        self.axes.set_xlabel('Time(ms)')
-        self.axes.set_ylabel('Volt(3.3V)')
-        self.axes.set_ylim(0,1.1)
-        self.plotwave()
-        self.ani = animation.FuncAnimation(self.fig, self.animate, interval=1000, blit=True, save_count=50)
-
-    def plotwave(self):
-        self.line, = self.axes.plot(s_recvPinWave)
-
-    def animate(self, i):
-        #global s_recvPinWave
-        #for i in range(len(s_recvPinWave)):
-        #    s_recvPinWave[i] = (int(i/10) % 2)
-        self.line.set_ydata(s_recvPinWave)
-        return self.line,
+        # Block on the port (bounded by s_recvTimeout) rather than waking on a fixed
+        # interval, so every chunk is handed to the GUI as soon as it arrives.
+        while self.working and s_serialPort.isOpen():
+            try:
+                data = s_serialPort.read(1)
+                if data:
+                    num = s_serialPort.in_waiting
+                    if num:
+                        data += s_serialPort.read(num)
+            except Exception:
+                break
+            if data:
+                self.sinOut.emit(data)
+
+# Returns (firmwareVersion, imageSize, imageCrc32) if firmware is already running on the board, or None.
+# Only the default rate is tried, closeUartPort() switches firmware back to it. A port of its own is
+# opened, so this can run on the connection worker while s_serialPort belongs to the GUI.
+def queryResidentFirmware( uartComPort ):
+    try:
+        serialPort = serial.Serial(uartComPort, uidef.kUartBaudrate_Default, timeout=s_recvTimeout)
+    except:
+        return None
+    try:
+        serialPort.reset_input_buffer()
+        mypacket = uipacket.handshakePacket()
+        mypacket.set_members()
+        serialPort.write(mypacket.out_buffer())
+        frameData = b''
+        deadline = time.time() + uidef.kFirmwareHandshakeTimeoutInSeconds
+        while time.time() < deadline:
+            frameData += serialPort.read(max(1, serialPort.in_waiting))
+            firmwareInfo = uipacket.find_handshake_frame(frameData)
+            if firmwareInfo != None:
+                return firmwareInfo
+        return None
+    finally:
+        serialPort.close()
 
 class memTesterUi(QMainWindow, memTesterWin.Ui_memTesterWin):
 
@@ -103,7 +110,25 @@ class memTesterUi(QMainWindow, memTesterWin.Ui_memTesterWin):
         super(memTesterUi, self).__init__(parent)
         self.setupUi(self)
         self.uartRecvThread = uartRecvWorker()
-        self.uartRecvThread.sinOut.connect(self.receiveUartData)
+        self.uartRecvThread.sinOut.connect(self.receiveUartData, Qt.QueuedConnection)
+        self.menuToolsAction_runTestPlan = QAction(u"Run Test Plan", self)
+        self.menuTools.addAction(self.menuToolsAction_runTestPlan)
+        self.menuToolsAction_reliableLink = QAction(u"Reliable UART Link", self)
+        self.menuToolsAction_reliableLink.setCheckable(True)
+        self.menuTools.addAction(self.menuToolsAction_reliableLink)
+        self.isReliableLinkEnabled = False
+        self.menuToolsAction_waitForBoard = QAction(u"Wait For Board On Connect", self)
+        self.menuToolsAction_waitForBoard.setCheckable(True)
+        self.menuTools.addAction(self.menuToolsAction_waitForBoard)
+        self.isWaitForBoardEnabled = False
+        # Off by default, boot_decompressor.bin is not shipped and has to be built for each MCU
+        self.menuToolsAction_packedDownload = QAction(u"Packed Firmware Download (needs boot_decompressor.bin)", self)
+        self.menuToolsAction_packedDownload.setCheckable(True)
+        self.menuToolsAction_packedDownload.setChecked(False)
+        self.menuTools.addAction(self.menuToolsAction_packedDownload)
+        self.isPackedDownloadEnabled = False
+        self.uartLinkTimer = QTimer(self)
+        self.uartLinkTimer.timeout.connect(self.pollUartLink)
 
         self.exeBinRoot = os.getcwd()
         self.exeTopRoot = os.path.dirname(self.exeBinRoot)
@@ -111,6 +136,9 @@ class memTesterUi(QMainWindow, memTesterWin.Ui_memTesterWin):
         if not os.path.isfile(exeMainFile):
             self.exeTopRoot = os.path.dirname(os.path.dirname(os.path.dirname(__file__)))
         self.memModelRoot = os.path.join(os.path.dirname(self.exeBinRoot), 'src', 'targets', 'mem_model')
+        # Model scripts are run once here, later lookups do not touch the files
+        self.memModelRegistry = uimodel.memModelRegistry(self.memModelRoot, os.path.join(self.exeTopRoot, 'bin', 'mem_model_cache.json'))
+        self.memModelRegistry.refresh()
         uivar.setRuntimeSettings(None, self.exeTopRoot)
         uivar.initVar(os.path.join(self.exeTopRoot, 'bin', 'mtu_settings.json'))
         toolCommDict = uivar.getAdvancedSettings(uidef.kAdvancedSettings_Tool)
@@ -130,10 +158,15 @@ class memTesterUi(QMainWindow, memTesterWin.Ui_memTesterWin):
         self.memLut = []
         self.memPropertyDict = None
 
-        self.pinWaveFig = pinWaveformFigure(width=2, height=4, dpi=50)
-        self.pinWaveFig.plotwave()
+        # The canvas is built by showPinWaveform() when pin test is first used
+        self.pinWaveFig = None
         self.pinWaveGridlayout = QGridLayout(self.groupBox_pinWaveform)
-        self.pinWaveGridlayout.addWidget(self.pinWaveFig,0,0)
+
+    def showPinWaveform( self ):
+        if self.pinWaveFig == None:
+            from . import uiwave
+            self.pinWaveFig = uiwave.pinWaveformFigure(s_recvPinWave, width=2, height=4, dpi=50)
+            self.pinWaveGridlayout.addWidget(self.pinWaveFig,0,0)
 
     def initToolMenu( self ):
         self.loadFwActionGroup = QActionGroup(self)
@@ -159,9 +192,30 @@ class memTesterUi(QMainWindow, memTesterWin.Ui_memTesterWin):
         self.isShowCmdPacketEnabled = self.menuShowCmdPacket_Yes.isChecked()
         self.toolCommDict['cmdPacketShowEn'] = self.isShowCmdPacketEnabled
 
+    def setReliableLinkOpt( self ):
+        # Firmware must be built with the reliable link, it is not negotiated
+        self.isReliableLinkEnabled = self.menuToolsAction_reliableLink.isChecked()
+        s_uartLink.reset()
+
+    def setWaitForBoardOpt( self ):
+        self.isWaitForBoardEnabled = self.menuToolsAction_waitForBoard.isChecked()
+
+    def setPackedDownloadOpt( self ):
+        # boot_decompressor.bin is loaded first and expands the compressed firmware on target
+        self.isPackedDownloadEnabled = self.menuToolsAction_packedDownload.isChecked() and \
+                                       self.menuToolsAction_packedDownload.isEnabled()
+
+    def setPackedDownloadAvailable( self, isAvailable ):
+        # Greyed out while the current MCU has no boot_decompressor.bin, the check mark is kept for later
+        self.menuToolsAction_packedDownload.setEnabled(isAvailable)
+        self.setPackedDownloadOpt()
+
     def initFuncUi( self ):
         self.uartComPort = None
         self.uartBaudrate = None
+        self.uartRecvErrorChars = 0
+        self.testResultRecords = []
+        self.lutReadEstimate = None
         self.setPortSetupValue()
 
     def showAboutMessage( self, myTitle, myContent):
@@ -175,6 +229,7 @@ class memTesterUi(QMainWindow, memTesterWin.Ui_memTesterWin):
 
     def adjustPortSetupValue( self ):
         # Auto detect available ports
+        import serial.tools.list_ports
         comports = list(serial.tools.list_ports.comports())
         ports = [None] * len(comports)
         for i in range(len(comports)):
@@ -316,82 +371,146 @@ class memTesterUi(QMainWindow, memTesterWin.Ui_memTesterWin):
         s_serialPort.bytesizes = serial.EIGHTBITS
         s_serialPort.stopbits = serial.STOPBITS_ONE
         s_serialPort.parity = serial.PARITY_NONE
+        s_serialPort.timeout = s_recvTimeout
         try:
             s_serialPort.open()
         except:
             QMessageBox.information(self, 'Port Error', 'Com Port cannot opened!')
             return
-        s_serialPort.set_buffer_size(rx_size=1024 * 16)
+        # Only the win32 backend lets us size the driver buffer.
+        if hasattr(s_serialPort, 'set_buffer_size'):
+            s_serialPort.set_buffer_size(rx_size=1024 * 16)
         s_serialPort.reset_input_buffer()
         s_serialPort.reset_output_buffer()
+        self._negotiateUartBaudrate([baudrate for baudrate in uidef.kUartBaudrateNegotiationList if baudrate > s_serialPort.baudrate])
+        s_uartPrintParser.reset()
+        s_uartLinkPrintParser.reset()
+        s_uartLink.reset()
+        s_uartLink.baudrate = s_serialPort.baudrate
+        # A new connection may be a different board, the first config is built from the files again
+        s_configSystemPacketCache.clear()
         self.uartRecvThread.start()
+        self.uartLinkTimer.start(uidef.kUartLinkPollIntervalInMs)
         self.pushButton_connect.setText('Reset')
         self.pushButton_connect.setStyleSheet("background-color: green")
 
+    def _waitForUartAck( self, commandTag ):
+        ackData = b''
+        deadline = time.time() + uidef.kUartAckTimeoutInSeconds
+        while time.time() < deadline:
+            ackData += s_serialPort.read(max(1, s_serialPort.in_waiting))
+            status = uipacket.find_ack_status(ackData, commandTag)
+            if status != None:
+                return status
+        return None
+
+    def _sendUartBaudratePacket( self, baudrate, isConfirm ):
+        mypacket = uipacket.uartBaudratePacket()
+        mypacket.set_members(baudrate, isConfirm)
+        s_serialPort.reset_input_buffer()
+        s_serialPort.write(mypacket.out_buffer())
+        return self._waitForUartAck(mypacket.commandTag)
+
+    def _negotiateUartBaudrate( self, baudrates, isNoAckFatal=True ):
+        # Must be called while uartRecvThread is stopped, as it reads the acks itself.
+        baseBaudrate = s_serialPort.baudrate
+        self.uartRecvErrorChars = 0
+        for baudrate in baudrates:
+            if baudrate == baseBaudrate:
+                continue
+            status = self._sendUartBaudratePacket(baudrate, False)
+            if status == None and isNoAckFatal:
+                # Firmware does not know the negotiation packet, stay where we are.
+                break
+            elif status != uipacket.kAckStatus_Success:
+                continue
+            s_serialPort.baudrate = baudrate
+            if self._sendUartBaudratePacket(baudrate, True) == uipacket.kAckStatus_Success:
+                self.showContentOnSecPacketWin(u"【  Info 】: UART link is switched to " + str(baudrate) + " bps.")
+                return baudrate
+            s_serialPort.baudrate = baseBaudrate
+            time.sleep(uidef.kUartBaudrateRevertTimeInSeconds)
+            s_serialPort.reset_input_buffer()
+        return baseBaudrate
+
+    def fallBackUartBaudrate( self ):
+        currentBaudrate = s_serialPort.baudrate
+        if currentBaudrate <= uidef.kUartBaudrate_Default:
+            return
+        self.showContentOnSecPacketWin(u"【  Info 】: Too many UART errors at " + str(currentBaudrate) + " bps, try a lower rate.")
+        lowerBaudrates = [baudrate for baudrate in uidef.kUartBaudrateNegotiationList if baudrate < currentBaudrate]
+        self.uartRecvThread.stop()
+        self._negotiateUartBaudrate(lowerBaudrates + [uidef.kUartBaudrate_Default], False)
+        s_uartPrintParser.reset()
+        s_uartLinkPrintParser.reset()
+        s_uartLink.baudrate = s_serialPort.baudrate
+        self.uartRecvThread.start()
+
     def closeUartPort ( self ):
         if s_serialPort.isOpen():
+            self.uartLinkTimer.stop()
+            self.uartRecvThread.stop()
+            # So that a later handshake at the default rate still finds the firmware if the board is not reset
+            self._negotiateUartBaudrate([uidef.kUartBaudrate_Default], False)
             s_serialPort.close()
-            self.uartRecvThread.quit()
             self.pushButton_connect.setText('Connect')
             self.pushButton_connect.setStyleSheet("background-color: grey")
 
-    def _findUartPrintSwitchMagic( self, uartData, magic ):
-        global s_recvUartMagic
-        status = None
-        string = ""
-        try:
-            string += uartData.decode('utf-8')
-            if len(string) > len(magic):
-                status = False
-            elif string in magic:
-                status = True
-                s_recvUartMagic += string
+    def receiveUartData( self, data ):
+        if s_serialPort.isOpen():
+            if len(data) != 0:
+                #self.showContentOnMainDisplayWin('Get {:} bytes from UART\r\n'.format(len(data)))
+                self._handleUartPrintEvents(s_uartPrintParser.feed(data))
+                if self.uartRecvErrorChars >= uidef.kUartErrorCharsToFallBack:
+                    self.fallBackUartBaudrate()
+
+    def _handleUartPrintEvents( self, events ):
+        for event, value in events:
+            if event == uiuart.kUartPrintEvent_Text:
+                self.showStreamOnMainDisplayWin(value)
+                self.uartRecvErrorChars += value.count(u'\ufffd')
+            elif event == uiuart.kUartPrintEvent_Result:
+                self.testResultRecords.append(value)
+                self.showContentOnMainDisplayWin(uipacket.format_result_record(value, self._getLutReadLimit()))
+                if value.metric == uipacket.kResultMetric_TestDone:
+                    self.handleTestDone(value)
+            elif event == uiuart.kUartPrintEvent_Ack:
+                self.handleCommandAck(value[0], value[1])
+            elif event == uiuart.kUartPrintEvent_LinkFrame:
+                # Payloads of data frames are firmware output like the unwrapped stream, they
+                # get a parser of their own as the raw stream may hold back a partial tag
+                for payload in s_uartLink.handleFrame(value):
+                    self._handleUartPrintEvents(s_uartLinkPrintParser.feed(payload))
+            elif event == uiuart.kUartPrintEvent_LinkError:
+                s_uartLink.handleBadFrame()
+            elif event == uiuart.kUartPrintEvent_PinSamples:
+                global s_recvPinWave
+                # To show square, every conv result will repeat 5 times in s_recvPinWave
+                for i in range(len(s_recvPinWave)):
+                    s_recvPinWave[i] = value[int(i/5)]
+                self.showPinWaveform()
             else:
-                status = False
-        except:
-            pass
-        return status, string
+                pass
 
-    def receiveUartData( self ):
-        global s_isRecvAsciiMode
-        global s_recvUartMagic
-        if s_serialPort.isOpen():
-            num = s_serialPort.inWaiting()
-            if num != 0:
-                #self.showContentOnMainDisplayWin('Get {:} bytes from UART\r\n'.format(num))
-                data = s_serialPort.read(num)
-                if not s_isRecvAsciiMode:
-                    status, string = self._findUartPrintSwitchMagic(data, "Switch_To_ASCII_Mode")
-                    if status:
-                        if s_recvUartMagic == "Switch_To_ASCII_Mode":
-                            s_isRecvAsciiMode = True
-                            s_recvUartMagic = ""
-                            #self.showContentOnMainDisplayWin("  __it is ascii mode")
-                    else:
-                        global s_recvPinWave
-                        # We just use first 20 conv result each time
-                        if num >= 20:
-                            # To show square, every conv reslur will repeat 5 times in s_recvPinWave
-                            for i in range(len(s_recvPinWave)):
-                                s_recvPinWave[i] = data[int(i/5)]
-                        #self.showContentOnMainDisplayWin("  __it is in hex mode output")
-                    return
-                else:
-                    status, string = self._findUartPrintSwitchMagic(data, "Switch_To_HEX8B_Mode")
-                    if status:
-                        if s_recvUartMagic == "Switch_To_HEX8B_Mode":
-                            s_isRecvAsciiMode = False
-                            s_recvUartMagic = ""
-                            #self.showContentOnMainDisplayWin("  __it is hex mode")
-                    else:
-                         self.showContentOnMainDisplayWin(string)
+    def pollUartLink( self ):
+        for payload in s_uartLink.poll():
+            self.showContentOnSecPacketWin(u"【 Error 】: Cmd packet " + hex(payload[4]) + " is dropped, no ack from firmware after " + str(s_uartLink.maxRetransmits) + " retransmits.")
+
+    def handleCommandAck( self, commandTag, status ):
+        pass
+
+    def handleTestDone( self, record ):
+        pass
 
     def sendUartData( self , byteList ):
         if s_serialPort.isOpen():
             #num = s_serialPort.out_waiting()
             #while num != 0:
             #    num = s_serialPort.out_waiting()
-            s_serialPort.write(byteList)
+            if self.isReliableLinkEnabled:
+                s_uartLink.send(byteList)
+            else:
+                s_serialPort.write(byteList)
             if self.isShowCmdPacketEnabled:
                 packetStr = ''
                 for i in range(len(byteList)):
@@ -403,38 +522,96 @@ class memTesterUi(QMainWindow, memTesterWin.Ui_memTesterWin):
     def sendPinTestPacket( self ):
         mypacket = uipacket.pinTestPacket()
         mypacket.set_members()
-        self.sendUartData(mypacket.out_bytes())
+        self.sendUartData(mypacket.out_buffer())
+
+    def _getConfigSystemFingerprint( self ):
+        # Everything configSystemPacket is built from, plus the model file stamp so that edits are picked up
+        self.memChip = self.comboBox_memChip.currentText()
+        entry = self.memModelRegistry.getEntry(self.memVendor, self.memType, self.memChip)
+        modelStamp = None
+        if entry != None:
+            modelStamp = entry['stamp']
+        settings = [self.memVendor, self.memType, self.memChip, modelStamp, sorted(self.toolCommDict.items())]
+        for settingsType in [uidef.kAdvancedSettings_Tool, uidef.kAdvancedSettings_Conn, uidef.kAdvancedSettings_PadCtrl]:
+            settings.append(sorted(uivar.getAdvancedSettings(settingsType).items()))
+        return hashlib.sha1(repr(settings).encode('utf-8')).hexdigest()
 
     def sendConfigSystemPacket( self ):
-        self.getMemUserSettings()
-        mypacket = uipacket.configSystemPacket(self.memLut, self.memModel.memPropertyDict)
-        mypacket.set_members(self.toolCommDict)
-        self.sendUartData(mypacket.out_bytes())
+        self._updateMemUserSettings()
+        fingerprint = self._getConfigSystemFingerprint()
+        if fingerprint in s_configSystemPacketCache:
+            s_configSystemPacketCache.move_to_end(fingerprint)
+            packetBytes, self.memModel, self.memLut = s_configSystemPacketCache[fingerprint]
+        else:
+            self._getMemChipInfo()
+            mypacket = uipacket.configSystemPacket(self.memLut, self.memModel.memPropertyDict)
+            mypacket.set_members(self.toolCommDict)
+            packetBytes = mypacket.out_bytes()
+            s_configSystemPacketCache[fingerprint] = (packetBytes, self.memModel, self.memLut)
+            if len(s_configSystemPacketCache) > uidef.kConfigSystemPacketCacheSize:
+                s_configSystemPacketCache.popitem(last=False)
+        self.sendUartData(packetBytes)
 
     def sendMemRegsPacket( self ):
         mypacket = uipacket.memRegsPacket()
         mypacket.set_members()
-        self.sendUartData(mypacket.out_bytes())
+        self.sendUartData(mypacket.out_buffer())
 
     def sendRwTestPacket( self ):
         mypacket = uipacket.rwTestPacket()
         mypacket.set_members()
-        self.sendUartData(mypacket.out_bytes())
+        self.sendUartData(mypacket.out_buffer())
 
     def sendPerfTestPacket( self ):
+        self.testResultRecords = []
+        self.showLutReadEstimate()
         mypacket = uipacket.perfTestPacket()
         mypacket.set_members()
-        self.sendUartData(mypacket.out_bytes())
+        self.sendUartData(mypacket.out_buffer())
+
+    def showLutReadEstimate( self ):
+        # Theoretical limit of the READ sequence as last configured, mbw results are shown against it
+        if self.toolCommDict['enablePrefetch']:
+            burstSize = self.toolCommDict['prefetchBufSizeInByte']
+        else:
+            burstSize = uilut.kLutBurstSize_CacheLine
+        try:
+            self.lutReadEstimate = uilut.estimateLutRead(self.memLut, self.toolCommDict['memSpeed'], burstSize)
+        except ValueError as e:
+            self.lutReadEstimate = None
+            self.showContentOnMainDisplayWin(u"【 Error 】: LUT read sequence cannot be estimated, " + str(e) + ".")
+            return
+        if self.lutReadEstimate != None:
+            self.showContentOnMainDisplayWin(u"【  Info 】: LUT read limit at {} MHz {}, {}-byte bursts: latency {:.1f} ns, {:.3f} MiB/s.".format(
+                self.toolCommDict['memSpeed'], 'DDR' if self.lutReadEstimate.isDdr else 'SDR', burstSize,
+                self.lutReadEstimate.latencyNs, self.lutReadEstimate.bandwidthMiBps))
+
+    def _getLutReadLimit( self ):
+        if self.lutReadEstimate == None:
+            return None
+        return self.lutReadEstimate.bandwidthMiBps
 
     def sendStressTestPacket( self ):
+        self.testResultRecords = []
         mypacket = uipacket.stressTestPacket()
         mypacket.set_members()
-        self.sendUartData(mypacket.out_bytes())
+        self.sendUartData(mypacket.out_buffer())
 
     def sendTestStopPacket( self ):
         mypacket = uipacket.testStopPacket()
         mypacket.set_members()
-        self.sendUartData(mypacket.out_bytes())
+        self.sendUartData(mypacket.out_buffer())
+        self.showTestResultSummary()
+
+    def showTestResultSummary( self ):
+        summaryDict = uipacket.summarize_result_records(self.testResultRecords)
+        for (testId, metric), (count, mean, minVal, maxVal) in summaryDict.items():
+            if metric == uipacket.kResultMetric_TestDone:
+                continue
+            testName = uipacket.kResultTestIdDict.get(testId, hex(testId))
+            metricName, unit = uipacket.kResultMetricDict.get(metric, (hex(metric), ''))
+            self.showContentOnMainDisplayWin('{} {} over {} runs: mean {:.3f}, min {:.3f}, max {:.3f} {}'.format(testName, metricName, count, mean, minVal, maxVal, unit).rstrip() +
+                                             uipacket.format_lut_limit(testId, metric, mean, self._getLutReadLimit()))
 
     def _initMemVendor( self ):
         self.comboBox_memVendor.clear()
@@ -443,8 +620,7 @@ class memTesterUi(QMainWindow, memTesterWin.Ui_memTesterWin):
         self.setMemVendor()
 
     def _findMemTypesFromVendor( self ):
-        vendorBaseDir = os.path.join(self.memModelRoot, self.memVendor)
-        return os.listdir(vendorBaseDir)
+        return self.memModelRegistry.getTypes(self.memVendor)
 
     def setMemVendor( self ):
         try:
@@ -459,14 +635,7 @@ class memTesterUi(QMainWindow, memTesterWin.Ui_memTesterWin):
             pass
 
     def _findMemChipsFromType( self ):
-        typeBaseDir = os.path.join(self.memModelRoot, self.memVendor, self.memType)
-        files = os.listdir(typeBaseDir)
-        pyfiles = [file for file in files if file.endswith('.py')]
-        filenames = []
-        for pyfile in pyfiles:
-            filename, filetype = os.path.splitext(pyfile)
-            filenames.append(filename)
-        return filenames
+        return self.memModelRegistry.getChips(self.memVendor, self.memType)
 
     def setMemType( self ):
         try:
@@ -481,19 +650,25 @@ class memTesterUi(QMainWindow, memTesterWin.Ui_memTesterWin):
 
     def _getMemChipInfo( self ):
         self.memChip = self.comboBox_memChip.currentText()
-        modelDescFile = os.path.join(self.memModelRoot, self.memVendor, self.memType, self.memChip + '.py')
-        self.memModel = createModel(modelDescFile)
-        try:
-            if self.memType == uidef.kMemType_QuadSPI or \
-               self.memType == uidef.kMemType_OctalSPI:
-                self.memLut = uilut.generateCompleteNorLut(self.memModel.mixspiLutDict)
-            elif self.memType == uidef.kMemType_PSRAM or \
-                 self.memType == uidef.kMemType_HyperRAM:
-                self.memLut = uilut.generateCompleteRamLut(self.memModel.mixspiLutDict)
-            else:
-                self.memLut = None
-        except:
-            self.memLut = None
+        entry = self.memModelRegistry.getEntry(self.memVendor, self.memType, self.memChip)
+        if entry == None:
+            raise RuntimeError("Missing model file for %s %s %s" % (self.memVendor, self.memType, self.memChip))
+        if entry['error'] != None:
+            raise RuntimeError(entry['error'])
+        # The LUT comes compiled and is shared with the registry, the model only carries the properties
+        self.memModel = model.Model(memPropertyDict=entry['memPropertyDict'])
+        self.memLut = entry['memLut']
+
+    def refreshMemModels( self ):
+        # Picks up model scripts edited while the tool runs, the combos are only rebuilt if the lists changed
+        memTypes = self._findMemTypesFromVendor()
+        memChips = self._findMemChipsFromType()
+        if not self.memModelRegistry.refresh():
+            return
+        if memTypes != self._findMemTypesFromVendor():
+            self.setMemVendor()
+        elif memChips != self._findMemChipsFromType():
+            self.setMemType()
 
     def _convertMemTypeValue(self, typeStr):
         for i in range(len(uidef.kMemTypeList)):
@@ -503,28 +678,63 @@ class memTesterUi(QMainWindow, memTesterWin.Ui_memTesterWin):
 
     def getMemUserSettings( self ):
         self._getMemChipInfo()
+        self._updateMemUserSettings()
+
+    def _updateMemUserSettings( self ):
         memType = self.comboBox_memType.currentText()
         self.toolCommDict['memType'] = self._convertMemTypeValue(memType)
         memSpeed = self.comboBox_memSpeed.currentText()
         spdIdx = memSpeed.find('MHz')
         self.toolCommDict['memSpeed'] = int(memSpeed[0:spdIdx])
 
-    def showContentOnMainDisplayWin( self, contentStr ):
+    def _getMainDisplayWin( self ):
         if self.goAction == uidef.kGoAction_PinTest or \
            self.goAction == uidef.kGoAction_ConfigSystem:
-            self.textEdit_displayWin.append(contentStr)
+            return self.textEdit_displayWin
         elif self.goAction == uidef.kGoAction_MemRegs:
-            self.textEdit_displayWinReg.append(contentStr)
+            return self.textEdit_displayWinReg
         elif self.goAction == uidef.kGoAction_RwTest or \
              self.goAction == uidef.kGoAction_PerfTest or \
              self.goAction == uidef.kGoAction_StressTest:
-            self.textEdit_displayWinTest.append(contentStr)
+            return self.textEdit_displayWinTest
         else:
-            self.textEdit_displayWin.append(contentStr)
+            return self.textEdit_displayWin
+
+    def showContentOnMainDisplayWin( self, contentStr ):
+        self._getMainDisplayWin().append(contentStr)
+
+    def showStreamOnMainDisplayWin( self, contentStr ):
+        # Raw UART text may split anywhere, so continue the last line instead of appending a paragraph
+        displayWin = self._getMainDisplayWin()
+        displayWin.moveCursor(QTextCursor.End)
+        displayWin.insertPlainText(contentStr.replace('\r', ''))
+        displayWin.moveCursor(QTextCursor.End)
 
     def showContentOnSecPacketWin( self, contentStr ):
         self.textEdit_packetWin.append(contentStr)
 
+    def showActionProgress( self, progress ):
+        # progress is a bltest.CommandProgress, a rate estimated from the link is marked with ~
+        self.progressBar_action.setMaximum(progress.bytesTotal)
+        self.progressBar_action.setValue(progress.bytesDone)
+        formatStr = progress.command + u" %p%"
+        if progress.bytesPerSecond != None:
+            rateStr = u"{:.1f} KB/s".format(progress.bytesPerSecond / 1024.0)
+            if progress.isEstimated:
+                rateStr = u"~" + rateStr
+            formatStr += u", " + rateStr + u", {:.0f} s left".format(progress.secondsLeft)
+        self.progressBar_action.setFormat(formatStr)
+
+    def showConnectionStage( self, stage ):
+        # Busy indicator until the stage reports progress of its own
+        self.progressBar_action.setRange(0, 0)
+        self.progressBar_action.setFormat(stage)
+
+    def resetActionProgress( self ):
+        self.progressBar_action.setRange(0, 100)
+        self.progressBar_action.setValue(100)
+        self.progressBar_action.setFormat(u"%p%")
+
     def clearContentOfScreens( self ):
         if self.goAction == uidef.kGoAction_PinTest or \
            self.goAction == uidef.kGoAction_ConfigSystem:
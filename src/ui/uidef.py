@@ -210,5 +210,51 @@ kGoAction_RwTest                 = 3
 kGoAction_PerfTest               = 4
 kGoAction_StressTest             = 5
 
+# Steps of a queued test plan, each one is sent as soon as the previous one is acked (or done)
+kTestPlan_Default = [kGoAction_ConfigSystem, kGoAction_RwTest, kGoAction_PerfTest, kGoAction_StressTest]
+kCommandAckTimeoutInSeconds = 2
+# Perf/stress steps also wait for the test done result frame
+kCommandDoneTimeoutInSecondsDict = {kGoAction_PerfTest:   30 * 60,
+                                    kGoAction_StressTest: 12 * 60 * 60,
+                                   }
+
 kButtonColor_Enable  = "rgb(142,229,238)"
 kButtonColor_Disable = "rgb(248,248,255)"
+
+kUartBaudrate_Default = 115200
+# Rates tried after firmware is loaded, fastest first
+kUartBaudrateNegotiationList = [3000000, 2000000, 1000000, 921600, 460800, 230400]
+# Undecodable chars (U+FFFD) received since the rate was negotiated that trigger a step down.
+# A rate the link cannot carry garbles almost every byte, so this is hit within the first
+# printf line, while the few bytes a reset or cable glitch corrupts stay well below it.
+kUartErrorCharsToFallBack = 16
+kUartAckTimeoutInSeconds = 0.1
+# Firmware falls back to its previous rate if no confirm arrives within this time
+kUartBaudrateRevertTimeInSeconds = 0.2
+# Reliable link mode, the ack wait also covers the time the frame itself spends on the wire
+kUartLinkAckTimeoutInSeconds = 0.05
+kUartLinkMaxRetransmits = 5
+kUartLinkPollIntervalInMs = 20
+
+# Bulk transfer channel
+kBulkChunkSize = 256
+# Limited by the firmware receive buffer
+kBulkMaxWindowChunks = 16
+# Ack round trip assumed for window sizing, mostly USB-UART bridge latency
+kBulkRoundTripInSeconds = 0.004
+kBulkAckTimeoutInSeconds = 0.2
+kBulkMaxTimeouts = 5
+
+kConfigSystemPacketCacheSize = 16
+
+# Firmware left running by an earlier session answers the handshake at the default rate
+kFirmwareHandshakeTimeoutInSeconds = 0.1
+# Firmware expanded from a delta has this long to answer the handshake
+kPackedImageConfirmTimeoutInSeconds = 0.5
+
+# Stages of the connection pipeline, shown while it runs off the GUI thread
+kConnectStage_WaitingForBoard = 'waiting for board'
+kConnectStage_Handshaking     = 'looking for running firmware'
+kConnectStage_Pinging         = 'pinging'
+kConnectStage_Loading         = 'loading'
+kConnectStage_OpeningPort     = 'opening port'
@@ -0,0 +1,116 @@
+#! /usr/bin/env python
+# -*- coding: utf-8 -*-
+
+# Copyright 2022 NXP
+# All rights reserved.
+#
+# SPDX-License-Identifier: BSD-3-Clause
+
+import sys
+import os
+import time
+import collections
+from . import uidef
+from . import uipacket
+
+kLinkSeqIdMask = 0xFF
+
+# Stop-and-wait link: one data frame in flight, acked by sequence id. A nak or a missing ack
+# within the timeout resends it, up to maxRetransmits times. The peer acks a repeated
+# sequence id again but does not deliver it twice.
+class reliableLink(object):
+
+    def __init__( self, writeFunc, baudrate=uidef.kUartBaudrate_Default,
+                  ackTimeout=uidef.kUartLinkAckTimeoutInSeconds, maxRetransmits=uidef.kUartLinkMaxRetransmits, clock=time.time ):
+        self.writeFunc = writeFunc
+        self.baudrate = baudrate
+        self.ackTimeout = ackTimeout
+        self.maxRetransmits = maxRetransmits
+        self.clock = clock
+        self.reset()
+
+    def reset( self ):
+        self.txSeqId = 0
+        self.rxSeqId = 0
+        # None until the first data frame, any sequence id is new then
+        self.rxLastSeqId = None
+        self.txQueue = collections.deque()
+        self.txFrame = None
+        self.txPayload = None
+        self.txRetransmits = 0
+        self.txDeadline = None
+        self.droppedPayloads = []
+        self.statsDict = {'sent':0, 'retransmitted':0, 'acked':0, 'dropped':0, 'delivered':0, 'duplicates':0, 'badFrames':0}
+
+    def isIdle( self ):
+        return self.txFrame == None and len(self.txQueue) == 0
+
+    def send( self, payload ):
+        self.txQueue.append(bytes(payload))
+        self._transmitNext()
+
+    def _transmitNext( self ):
+        if self.txFrame != None or len(self.txQueue) == 0:
+            return
+        self.txPayload = self.txQueue.popleft()
+        self.txFrame = uipacket.encode_link_frame(uipacket.kLinkFrameType_Data, self.txSeqId, self.txPayload)
+        self.txRetransmits = 0
+        self.statsDict['sent'] += 1
+        self._transmit()
+
+    def _transmit( self ):
+        self.writeFunc(self.txFrame)
+        # The ack can only start after the frame itself is on the wire
+        self.txDeadline = self.clock() + self.ackTimeout + len(self.txFrame) * 10.0 / self.baudrate
+
+    def _retransmit( self ):
+        if self.txRetransmits >= self.maxRetransmits:
+            # Give up on this one, poll() reports it
+            self.droppedPayloads.append(self.txPayload)
+            self.statsDict['dropped'] += 1
+            self._completeTx()
+            return
+        self.txRetransmits += 1
+        self.statsDict['retransmitted'] += 1
+        self._transmit()
+
+    def _completeTx( self ):
+        self.txFrame = None
+        self.txPayload = None
+        self.txDeadline = None
+        self.txSeqId = (self.txSeqId + 1) & kLinkSeqIdMask
+        self._transmitNext()
+
+    def handleFrame( self, frame ):
+        # frame is a decoded (frameType, seqId, payload), returns the newly delivered payloads
+        frameType, seqId, payload = frame
+        if frameType == uipacket.kLinkFrameType_Data:
+            self.writeFunc(uipacket.encode_link_frame(uipacket.kLinkFrameType_Ack, seqId))
+            # With one frame in flight only the last delivered one can come again
+            if seqId == self.rxLastSeqId:
+                self.statsDict['duplicates'] += 1
+                return []
+            self.rxLastSeqId = seqId
+            self.rxSeqId = (seqId + 1) & kLinkSeqIdMask
+            self.statsDict['delivered'] += 1
+            return [payload]
+        elif self.txFrame != None and seqId == self.txSeqId:
+            if frameType == uipacket.kLinkFrameType_Ack:
+                self.statsDict['acked'] += 1
+                self._completeTx()
+            elif frameType == uipacket.kLinkFrameType_Nak:
+                self._retransmit()
+        return []
+
+    def handleBadFrame( self ):
+        # The frame type cannot be trusted, so just ask for the expected data frame again
+        self.statsDict['badFrames'] += 1
+        self.writeFunc(uipacket.encode_link_frame(uipacket.kLinkFrameType_Nak, self.rxSeqId))
+
+    def poll( self ):
+        # Call periodically, returns the payloads given up on since the last call.
+        while self.txFrame != None and self.clock() >= self.txDeadline:
+            self._retransmit()
+        droppedPayloads = self.droppedPayloads
+        self.droppedPayloads = []
+        return droppedPayloads
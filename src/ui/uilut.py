@@ -3,6 +3,8 @@
 import sys
 import os
 import json
+import array
+import collections
 from . import uidef
 
 ############################################################################
@@ -104,42 +106,104 @@ class mixspiLutSequence(object):
         self.sequence[3] |= (op6 & 0xFF) | ((pad6 << 8) & 0x300) | ((cmd6 << 10) & 0xFC00)
         self.sequence[3] |= ((op7 & 0xFF) | ((pad7 << 8) & 0x300) | ((cmd7 << 10) & 0xFC00)) << 16
 
-def generateCompleteNorLut( mixspiLutDict ):
+# Sequence name in mixspiLutDict -> slot in the complete LUT
+kNorLutSeqIdxDict = {'READ':        NOR_CMD_LUT_SEQ_IDX_READ,
+                     'READSTATUS':  NOR_CMD_LUT_SEQ_IDX_READSTATUS,
+                     'WRITEENABLE': NOR_CMD_LUT_SEQ_IDX_WRITEENABLE,
+                     'ENABLEQE':    NOR_CMD_LUT_SEQ_IDX_ENABLEQE,
+                     'READID':      NOR_CMD_LUT_SEQ_IDX_READID,
+                     'READREG1':    NOR_CMD_LUT_SEQ_IDX_READREG1,
+                     'READREG2':    NOR_CMD_LUT_SEQ_IDX_READREG2,
+                     'ERASESECTOR': NOR_CMD_LUT_SEQ_IDX_ERASESECTOR,
+                     'PAGEPROGRAM': NOR_CMD_LUT_SEQ_IDX_PAGEPROGRAM,
+                    }
+kRamLutSeqIdxDict = {'READDATA':  PSRAM_CMD_LUT_SEQ_IDX_READDATA,
+                     'WRITEDATA': PSRAM_CMD_LUT_SEQ_IDX_WRITEDATA,
+                     'READREG':   PSRAM_CMD_LUT_SEQ_IDX_READREG,
+                     'WRITEREG':  PSRAM_CMD_LUT_SEQ_IDX_WRITEREG,
+                     'RESET':     PSRAM_CMD_LUT_SEQ_IDX_RESET,
+                     'READID':    PSRAM_CMD_LUT_SEQ_IDX_READID,
+                    }
+
+CUSTOM_LUT_SEQ_LENGTH = 4
+
+def compileLut( mixspiLutDict, seqIdxDict ):
+    # Packed words of the complete LUT, sequences whose name is not in seqIdxDict are left out
     memLut = [0x0] * CUSTOM_LUT_LENGTH
-    for key in mixspiLutDict.keys():
-        if key == 'READ':
-            memLut[(NOR_CMD_LUT_SEQ_IDX_READ * 4):((NOR_CMD_LUT_SEQ_IDX_READ + 1) * 4)] = mixspiLutDict[key].sequence
-        if key == 'READSTATUS':
-            memLut[(NOR_CMD_LUT_SEQ_IDX_READSTATUS * 4):((NOR_CMD_LUT_SEQ_IDX_READSTATUS + 1) * 4)] = mixspiLutDict[key].sequence
-        if key == 'WRITEENABLE':
-            memLut[(NOR_CMD_LUT_SEQ_IDX_WRITEENABLE * 4):((NOR_CMD_LUT_SEQ_IDX_WRITEENABLE + 1) * 4)] = mixspiLutDict[key].sequence
-        if key == 'ENABLEQE':
-            memLut[(NOR_CMD_LUT_SEQ_IDX_ENABLEQE * 4):((NOR_CMD_LUT_SEQ_IDX_ENABLEQE + 1) * 4)] = mixspiLutDict[key].sequence
-        if key == 'READID':
-            memLut[(NOR_CMD_LUT_SEQ_IDX_READID * 4):((NOR_CMD_LUT_SEQ_IDX_READID + 1) * 4)] = mixspiLutDict[key].sequence
-        if key == 'READREG1':
-            memLut[(NOR_CMD_LUT_SEQ_IDX_READREG1 * 4):((NOR_CMD_LUT_SEQ_IDX_READREG1 + 1) * 4)] = mixspiLutDict[key].sequence
-        if key == 'READREG2':
-            memLut[(NOR_CMD_LUT_SEQ_IDX_READREG2 * 4):((NOR_CMD_LUT_SEQ_IDX_READREG2 + 1) * 4)] = mixspiLutDict[key].sequence
-        if key == 'ERASESECTOR':
-            memLut[(NOR_CMD_LUT_SEQ_IDX_ERASESECTOR * 4):((NOR_CMD_LUT_SEQ_IDX_ERASESECTOR + 1) * 4)] = mixspiLutDict[key].sequence
-        if key == 'PAGEPROGRAM':
-            memLut[(NOR_CMD_LUT_SEQ_IDX_PAGEPROGRAM * 4):((NOR_CMD_LUT_SEQ_IDX_PAGEPROGRAM + 1) * 4)] = mixspiLutDict[key].sequence
-    return memLut
+    for key, lutSeq in mixspiLutDict.items():
+        seqIdx = seqIdxDict.get(key)
+        if seqIdx != None:
+            memLut[(seqIdx * CUSTOM_LUT_SEQ_LENGTH):((seqIdx + 1) * CUSTOM_LUT_SEQ_LENGTH)] = lutSeq.sequence
+    return array.array('I', memLut)
+
+def generateCompleteNorLut( mixspiLutDict ):
+    return compileLut(mixspiLutDict, kNorLutSeqIdxDict)
 
 def generateCompleteRamLut( mixspiLutDict ):
-    memLut = [0x0] * CUSTOM_LUT_LENGTH
-    for key in mixspiLutDict.keys():
-        if key == 'READDATA':
-            memLut[(PSRAM_CMD_LUT_SEQ_IDX_READDATA * 4):((PSRAM_CMD_LUT_SEQ_IDX_READDATA + 1) * 4)] = mixspiLutDict[key].sequence
-        if key == 'WRITEDATA':
-            memLut[(PSRAM_CMD_LUT_SEQ_IDX_WRITEDATA * 4):((PSRAM_CMD_LUT_SEQ_IDX_WRITEDATA + 1) * 4)] = mixspiLutDict[key].sequence
-        if key == 'READREG':
-            memLut[(PSRAM_CMD_LUT_SEQ_IDX_READREG * 4):((PSRAM_CMD_LUT_SEQ_IDX_READREG + 1) * 4)] = mixspiLutDict[key].sequence
-        if key == 'WRITEREG':
-            memLut[(PSRAM_CMD_LUT_SEQ_IDX_WRITEREG * 4):((PSRAM_CMD_LUT_SEQ_IDX_WRITEREG + 1) * 4)] = mixspiLutDict[key].sequence
-        if key == 'RESET':
-            memLut[(PSRAM_CMD_LUT_SEQ_IDX_RESET * 4):((PSRAM_CMD_LUT_SEQ_IDX_RESET + 1) * 4)] = mixspiLutDict[key].sequence
-        if key == 'READID':
-            memLut[(PSRAM_CMD_LUT_SEQ_IDX_READID * 4):((PSRAM_CMD_LUT_SEQ_IDX_READID + 1) * 4)] = mixspiLutDict[key].sequence
-    return memLut
+    return compileLut(mixspiLutDict, kRamLutSeqIdxDict)
+
+kFLEXSPI_Command_DDR_Flag = 0x20
+
+# Chip select setup and hold around each access, in serial clock cycles
+kLutCsOverheadCycles = 2
+# Burst of an AHB read that misses the cache when prefetch is off, one cache line
+kLutBurstSize_CacheLine = 32
+
+lutInstruction = collections.namedtuple('lutInstruction', 'cmd, pad, operand')
+lutReadEstimate = collections.namedtuple('lutReadEstimate', 'latencyCycles, dataCycles, latencyNs, bandwidthMiBps, isDdr')
+
+def decodeLutSequence( memLut, seqIdx ):
+    # Instructions of a sequence up to STOP or JUMP_ON_CS, two 16-bit instructions per LUT word
+    instructions = []
+    for word in memLut[(seqIdx * CUSTOM_LUT_SEQ_LENGTH):((seqIdx + 1) * CUSTOM_LUT_SEQ_LENGTH)]:
+        for instr in [word & 0xFFFF, (word >> 16) & 0xFFFF]:
+            instruction = lutInstruction((instr >> 10) & 0x3F, (instr >> 8) & 0x3, instr & 0xFF)
+            if instruction.cmd == kFLEXSPI_Command_STOP:
+                return instructions
+            instructions.append(instruction)
+            if instruction.cmd == kFLEXSPI_Command_JUMP_ON_CS:
+                return instructions
+    return instructions
+
+def _getLutInstructionCycles( instruction, burstSize ):
+    # Serial clock cycles the instruction takes, DDR opcodes move data on both edges
+    edges = 2 if instruction.cmd & kFLEXSPI_Command_DDR_Flag else 1
+    bitsPerCycle = (1 << instruction.pad) * edges
+    cmd = instruction.cmd & ~kFLEXSPI_Command_DDR_Flag
+    if cmd == kFLEXSPI_Command_SDR:
+        return 8.0 / bitsPerCycle
+    elif cmd == kFLEXSPI_Command_RADDR_SDR or \
+         cmd == kFLEXSPI_Command_CADDR_SDR or \
+         cmd == kFLEXSPI_Command_DATSZ_SDR:
+        return float(instruction.operand) / bitsPerCycle
+    elif cmd >= kFLEXSPI_Command_MODE1_SDR and cmd <= kFLEXSPI_Command_MODE8_SDR:
+        return float(1 << (cmd - kFLEXSPI_Command_MODE1_SDR)) / bitsPerCycle
+    elif cmd == kFLEXSPI_Command_WRITE_SDR or \
+         cmd == kFLEXSPI_Command_READ_SDR:
+        return burstSize * 8.0 / bitsPerCycle
+    elif cmd == kFLEXSPI_Command_DUMMY_SDR or \
+         cmd == kFLEXSPI_Command_LEARN_SDR:
+        # DDR dummy cycles are counted in half cycles
+        return float(instruction.operand) / edges
+    elif cmd == kFLEXSPI_Command_DUMMY_RWDS_SDR:
+        # Fixed latency, the device may double it when it drives RWDS high
+        return float(instruction.operand)
+    elif instruction.cmd == kFLEXSPI_Command_JUMP_ON_CS:
+        return 0.0
+    else:
+        raise ValueError("Unknown LUT instruction 0x%02x" % instruction.cmd)
+
+def estimateLutRead( memLut, memSpeedMHz, burstSize, seqIdx=0, csOverheadCycles=kLutCsOverheadCycles ):
+    # Theoretical latency to the first data and bandwidth of back to back bursts of the read
+    # sequence (slot 0 for both NOR and RAM), None if the sequence has no read instruction
+    if memLut == None or memSpeedMHz <= 0 or burstSize <= 0:
+        return None
+    latencyCycles = float(csOverheadCycles)
+    for instruction in decodeLutSequence(memLut, seqIdx):
+        if (instruction.cmd & ~kFLEXSPI_Command_DDR_Flag) == kFLEXSPI_Command_READ_SDR:
+            dataCycles = _getLutInstructionCycles(instruction, burstSize)
+            totalSeconds = (latencyCycles + dataCycles) / (memSpeedMHz * 1e6)
+            return lutReadEstimate(latencyCycles, dataCycles, latencyCycles * 1000.0 / memSpeedMHz,
+                                   burstSize / totalSeconds / (1024 * 1024), bool(instruction.cmd & kFLEXSPI_Command_DDR_Flag))
+        latencyCycles += _getLutInstructionCycles(instruction, burstSize)
+    return None
@@ -0,0 +1,170 @@
+#! /usr/bin/env python
+# -*- coding: utf-8 -*-
+
+# Copyright 2022 NXP
+# All rights reserved.
+#
+# SPDX-License-Identifier: BSD-3-Clause
+
+import sys
+import os
+import json
+import array
+from . import uidef
+from . import uilut
+sys.path.append(os.path.abspath(".."))
+from boot import model
+from utils import misc
+
+# Bumped whenever the layout of the cache file or of its entries changes
+kMemModelCacheVersion = 1
+
+def createModel(modelDescFile):
+    # Check for model file existence.
+    if not os.path.isfile(modelDescFile):
+        raise RuntimeError("Missing model file at path %s" % modelDescFile)
+
+    # Build locals dict by copying our locals and adjusting file path and name.
+    modelDesc = locals().copy()
+    modelDesc['__file__'] = modelDescFile
+
+    # Execute the model desc script, on a copy of our globals as execfile() overwrites __file__.
+    misc.execfile(modelDescFile, globals().copy(), modelDesc)
+
+    # Create the model object.
+    mdl = model.Model(**modelDesc)
+
+    return mdl
+
+# Memory type -> sequence name to LUT slot table of its complete LUT
+kMemTypeLutSeqIdxDict = {uidef.kMemType_QuadSPI:  uilut.kNorLutSeqIdxDict,
+                         uidef.kMemType_OctalSPI: uilut.kNorLutSeqIdxDict,
+                         uidef.kMemType_PSRAM:    uilut.kRamLutSeqIdxDict,
+                         uidef.kMemType_HyperRAM: uilut.kRamLutSeqIdxDict,
+                        }
+
+def generateMemLut(memType, mixspiLutDict):
+    # The complete LUT sent with config system as array('I'), None if the type has no LUT or the model is broken
+    seqIdxDict = kMemTypeLutSeqIdxDict.get(memType)
+    if seqIdxDict == None:
+        return None
+    try:
+        return uilut.compileLut(mixspiLutDict, seqIdxDict)
+    except:
+        return None
+
+def _listDirs(path):
+    try:
+        return sorted([name for name in os.listdir(path) if not name.startswith('__') and os.path.isdir(os.path.join(path, name))])
+    except OSError:
+        return []
+
+# vendor -> type -> chip -> entry, with the model scripts run once and their results kept in
+# cacheFile. An entry is {'stamp': [mtime_ns, size], 'memPropertyDict': dict, 'memLut': compiled
+# array('I') or None, 'error': None or why the script failed}. Only refresh() looks at the files,
+# lookups are served from memory. Entries are shared, callers must not modify them.
+class memModelRegistry(object):
+
+    def __init__( self, memModelRoot, cacheFile=None ):
+        self.memModelRoot = memModelRoot
+        self.cacheFile = cacheFile
+        self.modelDict = {}
+        self.statsDict = {'loaded':0, 'reused':0, 'removed':0}
+        self._isCacheLoaded = False
+
+    def _loadCacheFile( self ):
+        # Returns {relative path: entry} of the cache file, empty if it is missing or stale
+        if self.cacheFile == None or not os.path.isfile(self.cacheFile):
+            return {}
+        try:
+            with open(self.cacheFile, 'r') as fileObj:
+                cacheDict = json.load(fileObj)
+        except (OSError, ValueError):
+            return {}
+        if cacheDict.get('version') != kMemModelCacheVersion:
+            return {}
+        models = cacheDict.get('models', {})
+        for entry in models.values():
+            if entry.get('memLut') != None:
+                entry['memLut'] = array.array('I', entry['memLut'])
+        return models
+
+    def _saveCacheFile( self ):
+        if self.cacheFile == None:
+            return
+        models = {}
+        for vendor, typeDict in self.modelDict.items():
+            for memType, chipDict in typeDict.items():
+                for chip, entry in chipDict.items():
+                    # Broken scripts are only remembered in memory, the next start runs them again
+                    if entry['error'] == None:
+                        entry = dict(entry)
+                        if entry['memLut'] != None:
+                            entry['memLut'] = entry['memLut'].tolist()
+                        models['/'.join([vendor, memType, chip])] = entry
+        try:
+            with open(self.cacheFile, 'w') as fileObj:
+                json.dump({'version': kMemModelCacheVersion, 'models': models}, fileObj)
+        except (OSError, TypeError, ValueError):
+            pass
+
+    def _loadEntry( self, memType, modelDescFile, stamp ):
+        try:
+            memModel = createModel(modelDescFile)
+        except Exception as e:
+            return {'stamp': stamp, 'memPropertyDict': None, 'memLut': None, 'error': str(e)}
+        return {'stamp': stamp, 'memPropertyDict': memModel.memPropertyDict,
+                'memLut': generateMemLut(memType, memModel.mixspiLutDict), 'error': None}
+
+    def refresh( self ):
+        # Rescans the tree, only scripts that are new or whose mtime or size changed are run.
+        # Returns True if the cache file was rewritten.
+        if self._isCacheLoaded:
+            cachedModels = {}
+            for vendor, typeDict in self.modelDict.items():
+                for memType, chipDict in typeDict.items():
+                    for chip, entry in chipDict.items():
+                        cachedModels['/'.join([vendor, memType, chip])] = entry
+        else:
+            cachedModels = self._loadCacheFile()
+            self._isCacheLoaded = True
+        isChanged = False
+        modelDict = {}
+        for vendor in _listDirs(self.memModelRoot):
+            modelDict[vendor] = {}
+            for memType in _listDirs(os.path.join(self.memModelRoot, vendor)):
+                typeBaseDir = os.path.join(self.memModelRoot, vendor, memType)
+                chipDict = {}
+                for pyfile in sorted(os.listdir(typeBaseDir)):
+                    chip, filetype = os.path.splitext(pyfile)
+                    if filetype != '.py':
+                        continue
+                    modelDescFile = os.path.join(typeBaseDir, pyfile)
+                    fileStat = os.stat(modelDescFile)
+                    stamp = [fileStat.st_mtime_ns, fileStat.st_size]
+                    entry = cachedModels.pop('/'.join([vendor, memType, chip]), None)
+                    # A broken script keeps its error until it is edited
+                    if entry != None and entry['stamp'] == stamp:
+                        self.statsDict['reused'] += 1
+                    else:
+                        entry = self._loadEntry(memType, modelDescFile, stamp)
+                        self.statsDict['loaded'] += 1
+                        isChanged = True
+                    chipDict[chip] = entry
+                modelDict[vendor][memType] = chipDict
+        if cachedModels:
+            self.statsDict['removed'] += len(cachedModels)
+            isChanged = True
+        self.modelDict = modelDict
+        if isChanged:
+            self._saveCacheFile()
+        return isChanged
+
+    def getTypes( self, vendor ):
+        return list(self.modelDict.get(vendor, {}).keys())
+
+    def getChips( self, vendor, memType ):
+        return list(self.modelDict.get(vendor, {}).get(memType, {}).keys())
+
+    def getEntry( self, vendor, memType, chip ):
+        return self.modelDict.get(vendor, {}).get(memType, {}).get(chip)
@@ -3,7 +3,9 @@
 import sys
 import os
 import json
-from crc import CrcCalculator, Configuration
+import struct
+import collections
+import binascii
 from . import uidef
 from . import uivar
 from . import uilut
@@ -16,23 +18,525 @@ kCommandTag_AccessMemRegs  = 0xF3
 kCommandTag_RunRwTest      = 0xF4
 kCommandTag_RunPerfTest    = 0xF5
 kCommandTag_RunStressTest  = 0xF6
+kCommandTag_SetBaudrate    = 0xF7
+kCommandTag_ConfirmBaudrate = 0xF8
+kCommandTag_BulkStart      = 0xF9
+kCommandTag_BulkData       = 0xFA
+kCommandTag_Handshake      = 0xFB
 
 kCommandTag_TestStop       = 0xF0
 
+kAckStatus_Success         = 0x00
+kAckStatus_Unsupported     = 0x01
+
+# Perf/stress results can be sent by firmware as binary frames instead of printf text. Firmware
+# before result frames checks that this byte is reserved (0), so binary is only asked for when
+# 'resultFormat' is set in the perf/stress settings.
+kResultFormat_Ascii        = 0x00
+kResultFormat_Binary       = 0x01
+
+kResultFrameTag = "RTAG"
+
+# Optional reliable link, every frame carries a sequence id and is acked or naked by the peer
+kLinkFrameTag = "LTAG"
+
+kLinkFrameType_Data = 0x00
+kLinkFrameType_Ack  = 0x01
+kLinkFrameType_Nak  = 0x02
+
+kLinkMaxPayloadSize = 1024
+
+# Bulk transfer, the firmware acks every chunk with the next offset it expects
+kBulkAckFrameTag = "BTAG"
+
+kBulkDataType_FillPattern  = 0x00
+kBulkDataType_LutTable     = 0x01
+kBulkDataType_TestVector   = 0x02
+
+kBulkStatus_Success        = 0x00
+kBulkStatus_CrcError       = 0x01
+kBulkStatus_OutOfOrder     = 0x02
+kBulkStatus_Rejected       = 0x03
+
+kBulkMaxChunkSize = 1024
+
+# Handshake, firmware that is already running answers with its version and the crc32 of its
+# image (computed at start-up, over the image as loaded)
+kHandshakeFrameTag = "HTAG"
+kHandshakeProtocolVersion = 0x01
+
+kResultMetric_ElapsedSec     = 0x01
+kResultMetric_CopyMiBps      = 0x02
+kResultMetric_IterPerSec     = 0x03
+kResultMetric_Dmips          = 0x04
+kResultMetric_EventsPerSec   = 0x05
+kResultMetric_ErrorCount     = 0x06
+# Last frame of a perf/stress test run, value is the failure count
+kResultMetric_TestDone       = 0x07
+
+kResultMetricDict = {kResultMetric_ElapsedSec:   ('elapsed', 's'),
+                     kResultMetric_CopyMiBps:    ('copy', 'MiB/s'),
+                     kResultMetric_IterPerSec:   ('iterations', '/s'),
+                     kResultMetric_Dmips:        ('dhrystone', 'DMIPS'),
+                     kResultMetric_EventsPerSec: ('events', '/s'),
+                     kResultMetric_ErrorCount:   ('errors', ''),
+                     kResultMetric_TestDone:     ('done, failures', ''),
+                    }
+
+# Test ids are the testSet/subTestSet values of perf and stress test packets
+kResultTestIdDict = {0xA0: 'coremark',
+                     0xB0: 'dhrystone',
+                     0xC1: 'mbw memcpy',
+                     0xC2: 'mbw dumb',
+                     0xC3: 'mbw memcpy fixed block',
+                     0xD0: 'sysbench',
+                     0xE0: 'memtester',
+                    }
+# Copy throughput of these is compared with the theoretical limit of the memory LUT
+kResultTestIdList_Mbw = [0xC1, 0xC2, 0xC3]
+
+testResultRecord = collections.namedtuple('testResultRecord', 'testId, metric, iteration, value')
+
+kCrc16Poly      = 0x1021
+kCrc16InitValue = 0x0000
+
+def _build_crc16_table( poly ):
+    table = []
+    for i in range(256):
+        crc = i << 8
+        for bit in range(8):
+            if crc & 0x8000:
+                crc = ((crc << 1) ^ poly) & 0xFFFF
+            else:
+                crc = (crc << 1) & 0xFFFF
+        table.append(crc)
+    return table
+
+s_crc16Table = _build_crc16_table(kCrc16Poly)
+
+# CRC-CCITT (XMODEM): poly 0x1021, init 0, no reflection, no final xor.
+def update_crc16( crc, crcDataBytes ):
+    try:
+        # bytes, bytearray and memoryview go through the C table engine
+        return binascii.crc_hqx(crcDataBytes, crc)
+    except TypeError:
+        for byte in crcDataBytes:
+            crc = ((crc << 8) & 0xFFFF) ^ s_crc16Table[((crc >> 8) ^ byte) & 0xFF]
+        return crc
+
 def calculate_crc16( crcDataBytes ):
-    #crc_calculator = CrcCalculator(Crc16.CCITT)
-    #checksum = crc_calculator.calculate_checksum(crcDataBytes)
-    width = 16
-    poly = 0x1021
-    init_value = 0x00
-    final_xor_value = 0x00
-    reverse_input = False
-    reverse_output = False
-    configuration = Configuration(width, poly, init_value, final_xor_value, reverse_input, reverse_output)
-    use_table = True
-    crc_calculator = CrcCalculator(configuration, use_table)
-    checksum = crc_calculator.calculate_checksum(crcDataBytes)
-    return checksum
+    return update_crc16(kCrc16InitValue, crcDataBytes)
+
+# Incremental form, for payloads that are checksummed chunk by chunk
+class crc16Calculator(object):
+
+    def __init__( self ):
+        self.checksum = kCrc16InitValue
+
+    def reset( self ):
+        self.checksum = kCrc16InitValue
+
+    def update( self, crcDataBytes ):
+        self.checksum = update_crc16(self.checksum, crcDataBytes)
+        return self.checksum
+
+##
+# Declarative packet layout backed by a precompiled little-endian struct.Struct.
+#
+# Each field is (name, fmt), (name, fmt, count) for a word array, (name, schema) for
+# a nested struct, or (None, 'Nx') for reserved bytes. Encoding reads the named
+# attributes of a packet object, decoding returns an OrderedDict of the same names.
+class packetSchema(object):
+
+    def __init__( self, fields ):
+        self.fields = fields
+        fmt = ''
+        for field in fields:
+            if isinstance(field[1], packetSchema):
+                fmt += field[1].format[1:]
+            elif len(field) > 2:
+                fmt += str(field[2]) + field[1]
+            else:
+                fmt += field[1]
+        self.format = '<' + fmt
+        self.struct = struct.Struct(self.format)
+        self.size = self.struct.size
+
+    def values( self, obj ):
+        vals = []
+        for field in self.fields:
+            if field[0] == None:
+                continue
+            value = getattr(obj, field[0])
+            if isinstance(field[1], packetSchema):
+                vals.extend(field[1].values(value))
+            elif len(field) > 2:
+                vals.extend(value[0:field[2]])
+            else:
+                vals.append(value)
+        return vals
+
+    def pack( self, obj ):
+        return self.struct.pack(*self.values(obj))
+
+    def pack_into( self, buffer, offset, obj ):
+        self.struct.pack_into(buffer, offset, *self.values(obj))
+
+    def unpack_from( self, buffer, offset=0 ):
+        return self._build(iter(self.struct.unpack_from(buffer, offset)))
+
+    def _build( self, vals ):
+        fieldsDict = collections.OrderedDict()
+        for field in self.fields:
+            if field[0] == None:
+                continue
+            if isinstance(field[1], packetSchema):
+                fieldsDict[field[0]] = field[1]._build(vals)
+            elif len(field) > 2:
+                fieldsDict[field[0]] = [next(vals) for i in range(field[2])]
+            else:
+                fieldsDict[field[0]] = next(vals)
+        return fieldsDict
+
+s_packetHeaderStruct = struct.Struct('<4sB')
+s_packetTrailerStruct = struct.Struct('<H2x')
+s_packetTagBytes = bytes(kPacketTag, 'ascii')
+
+##
+# kPacketTag + command tag [+ body + crc16 over body + 2 reserved bytes], encoded
+# into a buffer that is allocated once per schema, pack() returns a bytes copy of it.
+class commandPacketSchema(object):
+
+    def __init__( self, commandTag, bodySchema=None ):
+        self.commandTag = commandTag
+        self.bodySchema = bodySchema
+        self.size = s_packetHeaderStruct.size
+        if bodySchema != None:
+            self.size += bodySchema.size + s_packetTrailerStruct.size
+        self.buffer = bytearray(self.size)
+        self.view = memoryview(self.buffer)
+
+    def pack( self, obj ):
+        s_packetHeaderStruct.pack_into(self.buffer, 0, s_packetTagBytes, self.commandTag)
+        if self.bodySchema != None:
+            bodyStart = s_packetHeaderStruct.size
+            bodyEnd = bodyStart + self.bodySchema.size
+            self.bodySchema.pack_into(self.buffer, bodyStart, obj)
+            obj.crcCheckSum = calculate_crc16(self.view[bodyStart:bodyEnd])
+            s_packetTrailerStruct.pack_into(self.buffer, bodyEnd, obj.crcCheckSum)
+        return bytes(self.buffer)
+
+    def unpack_from( self, buffer, offset=0 ):
+        # Returns (fieldsDict, isCrcValid); fieldsDict is None for header-only packets.
+        if self.bodySchema == None:
+            return None, True
+        bodyStart = offset + s_packetHeaderStruct.size
+        bodyEnd = bodyStart + self.bodySchema.size
+        fieldsDict = self.bodySchema.unpack_from(buffer, bodyStart)
+        crcCheckSum, = s_packetTrailerStruct.unpack_from(buffer, bodyEnd)
+        return fieldsDict, calculate_crc16(bytes(buffer[bodyStart:bodyEnd])) == crcCheckSum
+
+kMixspiConnectionSchema = packetSchema([('instance', 'B'),
+                                        ('dataLow4bit', 'B'),
+                                        ('dataHigh4bit', 'B'),
+                                        ('dataTop8bit', 'B'),
+                                        ('ss_b', 'B'),
+                                        ('sclk', 'B'),
+                                        ('sclk_n', 'B'),
+                                        ('dqs0', 'B'),
+                                        ('dqs1', 'B'),
+                                        ('rst_b', 'B'),
+                                        (None, '2x'),
+                                       ])
+
+kMixspiPintestEnSchema = packetSchema([('pulseInMs', 'I'),
+                                       ('enableAdcSample', 'B'),
+                                       (None, '3x'),
+                                       ('option', 'I'),
+                                      ])
+
+kMixspiPadCtrlSchema = packetSchema([('dataLow4bit', 'I'),
+                                     ('dataHigh4bit', 'I'),
+                                     ('dataTop8bit', 'I'),
+                                     ('ss_b', 'I'),
+                                     ('sclk', 'I'),
+                                     ('sclk_n', 'I'),
+                                     ('dqs0', 'I'),
+                                     ('dqs1', 'I'),
+                                     ('rst_b', 'I'),
+                                    ])
+
+kMemoryPropertySchema = packetSchema([('type', 'B'),
+                                      ('chip', 'B'),
+                                      ('speedMHz', 'H'),
+                                      ('ioPadsMode', 'B'),
+                                      ('interfaceMode', 'B'),
+                                      ('sampleRateMode', 'B'),
+                                      (None, 'x'),
+                                      ('flashQuadEnableCfg', 'H'),
+                                      ('flashQuadEnableBytes', 'B'),
+                                      (None, 'x'),
+                                      ('memLut', 'I', uilut.CUSTOM_LUT_LENGTH),
+                                     ])
+
+kPinTestSchema = packetSchema([('memConnection', kMixspiConnectionSchema),
+                               ('unittestEn', kMixspiPintestEnSchema),
+                              ])
+
+kConfigSystemSchema = packetSchema([('cpuSpeedMHz', 'H'),
+                                    ('enableL1Cache', 'B'),
+                                    ('enablePrefetch', 'B'),
+                                    ('prefetchBufSizeInByte', 'H'),
+                                    (None, '2x'),
+                                    ('memConnection', kMixspiConnectionSchema),
+                                    ('memPadCtrl', kMixspiPadCtrlSchema),
+                                    ('memProperty', kMemoryPropertySchema),
+                                   ])
+
+kRwTestSchema = packetSchema([('testSet', 'B'),
+                              (None, '3x'),
+                              ('testMemStart', 'I'),
+                              ('testMemSize', 'I'),
+                              ('fillPatternWord', 'I'),
+                             ])
+
+kPerfTestSchema = packetSchema([('testSet', 'B'),
+                                ('subTestSet', 'B'),
+                                ('enableAverageShow', 'B'),
+                                ('resultFormat', 'B'),
+                                ('iterations', 'I'),
+                                ('testMemStart', 'I'),
+                                ('testMemSize', 'I'),
+                                ('testBlockSize', 'I'),
+                               ])
+
+kStressTestSchema = packetSchema([('testSet', 'B'),
+                                  ('enableStopWhenFail', 'B'),
+                                  ('resultFormat', 'B'),
+                                  (None, 'x'),
+                                  ('iterations', 'I'),
+                                  ('testMemStart', 'I'),
+                                  ('testMemSize', 'I'),
+                                  ('testPageSize', 'I'),
+                                 ])
+
+kUartBaudrateSchema = packetSchema([('baudrate', 'I'),
+                                   ])
+
+# crc16 covers test id .. value
+kResultFrameSchema = packetSchema([('tag', '4s'),
+                                   ('testId', 'B'),
+                                   ('metric', 'B'),
+                                   ('iteration', 'I'),
+                                   ('value', 'f'),
+                                   ('crcCheckSum', 'H'),
+                                  ])
+kResultFrameSize = kResultFrameSchema.size
+
+kBulkStartSchema = packetSchema([('transferId', 'B'),
+                                 ('dataType', 'B'),
+                                 ('chunkSize', 'H'),
+                                 ('totalSize', 'I'),
+                                 ('totalCrc16', 'H'),
+                                 (None, '2x'),
+                                ])
+
+# Followed by length bytes of chunk data, crc16 covers transfer id .. chunk data
+kBulkDataSchema = packetSchema([('transferId', 'B'),
+                                (None, 'x'),
+                                ('length', 'H'),
+                                ('offset', 'I'),
+                               ])
+
+# crc16 covers transfer id .. next offset
+kBulkAckFrameSchema = packetSchema([('tag', '4s'),
+                                    ('transferId', 'B'),
+                                    ('status', 'B'),
+                                    ('nextOffset', 'I'),
+                                    ('crcCheckSum', 'H'),
+                                   ])
+kBulkAckFrameSize = kBulkAckFrameSchema.size
+
+# Padded to a 16-byte packet, so an RT10yy ROM still in serial download mode takes it as
+# one (invalid) SDP command and stays in sync for the next ones
+kHandshakeSchema = packetSchema([('protocolVersion', 'B'),
+                                 (None, '6x'),
+                                ])
+
+# crc16 covers firmware version .. image crc32
+kHandshakeFrameSchema = packetSchema([('tag', '4s'),
+                                      ('firmwareVersion', 'I'),
+                                      ('imageSize', 'I'),
+                                      ('imageCrc32', 'I'),
+                                      ('crcCheckSum', 'H'),
+                                     ])
+kHandshakeFrameSize = kHandshakeFrameSchema.size
+
+kCommandPacketSchemaDict = {
+    kCommandTag_TestStop:        commandPacketSchema(kCommandTag_TestStop),
+    kCommandTag_PinTest:         commandPacketSchema(kCommandTag_PinTest, kPinTestSchema),
+    kCommandTag_ConfigSystem:    commandPacketSchema(kCommandTag_ConfigSystem, kConfigSystemSchema),
+    kCommandTag_AccessMemRegs:   commandPacketSchema(kCommandTag_AccessMemRegs),
+    kCommandTag_RunRwTest:       commandPacketSchema(kCommandTag_RunRwTest, kRwTestSchema),
+    kCommandTag_RunPerfTest:     commandPacketSchema(kCommandTag_RunPerfTest, kPerfTestSchema),
+    kCommandTag_RunStressTest:   commandPacketSchema(kCommandTag_RunStressTest, kStressTestSchema),
+    kCommandTag_SetBaudrate:     commandPacketSchema(kCommandTag_SetBaudrate, kUartBaudrateSchema),
+    kCommandTag_ConfirmBaudrate: commandPacketSchema(kCommandTag_ConfirmBaudrate, kUartBaudrateSchema),
+    kCommandTag_BulkStart:       commandPacketSchema(kCommandTag_BulkStart, kBulkStartSchema),
+    kCommandTag_Handshake:       commandPacketSchema(kCommandTag_Handshake, kHandshakeSchema),
+}
+
+def encode_bulk_data_packet( transferId, offset, chunkBytes ):
+    bodySize = kBulkDataSchema.size + len(chunkBytes)
+    packet = bytearray(s_packetHeaderStruct.size + bodySize + s_packetTrailerStruct.size)
+    s_packetHeaderStruct.pack_into(packet, 0, s_packetTagBytes, kCommandTag_BulkData)
+    bodyStart = s_packetHeaderStruct.size
+    kBulkDataSchema.struct.pack_into(packet, bodyStart, transferId, len(chunkBytes), offset)
+    packet[bodyStart + kBulkDataSchema.size:bodyStart + bodySize] = chunkBytes
+    crcCheckSum = calculate_crc16(memoryview(packet)[bodyStart:bodyStart + bodySize])
+    s_packetTrailerStruct.pack_into(packet, bodyStart + bodySize, crcCheckSum)
+    return bytes(packet)
+
+def _parse_bulk_data_packet( packetBytes, offset ):
+    bodyStart = offset + s_packetHeaderStruct.size
+    if len(packetBytes) < bodyStart + kBulkDataSchema.size:
+        return None
+    fieldsDict = kBulkDataSchema.unpack_from(packetBytes, bodyStart)
+    if fieldsDict['length'] > kBulkMaxChunkSize:
+        return None
+    bodyEnd = bodyStart + kBulkDataSchema.size + fieldsDict['length']
+    if len(packetBytes) < bodyEnd + s_packetTrailerStruct.size:
+        return None
+    fieldsDict['data'] = bytes(packetBytes[bodyStart + kBulkDataSchema.size:bodyEnd])
+    crcCheckSum, = s_packetTrailerStruct.unpack_from(packetBytes, bodyEnd)
+    isCrcValid = calculate_crc16(bytes(packetBytes[bodyStart:bodyEnd])) == crcCheckSum
+    return kCommandTag_BulkData, fieldsDict, isCrcValid, bodyEnd + s_packetTrailerStruct.size - offset
+
+# Parse one FTAG packet (e.g. from a captured trace) at offset.
+# Returns (commandTag, fieldsDict, isCrcValid, packetSize), or None if no complete packet is there.
+def parse_packet( packetBytes, offset=0 ):
+    if len(packetBytes) - offset < s_packetHeaderStruct.size:
+        return None
+    tag, commandTag = s_packetHeaderStruct.unpack_from(packetBytes, offset)
+    if tag == s_packetTagBytes and commandTag == kCommandTag_BulkData:
+        return _parse_bulk_data_packet(packetBytes, offset)
+    if tag != s_packetTagBytes or not (commandTag in kCommandPacketSchemaDict):
+        return None
+    schema = kCommandPacketSchemaDict[commandTag]
+    if len(packetBytes) - offset < schema.size:
+        return None
+    fieldsDict, isCrcValid = schema.unpack_from(packetBytes, offset)
+    return commandTag, fieldsDict, isCrcValid, schema.size
+
+# tag, frame type, sequence id, payload length, inverted payload length
+s_linkHeaderStruct = struct.Struct('<4sBBHH')
+s_linkTrailerStruct = struct.Struct('<H')
+s_linkTagBytes = bytes(kLinkFrameTag, 'ascii')
+kLinkFrameHeaderSize = s_linkHeaderStruct.size
+kLinkFrameOverhead = kLinkFrameHeaderSize + s_linkTrailerStruct.size
+
+def encode_link_frame( frameType, seqId, payload=b'' ):
+    frame = bytearray(kLinkFrameOverhead + len(payload))
+    s_linkHeaderStruct.pack_into(frame, 0, s_linkTagBytes, frameType, seqId, len(payload), len(payload) ^ 0xFFFF)
+    frame[kLinkFrameHeaderSize:kLinkFrameHeaderSize + len(payload)] = payload
+    # crc16 covers frame type .. payload
+    crcCheckSum = calculate_crc16(memoryview(frame)[len(s_linkTagBytes):kLinkFrameHeaderSize + len(payload)])
+    s_linkTrailerStruct.pack_into(frame, kLinkFrameHeaderSize + len(payload), crcCheckSum)
+    return bytes(frame)
+
+# Total frame size from a link frame header, None if the header is not valid
+def get_link_frame_size( headerBytes ):
+    tag, frameType, seqId, payloadLen, payloadLenInv = s_linkHeaderStruct.unpack_from(headerBytes)
+    if tag != s_linkTagBytes or payloadLen ^ payloadLenInv != 0xFFFF or payloadLen > kLinkMaxPayloadSize:
+        return None
+    return kLinkFrameOverhead + payloadLen
+
+# Returns (frameType, seqId, payload), or None if the frame is corrupted
+def decode_link_frame( frameBytes ):
+    if len(frameBytes) < kLinkFrameHeaderSize:
+        return None
+    frameSize = get_link_frame_size(frameBytes)
+    if frameSize == None or len(frameBytes) < frameSize:
+        return None
+    tag, frameType, seqId, payloadLen, payloadLenInv = s_linkHeaderStruct.unpack_from(frameBytes)
+    crcCheckSum, = s_linkTrailerStruct.unpack_from(frameBytes, frameSize - s_linkTrailerStruct.size)
+    if calculate_crc16(bytes(frameBytes[len(s_linkTagBytes):frameSize - s_linkTrailerStruct.size])) != crcCheckSum:
+        return None
+    return frameType, seqId, bytes(frameBytes[kLinkFrameHeaderSize:kLinkFrameHeaderSize + payloadLen])
+
+# Firmware acks a command with kPacketTag + command tag + status byte
+def find_ack_status( ackDataBytes, commandTag ):
+    ackStart = s_packetTagBytes + bytes([commandTag])
+    idx = ackDataBytes.find(ackStart)
+    if idx < 0 or len(ackDataBytes) <= idx + len(ackStart):
+        return None
+    return ackDataBytes[idx + len(ackStart)]
+
+def decode_result_frame( frameBytes ):
+    if len(frameBytes) < kResultFrameSize:
+        return None
+    frameDict = kResultFrameSchema.unpack_from(frameBytes)
+    if frameDict['tag'] != bytes(kResultFrameTag, 'ascii'):
+        return None
+    if calculate_crc16(bytes(frameBytes[4:kResultFrameSize - 2])) != frameDict['crcCheckSum']:
+        return None
+    return testResultRecord(frameDict['testId'], frameDict['metric'], frameDict['iteration'], frameDict['value'])
+
+def encode_bulk_ack_frame( transferId, status, nextOffset ):
+    frame = struct.pack('<4sBBI', bytes(kBulkAckFrameTag, 'ascii'), transferId, status, nextOffset)
+    return frame + struct.pack('<H', calculate_crc16(frame[4:]))
+
+# Returns (transferId, status, nextOffset), or None if the frame is corrupted
+def decode_bulk_ack_frame( frameBytes ):
+    if len(frameBytes) < kBulkAckFrameSize:
+        return None
+    frameDict = kBulkAckFrameSchema.unpack_from(frameBytes)
+    if frameDict['tag'] != bytes(kBulkAckFrameTag, 'ascii'):
+        return None
+    if calculate_crc16(bytes(frameBytes[4:kBulkAckFrameSize - 2])) != frameDict['crcCheckSum']:
+        return None
+    return frameDict['transferId'], frameDict['status'], frameDict['nextOffset']
+
+def encode_handshake_frame( firmwareVersion, imageSize, imageCrc32 ):
+    frame = struct.pack('<4sIII', bytes(kHandshakeFrameTag, 'ascii'), firmwareVersion, imageSize, imageCrc32)
+    return frame + struct.pack('<H', calculate_crc16(frame[4:]))
+
+# Returns (firmwareVersion, imageSize, imageCrc32) of the first valid frame in dataBytes, or None
+def find_handshake_frame( dataBytes ):
+    tagBytes = bytes(kHandshakeFrameTag, 'ascii')
+    idx = dataBytes.find(tagBytes)
+    while idx >= 0 and len(dataBytes) >= idx + kHandshakeFrameSize:
+        frameDict = kHandshakeFrameSchema.unpack_from(dataBytes, idx)
+        if calculate_crc16(bytes(dataBytes[idx + 4:idx + kHandshakeFrameSize - 2])) == frameDict['crcCheckSum']:
+            return frameDict['firmwareVersion'], frameDict['imageSize'], frameDict['imageCrc32']
+        idx = dataBytes.find(tagBytes, idx + 1)
+    return None
+
+# Firmware version is major.minor.bugfix in the low three bytes
+def format_firmware_version( firmwareVersion ):
+    return 'v{}.{}.{}'.format((firmwareVersion >> 16) & 0xFF, (firmwareVersion >> 8) & 0xFF, firmwareVersion & 0xFF)
+
+def format_result_record( record, limitMiBps=None ):
+    testName = kResultTestIdDict.get(record.testId, hex(record.testId))
+    metricName, unit = kResultMetricDict.get(record.metric, (hex(record.metric), ''))
+    resultStr = '{} #{} {}: {:.3f} {}'.format(testName, record.iteration, metricName, record.value, unit).rstrip()
+    return resultStr + format_lut_limit(record.testId, record.metric, record.value, limitMiBps)
+
+# Measured mbw copy throughput as a share of the LUT limit, empty for other results
+def format_lut_limit( testId, metric, value, limitMiBps ):
+    if limitMiBps == None or testId not in kResultTestIdList_Mbw or metric != kResultMetric_CopyMiBps:
+        return ''
+    return ' ({:.0f}% of LUT read limit {:.3f} MiB/s)'.format(value * 100.0 / limitMiBps, limitMiBps)
+
+# Returns {(testId, metric): (count, mean, min, max)}
+def summarize_result_records( records ):
+    valuesDict = collections.OrderedDict()
+    for record in records:
+        valuesDict.setdefault((record.testId, record.metric), []).append(record.value)
+    summaryDict = collections.OrderedDict()
+    for key, values in valuesDict.items():
+        summaryDict[key] = (len(values), sum(values) / len(values), min(values), max(values))
+    return summaryDict
 
 class mixspiConnectionStruct(object):
 
@@ -63,20 +567,7 @@ class mixspiConnectionStruct(object):
         self.rst_b = mixspiConnCfgDict['rstb']
 
     def out_bytes( self ):
-        mybytes = bytes([self.instance,
-                         self.dataLow4bit,
-                         self.dataHigh4bit, 
-                         self.dataTop8bit, 
-                         self.ss_b,
-                         self.sclk,
-                         self.sclk_n,
-                         self.dqs0,
-                         self.dqs1,
-                         self.rst_b,
-                         self.reserved0[0],
-                         self.reserved0[1],
-                        ])
-        return mybytes
+        return kMixspiConnectionSchema.pack(self)
 
 class mixspiPintestEnStruct(object):
 
@@ -111,20 +602,7 @@ class mixspiPintestEnStruct(object):
             self.option = self.option | (1 << 8)
 
     def out_bytes( self ):
-        mybytes = bytes([self.pulseInMs & 0xFF,
-                         (self.pulseInMs & 0xFF00) >> 8,
-                         (self.pulseInMs & 0xFF0000) >> 16, 
-                         (self.pulseInMs & 0xFF000000) >> 24,
-                         self.enableAdcSample,
-                         self.reserved0[0],
-                         self.reserved0[1],
-                         self.reserved0[2],
-                         self.option & 0xFF,
-                         (self.option & 0xFF00) >> 8,
-                         (self.option & 0xFF0000) >> 16, 
-                         (self.option & 0xFF000000) >> 24
-                        ])
-        return mybytes
+        return kMixspiPintestEnSchema.pack(self)
 
 class mixspiPadCtrlStruct(object):
 
@@ -152,44 +630,7 @@ class mixspiPadCtrlStruct(object):
         self.rst_b = mixspiPadCtrlDict['rstb_u32']
 
     def out_bytes( self ):
-        mybytes = bytes([self.dataLow4bit & 0xFF,
-                        (self.dataLow4bit & 0xFF00) >> 8,
-                        (self.dataLow4bit & 0xFF0000) >> 16,
-                        (self.dataLow4bit & 0xFF000000) >> 24,
-                        self.dataHigh4bit & 0xFF,
-                        (self.dataHigh4bit & 0xFF00) >> 8,
-                        (self.dataHigh4bit & 0xFF0000) >> 16,
-                        (self.dataHigh4bit & 0xFF000000) >> 24,
-                        self.dataTop8bit & 0xFF,
-                        (self.dataTop8bit & 0xFF00) >> 8,
-                        (self.dataTop8bit & 0xFF0000) >> 16,
-                        (self.dataTop8bit & 0xFF000000) >> 24,
-                        self.ss_b & 0xFF,
-                        (self.ss_b & 0xFF00) >> 8,
-                        (self.ss_b & 0xFF0000) >> 16,
-                        (self.ss_b & 0xFF000000) >> 24,
-                        self.sclk & 0xFF,
-                        (self.sclk & 0xFF00) >> 8,
-                        (self.sclk & 0xFF0000) >> 16,
-                        (self.sclk & 0xFF000000) >> 24,
-                        self.sclk_n & 0xFF,
-                        (self.sclk_n & 0xFF00) >> 8,
-                        (self.sclk_n & 0xFF0000) >> 16,
-                        (self.sclk_n & 0xFF000000) >> 24,
-                        self.dqs0 & 0xFF,
-                        (self.dqs0 & 0xFF00) >> 8,
-                        (self.dqs0 & 0xFF0000) >> 16,
-                        (self.dqs0 & 0xFF000000) >> 24,
-                        self.dqs1 & 0xFF,
-                        (self.dqs1 & 0xFF00) >> 8,
-                        (self.dqs1 & 0xFF0000) >> 16,
-                        (self.dqs1 & 0xFF000000) >> 24,
-                        self.rst_b & 0xFF,
-                        (self.rst_b & 0xFF00) >> 8,
-                        (self.rst_b & 0xFF0000) >> 16,
-                        (self.rst_b & 0xFF000000) >> 24
-                        ])
-        return mybytes
+        return kMixspiPadCtrlSchema.pack(self)
 
 class pinTestPacket(object):
 
@@ -209,16 +650,11 @@ class pinTestPacket(object):
         self.unittestEn.set_members(mixspiPintestCfgDict)
         self.crcCheckSum = 0x0000
 
+    def out_buffer( self ):
+        return kCommandPacketSchemaDict[kCommandTag_PinTest].pack(self)
+
     def out_bytes( self ):
-        startbytes = bytes(kPacketTag, 'ascii') + bytes([kCommandTag_PinTest])
-        packetBytes = self.memConnection.out_bytes() + self.unittestEn.out_bytes()
-        self.crcCheckSum = calculate_crc16(packetBytes)
-        crcbytes = bytes([self.crcCheckSum & 0xFF,
-                         (self.crcCheckSum & 0xFF00) >> 8,
-                         self.reserved0[0],
-                         self.reserved0[1]
-                        ])
-        return startbytes + packetBytes + crcbytes
+        return bytes(self.out_buffer())
 
 class memoryPropertyStruct(object):
 
@@ -252,26 +688,7 @@ class memoryPropertyStruct(object):
         self.sampleRateMode = 0
 
     def out_bytes( self ):
-        mybytes = bytes([self.type,
-                         self.chip,
-                         self.speedMHz & 0xFF,
-                         (self.speedMHz & 0xFF00) >> 8,
-                         self.ioPadsMode,
-                         self.interfaceMode,
-                         self.sampleRateMode,
-                         self.reserved0,
-                         self.flashQuadEnableCfg & 0xFF,
-                         (self.flashQuadEnableCfg & 0xFF00) >> 8,
-                         self.flashQuadEnableBytes,
-                         self.reserved1
-                        ])
-        for i in range(uilut.CUSTOM_LUT_LENGTH):
-            mybytes += bytes([self.memLut[i] & 0xFF,
-                             (self.memLut[i] & 0xFF00) >> 8,
-                             (self.memLut[i] & 0xFF0000) >> 16,
-                             (self.memLut[i] & 0xFF000000) >> 24
-                             ])
-        return mybytes
+        return kMemoryPropertySchema.pack(self)
 
 class configSystemPacket(object):
 
@@ -280,7 +697,7 @@ class configSystemPacket(object):
         self.cpuSpeedMHz = None
         self.enableL1Cache = None
         self.enablePrefetch = None
-        self.prefetchBufSizeInByte = 4096
+        self.prefetchBufSizeInByte = None
         self.reserved0 = [0x0, 0x0]
         self.memConnection = None
         self.memProperty = None
@@ -303,27 +720,15 @@ class configSystemPacket(object):
         self.cpuSpeedMHz = toolCommDict['cpuSpeedMHz']
         self.enableL1Cache = toolCommDict['enableL1Cache']
         self.enablePrefetch = toolCommDict['enablePrefetch']
+        # Also the burst size of the LUT read estimate, see uicore.showLutReadEstimate()
+        self.prefetchBufSizeInByte = toolCommDict['prefetchBufSizeInByte']
         self.crcCheckSum = 0x0000
 
+    def out_buffer( self ):
+        return kCommandPacketSchemaDict[kCommandTag_ConfigSystem].pack(self)
+
     def out_bytes( self ):
-        startbytes = bytes(kPacketTag, 'ascii') + bytes([kCommandTag_ConfigSystem])
-        mybytes = bytes([self.cpuSpeedMHz & 0xFF,
-                          (self.cpuSpeedMHz & 0xFF00) >> 8,
-                          self.enableL1Cache,
-                          self.enablePrefetch,
-                          self.prefetchBufSizeInByte & 0xFF,
-                          (self.prefetchBufSizeInByte & 0xFF00) >> 8,
-                          self.reserved0[0],
-                          self.reserved0[1]
-                         ])
-        packetBytes = mybytes + self.memConnection.out_bytes() + self.memPadCtrl.out_bytes() + self.memProperty.out_bytes()
-        self.crcCheckSum = calculate_crc16(packetBytes)
-        crcbytes = bytes([self.crcCheckSum & 0xFF,
-                          (self.crcCheckSum & 0xFF00) >> 8,
-                          self.reserved1[0],
-                          self.reserved1[1]
-                         ])
-        return startbytes + packetBytes + crcbytes
+        return bytes(self.out_buffer())
 
 class memRegsPacket(object):
 
@@ -333,9 +738,11 @@ class memRegsPacket(object):
     def set_members( self ):
         pass
 
+    def out_buffer( self ):
+        return kCommandPacketSchemaDict[kCommandTag_AccessMemRegs].pack(self)
+
     def out_bytes( self ):
-        startbytes = bytes(kPacketTag, 'ascii') + bytes([kCommandTag_AccessMemRegs])
-        return startbytes
+        return bytes(self.out_buffer())
 
 class rwTestPacket(object):
 
@@ -357,33 +764,11 @@ class rwTestPacket(object):
         self.fillPatternWord = mixspiRwTestCfgDict['fillPatternWord']
         self.crcCheckSum = 0x0000
 
+    def out_buffer( self ):
+        return kCommandPacketSchemaDict[kCommandTag_RunRwTest].pack(self)
+
     def out_bytes( self ):
-        startbytes = bytes(kPacketTag, 'ascii') + bytes([kCommandTag_RunRwTest])
-        mybytes = bytes([self.testSet,
-                         self.reserved0[0],
-                         self.reserved0[1],
-                         self.reserved0[2],
-                         self.testMemStart & 0xFF,
-                         (self.testMemStart & 0xFF00) >> 8,
-                         (self.testMemStart & 0xFF0000) >> 16, 
-                         (self.testMemStart & 0xFF000000) >> 24,
-                         self.testMemSize & 0xFF,
-                         (self.testMemSize & 0xFF00) >> 8,
-                         (self.testMemSize & 0xFF0000) >> 16, 
-                         (self.testMemSize & 0xFF000000) >> 24,
-                         self.fillPatternWord & 0xFF,
-                         (self.fillPatternWord & 0xFF00) >> 8,
-                         (self.fillPatternWord & 0xFF0000) >> 16, 
-                         (self.fillPatternWord & 0xFF000000) >> 24
-                        ])
-        packetBytes = mybytes
-        self.crcCheckSum = calculate_crc16(packetBytes)
-        crcbytes = bytes([self.crcCheckSum & 0xFF,
-                          (self.crcCheckSum & 0xFF00) >> 8,
-                          self.reserved1[0],
-                          self.reserved1[1]
-                         ])
-        return startbytes + packetBytes + crcbytes
+        return bytes(self.out_buffer())
 
 class perfTestPacket(object):
 
@@ -392,7 +777,7 @@ class perfTestPacket(object):
         self.testSet = None
         self.subTestSet = None
         self.enableAverageShow = None
-        self.reserved0 = 0x0
+        self.resultFormat = kResultFormat_Ascii
         self.iterations = None
         self.testRamStart = None
         self.testRamSize = None
@@ -405,43 +790,18 @@ class perfTestPacket(object):
         self.testSet = mixspiPerfTestCfgDict['testSet']
         self.subTestSet = mixspiPerfTestCfgDict['subTestSet']
         self.enableAverageShow = mixspiPerfTestCfgDict['enableAverageShow']
+        self.resultFormat = mixspiPerfTestCfgDict.get('resultFormat', kResultFormat_Ascii)
         self.iterations = mixspiPerfTestCfgDict['iterations']
         self.testMemStart = mixspiPerfTestCfgDict['testMemStart']
         self.testMemSize = mixspiPerfTestCfgDict['testMemSize']
         self.testBlockSize = mixspiPerfTestCfgDict['testBlockSize']
         self.crcCheckSum = 0x0000
 
+    def out_buffer( self ):
+        return kCommandPacketSchemaDict[kCommandTag_RunPerfTest].pack(self)
+
     def out_bytes( self ):
-        startbytes = bytes(kPacketTag, 'ascii') + bytes([kCommandTag_RunPerfTest])
-        mybytes = bytes([self.testSet,
-                         self.subTestSet,
-                         self.enableAverageShow,
-                         self.reserved0,
-                         self.iterations & 0xFF,
-                         (self.iterations & 0xFF00) >> 8,
-                         (self.iterations & 0xFF0000) >> 16, 
-                         (self.iterations & 0xFF000000) >> 24,
-                         self.testMemStart & 0xFF,
-                         (self.testMemStart & 0xFF00) >> 8,
-                         (self.testMemStart & 0xFF0000) >> 16, 
-                         (self.testMemStart & 0xFF000000) >> 24,
-                         self.testMemSize & 0xFF,
-                         (self.testMemSize & 0xFF00) >> 8,
-                         (self.testMemSize & 0xFF0000) >> 16, 
-                         (self.testMemSize & 0xFF000000) >> 24,
-                         self.testBlockSize & 0xFF,
-                         (self.testBlockSize & 0xFF00) >> 8,
-                         (self.testBlockSize & 0xFF0000) >> 16, 
-                         (self.testBlockSize & 0xFF000000) >> 24
-                        ])
-        packetBytes = mybytes
-        self.crcCheckSum = calculate_crc16(packetBytes)
-        crcbytes = bytes([self.crcCheckSum & 0xFF,
-                          (self.crcCheckSum & 0xFF00) >> 8,
-                          self.reserved1[0],
-                          self.reserved1[1]
-                         ])
-        return startbytes + packetBytes + crcbytes
+        return bytes(self.out_buffer())
 
 class stressTestPacket(object):
 
@@ -449,7 +809,8 @@ class stressTestPacket(object):
         #super(stressTestPacket, self).__init__(parent)
         self.testSet = None
         self.enableStopWhenFail = None
-        self.reserved0 = [0x0, 0x0]
+        self.resultFormat = kResultFormat_Ascii
+        self.reserved0 = 0x0
         self.iterations = None
         self.testMemStart = None
         self.testMemSize = None
@@ -461,43 +822,18 @@ class stressTestPacket(object):
         mixspiStressTestCfgDict = uivar.getAdvancedSettings(uidef.kAdvancedSettings_StressTest)
         self.testSet = mixspiStressTestCfgDict['testSet']
         self.enableStopWhenFail = mixspiStressTestCfgDict['enableStopWhenFail']
+        self.resultFormat = mixspiStressTestCfgDict.get('resultFormat', kResultFormat_Ascii)
         self.iterations = mixspiStressTestCfgDict['iterations']
         self.testMemStart = mixspiStressTestCfgDict['testMemStart']
         self.testMemSize = mixspiStressTestCfgDict['testMemSize']
         self.testPageSize = mixspiStressTestCfgDict['testPageSize']
         self.crcCheckSum = 0x0000
 
+    def out_buffer( self ):
+        return kCommandPacketSchemaDict[kCommandTag_RunStressTest].pack(self)
+
     def out_bytes( self ):
-        startbytes = bytes(kPacketTag, 'ascii') + bytes([kCommandTag_RunStressTest])
-        mybytes = bytes([self.testSet,
-                         self.enableStopWhenFail,
-                         self.reserved0[0],
-                         self.reserved0[1],
-                         self.iterations & 0xFF,
-                         (self.iterations & 0xFF00) >> 8,
-                         (self.iterations & 0xFF0000) >> 16, 
-                         (self.iterations & 0xFF000000) >> 24,
-                         self.testMemStart & 0xFF,
-                         (self.testMemStart & 0xFF00) >> 8,
-                         (self.testMemStart & 0xFF0000) >> 16, 
-                         (self.testMemStart & 0xFF000000) >> 24,
-                         self.testMemSize & 0xFF,
-                         (self.testMemSize & 0xFF00) >> 8,
-                         (self.testMemSize & 0xFF0000) >> 16, 
-                         (self.testMemSize & 0xFF000000) >> 24,
-                         self.testPageSize & 0xFF,
-                         (self.testPageSize & 0xFF00) >> 8,
-                         (self.testPageSize & 0xFF0000) >> 16, 
-                         (self.testPageSize & 0xFF000000) >> 24
-                        ])
-        packetBytes = mybytes
-        self.crcCheckSum = calculate_crc16(packetBytes)
-        crcbytes = bytes([self.crcCheckSum & 0xFF,
-                          (self.crcCheckSum & 0xFF00) >> 8,
-                          self.reserved1[0],
-                          self.reserved1[1]
-                         ])
-        return startbytes + packetBytes + crcbytes
+        return bytes(self.out_buffer())
 
 class testStopPacket(object):
 
@@ -507,6 +843,75 @@ class testStopPacket(object):
     def set_members( self ):
         pass
 
+    def out_buffer( self ):
+        return kCommandPacketSchemaDict[kCommandTag_TestStop].pack(self)
+
+    def out_bytes( self ):
+        return bytes(self.out_buffer())
+
+class uartBaudratePacket(object):
+
+    def __init__( self, parent=None):
+        #super(uartBaudratePacket, self).__init__(parent)
+        self.commandTag = None
+        self.baudrate = None
+        self.crcCheckSum = None
+        self.reserved0 = [0x0, 0x0]
+
+    def set_members( self, baudrate, isConfirm=False ):
+        if isConfirm:
+            self.commandTag = kCommandTag_ConfirmBaudrate
+        else:
+            self.commandTag = kCommandTag_SetBaudrate
+        self.baudrate = baudrate
+        self.crcCheckSum = 0x0000
+
+    def out_buffer( self ):
+        return kCommandPacketSchemaDict[self.commandTag].pack(self)
+
+    def out_bytes( self ):
+        return bytes(self.out_buffer())
+
+class bulkStartPacket(object):
+
+    def __init__( self, parent=None):
+        #super(bulkStartPacket, self).__init__(parent)
+        self.transferId = None
+        self.dataType = None
+        self.chunkSize = None
+        self.totalSize = None
+        self.totalCrc16 = None
+        self.crcCheckSum = None
+        self.reserved0 = [0x0, 0x0]
+
+    def set_members( self, transferId, dataType, chunkSize, data ):
+        self.transferId = transferId
+        self.dataType = dataType
+        self.chunkSize = chunkSize
+        self.totalSize = len(data)
+        self.totalCrc16 = calculate_crc16(data)
+        self.crcCheckSum = 0x0000
+
+    def out_buffer( self ):
+        return kCommandPacketSchemaDict[kCommandTag_BulkStart].pack(self)
+
+    def out_bytes( self ):
+        return bytes(self.out_buffer())
+
+class handshakePacket(object):
+
+    def __init__( self, parent=None):
+        #super(handshakePacket, self).__init__(parent)
+        self.protocolVersion = None
+        self.crcCheckSum = None
+        self.reserved0 = [0x0, 0x0]
+
+    def set_members( self ):
+        self.protocolVersion = kHandshakeProtocolVersion
+        self.crcCheckSum = 0x0000
+
+    def out_buffer( self ):
+        return kCommandPacketSchemaDict[kCommandTag_Handshake].pack(self)
+
     def out_bytes( self ):
-        startbytes = bytes(kPacketTag, 'ascii') + bytes([kCommandTag_TestStop])
-        return startbytes
+        return bytes(self.out_buffer())
@@ -0,0 +1,264 @@
+#! /usr/bin/env python
+# -*- coding: utf-8 -*-
+
+# Copyright 2022 NXP
+# All rights reserved.
+#
+# SPDX-License-Identifier: BSD-3-Clause
+
+import sys
+import os
+import codecs
+from . import uipacket
+
+kUartPrintMagic_AsciiMode = b"Switch_To_ASCII_Mode"
+kUartPrintMagic_Hex8bMode = b"Switch_To_HEX8B_Mode"
+kUartResultFrameTag = bytes(uipacket.kResultFrameTag, 'ascii')
+kUartAckFrameTag = bytes(uipacket.kPacketTag, 'ascii')
+# kPacketTag + command tag + status
+kUartAckFrameSize = len(kUartAckFrameTag) + 2
+kUartLinkFrameTag = bytes(uipacket.kLinkFrameTag, 'ascii')
+kUartBulkAckFrameTag = bytes(uipacket.kBulkAckFrameTag, 'ascii')
+kUartFrameTagList = [kUartResultFrameTag, kUartAckFrameTag, kUartLinkFrameTag, kUartBulkAckFrameTag]
+
+# Pin test ADC conversion results come in blocks of 20 samples (one byte each)
+kUartPinWaveSampleBlockSize = 20
+
+kUartRecvRingBufferSize = 64 * 1024
+
+kUartPrintEvent_Text       = 0
+kUartPrintEvent_AsciiMode  = 1
+kUartPrintEvent_Hex8bMode  = 2
+kUartPrintEvent_PinSamples = 3
+kUartPrintEvent_Result     = 4
+kUartPrintEvent_Ack        = 5
+kUartPrintEvent_LinkFrame  = 6
+kUartPrintEvent_LinkError  = 7
+kUartPrintEvent_BulkAck    = 8
+
+class uartRingBuffer(object):
+
+    def __init__( self, size=kUartRecvRingBufferSize ):
+        self._size = size
+        self._buf = bytearray(size)
+        self._view = memoryview(self._buf)
+        self._head = 0
+        self._count = 0
+
+    def __len__( self ):
+        return self._count
+
+    def __getitem__( self, index ):
+        if index < 0 or index >= self._count:
+            raise IndexError('ring buffer index out of range')
+        return self._buf[(self._head + index) % self._size]
+
+    def clear( self ):
+        self._head = 0
+        self._count = 0
+
+    def freeSpace( self ):
+        return self._size - self._count
+
+    def write( self, data ):
+        # Copy as much of data as fits, returns the number of bytes taken.
+        data = memoryview(data)
+        num = min(len(data), self._size - self._count)
+        tail = (self._head + self._count) % self._size
+        first = min(num, self._size - tail)
+        self._view[tail:tail + first] = data[0:first]
+        if num > first:
+            self._view[0:num - first] = data[first:num]
+        self._count += num
+        return num
+
+    def consume( self, num ):
+        num = min(num, self._count)
+        self._head = (self._head + num) % self._size
+        self._count -= num
+        if self._count == 0:
+            self._head = 0
+
+    def segments( self, start, end ):
+        # Return the logical range [start, end) as up to two memoryviews, without copying.
+        end = min(end, self._count)
+        if start >= end:
+            return []
+        physStart = (self._head + start) % self._size
+        length = end - start
+        first = min(length, self._size - physStart)
+        views = [self._view[physStart:physStart + first]]
+        if length > first:
+            views.append(self._view[0:length - first])
+        return views
+
+    def find( self, pattern, start=0 ):
+        patLen = len(pattern)
+        if self._count - start < patLen:
+            return -1
+        physStart = self._head + start
+        firstEnd = min(self._head + self._count, self._size)
+        if physStart < firstEnd:
+            idx = self._buf.find(pattern, physStart, firstEnd)
+            if idx >= 0:
+                return idx - self._head
+        if self._head + self._count <= self._size:
+            return -1
+        # Matches straddling the wrap point are checked on a tiny window only.
+        firstLen = self._size - self._head
+        winStart = max(start, firstLen - patLen + 1)
+        winEnd = min(self._count, firstLen + patLen - 1)
+        window = b''.join(self.segments(winStart, winEnd))
+        idx = window.find(pattern)
+        if idx >= 0:
+            return winStart + idx
+        idx = self._buf.find(pattern, max(0, start - firstLen), self._count - firstLen)
+        if idx >= 0:
+            return firstLen + idx
+        return -1
+
+    def matchPrefixAtEnd( self, pattern ):
+        # Length of the longest tail that is a proper prefix of pattern.
+        for num in range(min(len(pattern) - 1, self._count), 0, -1):
+            if b''.join(self.segments(self._count - num, self._count)) == pattern[0:num]:
+                return num
+        return 0
+
+class uartPrintParser(object):
+
+    def __init__( self, ringSize=kUartRecvRingBufferSize ):
+        self.ring = uartRingBuffer(ringSize)
+        self.isAsciiMode = True
+        self._decoder = codecs.getincrementaldecoder('utf-8')('replace')
+
+    def reset( self ):
+        self.ring.clear()
+        self.isAsciiMode = True
+        self._decoder.reset()
+
+    def feed( self, data ):
+        # Returns a list of (kUartPrintEvent_*, value) tuples in stream order.
+        events = []
+        data = memoryview(data)
+        while len(data):
+            num = self.ring.write(data)
+            data = data[num:]
+            self._parse(events)
+        return events
+
+    def _findFrame( self ):
+        # Earliest result or ack frame tag, binary frames only come in ASCII mode.
+        frameIdx, frameTag = -1, None
+        if self.isAsciiMode:
+            for tag in kUartFrameTagList:
+                idx = self.ring.find(tag)
+                if idx >= 0 and (frameIdx < 0 or idx < frameIdx):
+                    frameIdx, frameTag = idx, tag
+        return frameIdx, frameTag
+
+    def _parse( self, events ):
+        while True:
+            if self.isAsciiMode:
+                magic = kUartPrintMagic_Hex8bMode
+            else:
+                magic = kUartPrintMagic_AsciiMode
+            frameIdx, frameTag = self._findFrame()
+            idx = self.ring.find(magic)
+            if frameIdx >= 0 and (idx < 0 or frameIdx < idx):
+                if frameTag == kUartResultFrameTag:
+                    isParsed = self._parseCrcFrame(frameIdx, uipacket.kResultFrameSize, uipacket.decode_result_frame, kUartPrintEvent_Result, events)
+                elif frameTag == kUartBulkAckFrameTag:
+                    isParsed = self._parseCrcFrame(frameIdx, uipacket.kBulkAckFrameSize, uipacket.decode_bulk_ack_frame, kUartPrintEvent_BulkAck, events)
+                elif frameTag == kUartAckFrameTag:
+                    isParsed = self._parseAckFrame(frameIdx, events)
+                else:
+                    isParsed = self._parseLinkFrame(frameIdx, events)
+                if not isParsed:
+                    return
+                continue
+            if idx < 0:
+                # Hold back anything that might be the start of a split magic or frame.
+                keep = self.ring.matchPrefixAtEnd(magic)
+                if self.isAsciiMode:
+                    for tag in kUartFrameTagList:
+                        keep = max(keep, self.ring.matchPrefixAtEnd(tag))
+                self._drain(len(self.ring) - keep, events, False)
+                return
+            self._drain(idx, events, True)
+            self.ring.consume(len(magic))
+            self.isAsciiMode = not self.isAsciiMode
+            if self.isAsciiMode:
+                events.append((kUartPrintEvent_AsciiMode, None))
+            else:
+                events.append((kUartPrintEvent_Hex8bMode, None))
+
+    def _parseCrcFrame( self, frameIdx, frameSize, decodeFunc, event, events ):
+        # Fixed size frame checked by decodeFunc, returns False if the frame is not complete yet.
+        self._drain(frameIdx, events, False)
+        if len(self.ring) < frameSize:
+            return False
+        value = decodeFunc(b''.join(self.ring.segments(0, frameSize)))
+        if value == None:
+            # Not a valid frame after all, let the tag byte through as text.
+            self._drain(1, events, False)
+        else:
+            self.ring.consume(frameSize)
+            events.append((event, value))
+        return True
+
+    def _parseAckFrame( self, frameIdx, events ):
+        # Returns False if the frame is not complete yet.
+        self._drain(frameIdx, events, False)
+        if len(self.ring) < kUartAckFrameSize:
+            return False
+        commandTag = self.ring[len(kUartAckFrameTag)]
+        if commandTag in uipacket.kCommandPacketSchemaDict:
+            events.append((kUartPrintEvent_Ack, (commandTag, self.ring[len(kUartAckFrameTag) + 1])))
+            self.ring.consume(kUartAckFrameSize)
+        else:
+            self._drain(1, events, False)
+        return True
+
+    def _parseLinkFrame( self, frameIdx, events ):
+        # Returns False if the frame is not complete yet.
+        self._drain(frameIdx, events, False)
+        if len(self.ring) < uipacket.kLinkFrameHeaderSize:
+            return False
+        frameSize = uipacket.get_link_frame_size(b''.join(self.ring.segments(0, uipacket.kLinkFrameHeaderSize)))
+        frame = None
+        if frameSize != None:
+            if len(self.ring) < frameSize and self.ring.freeSpace():
+                return False
+            if len(self.ring) >= frameSize:
+                frame = uipacket.decode_link_frame(b''.join(self.ring.segments(0, frameSize)))
+        if frame == None:
+            # Broken header or crc, skip the tag and resync on the next one.
+            self.ring.consume(len(kUartLinkFrameTag))
+            events.append((kUartPrintEvent_LinkError, None))
+        else:
+            self.ring.consume(frameSize)
+            events.append((kUartPrintEvent_LinkFrame, frame))
+        return True
+
+    def _drain( self, num, events, isModeEnd ):
+        if self.isAsciiMode:
+            text = ''
+            for view in self.ring.segments(0, num):
+                text += self._decoder.decode(view)
+            if isModeEnd:
+                text += self._decoder.decode(b'', True)
+                self._decoder.reset()
+            self.ring.consume(num)
+            if text:
+                events.append((kUartPrintEvent_Text, text))
+        else:
+            blocks = num // kUartPinWaveSampleBlockSize
+            if blocks:
+                # Only the latest block is of interest to the waveform.
+                blockStart = (blocks - 1) * kUartPinWaveSampleBlockSize
+                samples = b''.join(self.ring.segments(blockStart, blockStart + kUartPinWaveSampleBlockSize))
+                events.append((kUartPrintEvent_PinSamples, samples))
+            if isModeEnd:
+                self.ring.consume(num)
+            else:
+                self.ring.consume(blocks * kUartPinWaveSampleBlockSize)
@@ -0,0 +1,36 @@
+#! /usr/bin/env python
+# -*- coding: utf-8 -*-
+
+# Copyright 2022 NXP
+# All rights reserved.
+#
+# SPDX-License-Identifier: BSD-3-Clause
+
+# matplotlib takes most of the startup time, uicore only imports this module once the pin
+# waveform is needed
+import matplotlib
+matplotlib.use("Qt5Agg")
+from matplotlib.backends.backend_qt5agg import FigureCanvasQTAgg as FigureCanvas
+from matplotlib.figure import Figure
+import matplotlib.animation as animation
+
+class pinWaveformFigure(FigureCanvas):
+
+    def __init__(self, waveData, width=5, height=4, dpi=100):
+        # waveData is updated in place by the receiver, the animation redraws it every second
+        self.waveData = waveData
+        self.fig = Figure(figsize=(width, height), dpi=dpi)
+        super(pinWaveformFigure,self).__init__(self.fig)
+        self.axes = self.fig.add_subplot(111)
+        self.axes.set_xlabel('Time(ms)')
+        self.axes.set_ylabel('Volt(3.3V)')
+        self.axes.set_ylim(0,1.1)
+        self.plotwave()
+        self.ani = animation.FuncAnimation(self.fig, self.animate, interval=1000, blit=True, save_count=50)
+
+    def plotwave(self):
+        self.line, = self.axes.plot(self.waveData)
+
+    def animate(self, i):
+        self.line.set_ydata(self.waveData)
+        return self.line,
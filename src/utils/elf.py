@@ -73,7 +73,7 @@ class ELFException(Exception): pass
 class ELFSymbol:
     Elf32_Sym = "<IIIBBH"
     
-    STB_LOCAL = 0,  # Local symbol not visible outside the object file.
+    STB_LOCAL = 0   # Local symbol not visible outside the object file.
     STB_GLOBAL = 1  # Symbol is visible to all object files being linked together.
     STB_WEAK = 2    # Like global symbols, but with lower precedence.
     STB_LOPROC = 13
@@ -254,15 +254,18 @@ class ELFObject:
         fileobj.seek(0)
         
         #get file header
+        ehdr = fileobj.read(struct.calcsize(self.Elf32_Ehdr))
+        if len(ehdr) < struct.calcsize(self.Elf32_Ehdr):
+            raise ELFException("File is too short for an ELF header")
         (self.e_ident, self.e_type, self.e_machine, self.e_version,
         self.e_entry, self.e_phoff, self.e_shoff,
         self.e_flags, self.e_ehsize, self.e_phentsize, self.e_phnum,
         self.e_shentsize, self.e_shnum, self.e_shstrndx) = struct.unpack(
-            self.Elf32_Ehdr, fileobj.read(struct.calcsize(self.Elf32_Ehdr)))
+            self.Elf32_Ehdr, ehdr)
         #verify if its a known format and realy an ELF file
-        if self.e_ident[0:4]             != '\x7fELF' and\
-           self.e_ident[self.EI_CLASS]   != self.ELFCLASS32 and\
-           self.e_ident[self.EI_DATA]    != self.ELFDATA2LSB and\
+        if self.e_ident[0:4]             != b'\x7fELF' or\
+           self.e_ident[self.EI_CLASS]   != self.ELFCLASS32 or\
+           self.e_ident[self.EI_DATA]    != self.ELFDATA2LSB or\
            self.e_ident[self.EI_VERSION] != 1:
                 raise ELFException("Not a valid ELF file")
 
@@ -272,24 +275,23 @@ class ELFObject:
             #load program headers
             fileobj.seek(self.e_phoff)
             for sectionnum in range(self.e_phnum):
-                shdr = (fileobj.read(self.e_phentsize) + '\0'* struct.calcsize(ELFProgramHeader.Elf32_Phdr))[0:struct.calcsize(ELFProgramHeader.Elf32_Phdr)]
+                shdr = (fileobj.read(self.e_phentsize) + b'\0'* struct.calcsize(ELFProgramHeader.Elf32_Phdr))[0:struct.calcsize(ELFProgramHeader.Elf32_Phdr)]
                 psection = ELFProgramHeader()
                 psection.fromString(shdr)
-                if psection.p_offset:   #skip if section has invalid offset in file
+                if psection.p_offset or psection.p_filesz:   #skip if section has invalid offset in file
                     self.programmheaders.append(psection)
-            #~ #get the segment data from the file for each prg header
-            #~ for phdr in self.programmheaders:
-                #~ fileobj.seek(phdr.p_offset)
-                #~ phdr.data = fileobj.read(phdr.p_filesz)
-                #~ #pad if needed
-                #~ if phdr.p_filesz < phdr.p_memsz:
-                    #~ phdr.data = phdr.data + '\0' * (phdr.p_memsz-phdr.p_filesz)
+            #get the segment data from the file for each prg header, without the zero fill up to p_memsz
+            for phdr in self.programmheaders:
+                fileobj.seek(phdr.p_offset)
+                phdr.data = fileobj.read(phdr.p_filesz)
+                if len(phdr.data) != phdr.p_filesz:
+                    raise ELFException("Segment at 0x%08x is cut off by the end of file" % phdr.p_paddr)
 
         #load sections
         self.sections = []
         fileobj.seek(self.e_shoff)
         for sectionnum in range(self.e_shnum):
-            shdr = (fileobj.read(self.e_shentsize) + '\0'* struct.calcsize(ELFSection.Elf32_Shdr))[0:struct.calcsize(ELFSection.Elf32_Shdr)]
+            shdr = (fileobj.read(self.e_shentsize) + b'\0'* struct.calcsize(ELFSection.Elf32_Shdr))[0:struct.calcsize(ELFSection.Elf32_Shdr)]
             elfsection = ELFSection()
             elfsection.fromString(shdr)
             self.sections.append(elfsection)
@@ -300,22 +302,26 @@ class ELFObject:
             data = fileobj.read(section.sh_size)
             section.data = data
             if section.sh_type == ELFSection.SHT_STRTAB:
-                section.values = data.split('\0')
+                section.values = [value.decode('ascii', 'replace') for value in data.split(b'\0')]
             section.lma = self.getLMA(section)
         
-        #get section names
+        #get section names, a file without section headers has none
+        if self.sections and self.e_shstrndx >= len(self.sections):
+            raise ELFException("Section name table index is out of range")
         for section in self.sections:
 #             start = self.sections[self.e_shstrndx].data[section.sh_name:]
 #             section.name = start.split('\0')[0]
             section.name = self.getString(self.e_shstrndx, section.sh_name)
 
-        # Load symbols.
+        # Load symbols, a stripped file has none.
         symtab = self.getSection('.symtab')
-        symsize = symtab.sh_entsize
-        self.symbolCount = symtab.sh_size / symsize
+        self.symbolCount = 0
+        if symtab is not None and symtab.sh_entsize >= struct.calcsize(ELFSymbol.Elf32_Sym):
+            self.symbolCount = len(symtab.data) // symtab.sh_entsize
         self.symbols = []
         self.symbolDict = {}
         for symnum in range(self.symbolCount):
+            symsize = symtab.sh_entsize
             # Compute range
             start = symnum * symsize
             end = start + symsize
@@ -332,8 +338,10 @@ class ELFObject:
             self.symbolDict[sym.name] = sym
         
     def getString(self, table, index):
+        if table >= len(self.sections):
+            raise ELFException("String table index is out of range")
         start = self.sections[table].data[index:]
-        return start.split('\0')[0]
+        return start.split(b'\0')[0].decode('ascii', 'replace')
     
     def getSection(self, name):
         """get section by name"""
@@ -389,7 +397,7 @@ class ELFObject:
 if __name__ == '__main__':
     print ("This is only a module test!")
     elf = ELFObject()
-    elf.fromFile(open("test.elf"))
+    elf.fromFile(open("test.elf", 'rb'))
     if elf.e_type != ELFObject.ET_EXEC:
         raise Exception("No executable")
     print (elf)
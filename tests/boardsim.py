@@ -0,0 +1,234 @@
+#! /usr/bin/env python
+# -*- coding: utf-8 -*-
+
+# Copyright 2022 NXP
+# All rights reserved.
+# 
+# SPDX-License-Identifier: BSD-3-Clause
+
+import os
+import pty
+import tty
+import time
+import select
+import struct
+import threading
+
+from boot import mcuboot
+from boot import commands
+from boot import properties
+from boot import status
+from boot import sdp
+
+# pty master end as a pyserial-like port for the stand-ins
+class ptyMasterPort(object):
+
+    def __init__( self, fd, timeout=0.1 ):
+        self.fd = fd
+        self.timeout = timeout
+
+    def read( self, length ):
+        readable, writable, errored = select.select([self.fd], [], [], self.timeout)
+        if not readable:
+            return b''
+        return os.read(self.fd, length)
+
+    def write( self, data ):
+        data = memoryview(bytes(data))
+        while len(data):
+            data = data[os.write(self.fd, data):]
+
+    def reset_input_buffer( self ):
+        while self.read(4096):
+            pass
+
+# Raw pty pair, the host opens slaveName and a stand-in serves masterPort
+class ptyPair(object):
+
+    def __init__( self ):
+        self.masterFd, self.slaveFd = pty.openpty()
+        tty.setraw(self.masterFd)
+        tty.setraw(self.slaveFd)
+        self.slaveName = os.ttyname(self.slaveFd)
+        self.masterPort = ptyMasterPort(self.masterFd)
+
+    def close( self ):
+        os.close(self.masterFd)
+        os.close(self.slaveFd)
+
+# ROM side of the MCUboot serial protocol. Written memory goes to the memory dictionary
+# (address to bytes), data packets sent outside a command (receive-sb-file) to loadedData.
+# nakDataPackets naks that many data packets first, as a noisy line would.
+class McuBootStandIn(threading.Thread):
+
+    def __init__( self, serialPort, maxPacketSize=512, nakDataPackets=0 ):
+        super(McuBootStandIn, self).__init__()
+        self.daemon = True
+        self.maxPacketSize = maxPacketSize
+        self.nakDataPackets = nakDataPackets
+        self.memory = {}
+        self.loadedData = bytearray()
+        self.commandLog = []
+        self.pingCount = 0
+        self._serial = serialPort
+        self._isStopped = False
+
+    def stop( self ):
+        self._isStopped = True
+        self.join()
+
+    def _read( self, length ):
+        data = bytearray()
+        while len(data) < length:
+            if self._isStopped:
+                raise EOFError
+            data += self._serial.read(length - len(data))
+        return bytes(data)
+
+    def _writePacket( self, packetType, payload ):
+        header = struct.pack('<BBH', mcuboot.kFramingStartByte, packetType, len(payload))
+        crc = mcuboot.calculateCrc16(payload, mcuboot.calculateCrc16(header))
+        self._serial.write(header + struct.pack('<H', crc) + payload)
+        # The host acks every packet
+        self._readPacket()
+
+    def _writeResponse( self, tag, flags, params ):
+        payload = mcuboot.kCommandHeaderStruct.pack(tag, flags, 0, len(params)) + struct.pack('<%dI' % len(params), *params)
+        self._writePacket(mcuboot.kFramingPacketType_Command, payload)
+
+    def _readPacket( self ):
+        # Returns (packetType, payload), payload is None for acks and pings
+        while self._read(1)[0] != mcuboot.kFramingStartByte:
+            pass
+        packetType = self._read(1)[0]
+        if packetType == mcuboot.kFramingPacketType_Ping:
+            self.pingCount += 1
+            response = struct.pack('<BBBBBc', mcuboot.kFramingStartByte, mcuboot.kFramingPacketType_PingResponse, 0, 1, 2, b'P') + struct.pack('<H', 0)
+            self._serial.write(response + struct.pack('<H', mcuboot.calculateCrc16(response)))
+            return packetType, None
+        if packetType in (mcuboot.kFramingPacketType_Ack, mcuboot.kFramingPacketType_Nak, mcuboot.kFramingPacketType_AckAbort):
+            return packetType, None
+        length, crc = struct.unpack('<HH', self._read(4))
+        payload = self._read(length)
+        header = struct.pack('<BBH', mcuboot.kFramingStartByte, packetType, length)
+        if crc != mcuboot.calculateCrc16(payload, mcuboot.calculateCrc16(header)):
+            self._serial.write(bytes([mcuboot.kFramingStartByte, mcuboot.kFramingPacketType_Nak]))
+            return packetType, None
+        if packetType == mcuboot.kFramingPacketType_Data and self.nakDataPackets:
+            self.nakDataPackets -= 1
+            self._serial.write(bytes([mcuboot.kFramingStartByte, mcuboot.kFramingPacketType_Nak]))
+            return packetType, None
+        self._serial.write(bytes([mcuboot.kFramingStartByte, mcuboot.kFramingPacketType_Ack]))
+        return packetType, payload
+
+    def _readDataPhase( self, length ):
+        data = b''
+        while len(data) < length:
+            packetType, payload = self._readPacket()
+            if packetType == mcuboot.kFramingPacketType_Data and payload != None:
+                data += payload
+        return data
+
+    def run( self ):
+        try:
+            while not self._isStopped:
+                packetType, payload = self._readPacket()
+                if payload == None:
+                    continue
+                if packetType == mcuboot.kFramingPacketType_Data:
+                    self.loadedData += payload
+                    continue
+                tag, flags, reserved, paramCount = mcuboot.kCommandHeaderStruct.unpack_from(payload)
+                params = struct.unpack_from('<%dI' % paramCount, payload, mcuboot.kCommandHeaderStruct.size)
+                self.commandLog.append((tag, params))
+                self._handleCommand(tag, params)
+        except EOFError:
+            pass
+
+    def _handleCommand( self, tag, params ):
+        if tag == commands.kCommandTag_GetProperty:
+            value = {properties.kPropertyTag_CurrentVersion: 0x4b020800,
+                     properties.kPropertyTag_MaxPacketSize:  self.maxPacketSize}.get(params[0])
+            if value == None:
+                self._writeResponse(mcuboot.kResponseTag_GetProperty, 0, [status.kStatus_UnknownProperty])
+            else:
+                self._writeResponse(mcuboot.kResponseTag_GetProperty, 0, [status.kStatus_Success, value])
+        elif tag == commands.kCommandTag_WriteMemory:
+            address, length = params[0], params[1]
+            self._writeResponse(mcuboot.kResponseTag_Generic, 0, [status.kStatus_Success, tag])
+            self.memory[address] = self._readDataPhase(length)
+            self._writeResponse(mcuboot.kResponseTag_Generic, 0, [status.kStatus_Success, tag])
+        elif tag == commands.kCommandTag_ReadMemory:
+            address, length = params[0], params[1]
+            data = self.memory.get(address, b'')[0:length]
+            data += bytes(length - len(data))
+            self._writeResponse(mcuboot.kResponseTag_ReadMemory, mcuboot.kCommandFlag_HasDataPhase, [status.kStatus_Success, length])
+            for offset in range(0, length, self.maxPacketSize):
+                self._writePacket(mcuboot.kFramingPacketType_Data, data[offset:offset + self.maxPacketSize])
+            self._writeResponse(mcuboot.kResponseTag_Generic, 0, [status.kStatus_Success, tag])
+        else:
+            self._writeResponse(mcuboot.kResponseTag_Generic, 0, [status.kStatus_Success, tag])
+
+# ROM side of the serial download protocol, serving one pyserial-like port from a thread. Written
+# files and registers go to the memory dictionary (address to bytes). With lineBaudrate set,
+# received data takes as long as it would on a real UART at that baudrate.
+class SdpStandIn(threading.Thread):
+
+    def __init__( self, serialPort, habMode=status.kSDP_Status_HabDisabled, lineBaudrate=None ):
+        super(SdpStandIn, self).__init__()
+        self.daemon = True
+        self.habMode = habMode
+        self.memory = {}
+        self.jumpAddress = None
+        self.commandCount = 0
+        self.lineBaudrate = lineBaudrate
+        self._serial = serialPort
+        self._isStopped = False
+
+    def stop( self ):
+        self._isStopped = True
+        self.join()
+
+    def _read( self, length ):
+        data = bytearray()
+        while len(data) < length and not self._isStopped:
+            received = self._serial.read(length - len(data))
+            if received and self.lineBaudrate:
+                time.sleep(len(received) * 10.0 / self.lineBaudrate)
+            data += received
+        return bytes(data)
+
+    def _writeWords( self, *words ):
+        self._serial.write(b''.join([sdp.kSdpWordStruct.pack(word) for word in words]))
+
+    def run( self ):
+        while not self._isStopped:
+            packet = self._read(sdp.kSdpCommandStruct.size)
+            if len(packet) < sdp.kSdpCommandStruct.size:
+                continue
+            command, address, format, dataCount, data = sdp.kSdpCommandStruct.unpack(packet)
+            self.commandCount += 1
+            if command == sdp.kSdpCommand_ErrorStatus:
+                self._writeWords(self.habMode, status.kSDP_Response_HabStatusSuccess)
+            elif command == sdp.kSdpCommand_WriteFile or command == sdp.kSdpCommand_DcdWrite:
+                self.memory[address] = self._read(dataCount)
+                if command == sdp.kSdpCommand_WriteFile:
+                    self._writeWords(self.habMode, status.kSDP_Response_WriteFileComplete)
+                else:
+                    self._writeWords(self.habMode, status.kSDP_Response_WriteComplete)
+            elif command == sdp.kSdpCommand_WriteRegister:
+                self.memory[address] = sdp.kSdpWordStruct.pack(data)[0:format // 8]
+                self._writeWords(self.habMode, status.kSDP_Response_WriteComplete)
+            elif command == sdp.kSdpCommand_ReadRegister:
+                value = self.memory.get(address, b'')[0:dataCount]
+                value += bytes((((dataCount + 3) & ~3) - len(value)))
+                self._writeWords(self.habMode)
+                self._serial.write(value)
+            elif command == sdp.kSdpCommand_SkipDcdHeader:
+                self._writeWords(self.habMode, status.kSDP_Response_OkAck)
+            elif command == sdp.kSdpCommand_JumpAddress:
+                self._writeWords(self.habMode)
+                self.jumpAddress = address
+            else:
+                # Unknown command, resync on the next one
+                self._serial.reset_input_buffer()
@@ -0,0 +1,56 @@
+#! /usr/bin/env python
+# -*- coding: utf-8 -*-
+
+# Copyright 2022 NXP
+# All rights reserved.
+# 
+# SPDX-License-Identifier: BSD-3-Clause
+
+import os
+import sys
+import pytest
+
+kTestRoot = os.path.dirname(os.path.abspath(__file__))
+kSrcRoot = os.path.join(os.path.dirname(kTestRoot), 'src')
+if kSrcRoot not in sys.path:
+    sys.path.insert(0, kSrcRoot)
+os.environ.setdefault('QT_QPA_PLATFORM', 'offscreen')
+
+@pytest.fixture(scope='session')
+def qapp():
+    from PyQt5.QtWidgets import QApplication
+    app = QApplication.instance() or QApplication([])
+    yield app
+
+@pytest.fixture
+def srcdir(monkeypatch):
+    # The GUI resolves its data files relative to the working directory, like main.py does
+    monkeypatch.chdir(kSrcRoot)
+    return kSrcRoot
+
+@pytest.fixture(scope='module')
+def mainWin(qapp, tmp_path_factory):
+    cwd = os.getcwd()
+    os.chdir(kSrcRoot)
+    try:
+        import main
+        win = main.memTesterMain(None)
+    finally:
+        os.chdir(cwd)
+    # Settings are saved on close, keep them out of the tree
+    from ui import uivar
+    uivar.g_cfgFilename = str(tmp_path_factory.mktemp('settings') / 'mtu_settings.json')
+    yield win
+    win.close()
+
+@pytest.fixture
+def cpuDir(mainWin, tmp_path, monkeypatch):
+    # boot_firmware.bin and friends are written by the tests, keep them out of the tree
+    from run import runcore
+    createTarget = runcore.createTarget
+    def _createTarget( device, exeBinRoot ):
+        tgt, targetCpuDir = createTarget(device, exeBinRoot)
+        return tgt, str(tmp_path)
+    monkeypatch.setattr(runcore, 'createTarget', _createTarget)
+    mainWin.createMcuTarget()
+    return tmp_path
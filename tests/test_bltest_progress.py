@@ -0,0 +1,98 @@
+#! /usr/bin/env python
+# -*- coding: utf-8 -*-
+
+# Copyright 2022 NXP
+# All rights reserved.
+# 
+# SPDX-License-Identifier: BSD-3-Clause
+
+import os
+import sys
+import stat
+import json
+import pytest
+
+from boot import bltest
+from boot import target
+
+kImageSize = 64 * 1024
+kResults = {'command': 'write-memory', 'status': {'value': 0, 'description': '0 (0x0) Success.'}, 'response': [kImageSize]}
+
+# Stands in for blhost, prints nothing for a while, then text with stray braces around the JSON results
+kFakeToolScript = '''#!{python}
+import sys
+import time
+time.sleep({delay})
+sys.stdout.write({output!r})
+sys.exit({exitCode})
+'''
+
+@pytest.fixture
+def fakeTool(tmp_path):
+    bltest.clearLinkThroughput()
+    imageFile = tmp_path / 'image.bin'
+    imageFile.write_bytes(bytes(kImageSize))
+    def _create( output, exitCode=0, delay=0.5 ):
+        toolFile = tmp_path / 'blhost'
+        toolFile.write_text(kFakeToolScript.format(python=sys.executable, delay=delay, output=output, exitCode=exitCode))
+        os.chmod(str(toolFile), os.stat(str(toolFile)).st_mode | stat.S_IXUSR)
+        bootloader = bltest.Bootloader(target.Target('test'), str(tmp_path))
+        bootloader._commandArgs = [str(toolFile), '-p', 'COM9,115200', '-j', '--']
+        events = []
+        bootloader.progressCallback = events.append
+        return bootloader, events, str(imageFile)
+    yield _create
+    bltest.clearLinkThroughput()
+
+def test_tool_progress_is_estimated_until_results(fakeTool):
+    output = 'Inject command {write-memory}\n' + json.dumps(kResults, indent=4) + '\n}\n'
+    bootloader, events, imageFile = fakeTool(output)
+    status, response, cmdStr = bootloader.writeMemory(0x20200000, imageFile)
+    assert (status, response) == (0, [kImageSize])
+    assert bootloader.commandResults == kResults
+    # Estimates while the tool is quiet, then the completed transfer once it exits
+    assert len(events) >= 3
+    estimates = events[0:-1]
+    assert all(event.isEstimated and event.command == 'write-memory' for event in estimates)
+    assert [event.bytesDone for event in estimates] == sorted(event.bytesDone for event in estimates)
+    assert estimates[-1].bytesDone < kImageSize * bltest.kEstimatedProgressLimit
+    assert events[-1] == bltest.CommandProgress('write-memory', kImageSize, kImageSize, events[-1].bytesPerSecond, 0, False)
+    assert events[-1].bytesPerSecond > 0
+    # The transfer calibrated the link
+    assert bltest.getLinkThroughput('COM9,115200') > 0
+
+def test_failed_tool_does_not_complete_progress(fakeTool):
+    bootloader, events, imageFile = fakeTool('Error: cannot open port\n', exitCode=1, delay=0.3)
+    status, response, cmdStr = bootloader.writeMemory(0x20200000, imageFile)
+    assert (status, response) == (bltest.kBlhostError_ReturnedError, None)
+    assert events and all(event.isEstimated for event in events)
+    assert bltest.getLinkThroughput('COM9,115200') == None
+
+def test_tool_without_results(fakeTool):
+    bootloader, events, imageFile = fakeTool('no json here }{\n', delay=0)
+    status, response, cmdStr = bootloader.writeMemory(0x20200000, imageFile)
+    assert (status, response) == (bltest.kBlhostError_NoOutput, None)
+
+def test_progress_callback_stops_tool(fakeTool):
+    bootloader, events, imageFile = fakeTool(json.dumps(kResults), delay=30)
+    def _cancel( progress ):
+        raise KeyboardInterrupt()
+    bootloader.progressCallback = _cancel
+    with pytest.raises(KeyboardInterrupt):
+        bootloader.writeMemory(0x20200000, imageFile)
+
+def test_command_without_data_reports_nothing(fakeTool):
+    bootloader, events, imageFile = fakeTool(json.dumps({'status': {'value': 0, 'description': 'Success.'}, 'response': []}), delay=0.3)
+    assert bootloader.reset()[0] == 0
+    assert events == []
+
+@pytest.mark.parametrize('output, results', [
+    ('{"status": {"value": 0}}', {'status': {'value': 0}}),
+    ('Ping responded {ok}\n{"response": [1, 2], "status": {"value": 5}} done }', {'response': [1, 2], 'status': {'value': 5}}),
+    ('{"a": {"b": "}"}}\n{"c": 1}', {'a': {'b': '}'}}),
+    ('{ not json', None),
+    ('', None),
+])
+def test_find_json_results(output, results):
+    bootloader = bltest.Bootloader(target.Target('test'), '')
+    assert bootloader._findJsonResults(output) == results
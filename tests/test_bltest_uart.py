@@ -0,0 +1,119 @@
+#! /usr/bin/env python
+# -*- coding: utf-8 -*-
+
+# Copyright 2022 NXP
+# All rights reserved.
+# 
+# SPDX-License-Identifier: BSD-3-Clause
+
+import os
+import time
+import pytest
+
+from boot import bltest
+from boot import commands
+from boot import properties
+from boot import peripherals
+from boot import target
+from tests import boardsim
+
+@pytest.fixture
+def rom():
+    pair = boardsim.ptyPair()
+    standIns = []
+    def _start( **kwargs ):
+        standIn = boardsim.McuBootStandIn(pair.masterPort, **kwargs)
+        standIn.start()
+        standIns.append(standIn)
+        return standIn, pair.slaveName
+    yield _start
+    for standIn in standIns:
+        standIn.stop()
+    pair.close()
+
+def _createBootloader( port, tmp_path ):
+    return bltest.createBootloader(target.Target('test'), str(tmp_path), peripherals.kPeripheral_UART, 115200, port, '', '', True, True)
+
+def test_get_property(rom, tmp_path):
+    standIn, port = rom()
+    device = _createBootloader(port, tmp_path)
+    try:
+        commandStatus, response, cmdStr = device.getProperty(properties.kPropertyTag_CurrentVersion)
+    finally:
+        device.close()
+    assert commandStatus == 0
+    assert response == [0x4b020800]
+
+def test_session_keeps_one_port(rom, tmp_path):
+    standIn, port = rom()
+    device = _createBootloader(port, tmp_path)
+    try:
+        for i in range(3):
+            assert device.getProperty(properties.kPropertyTag_CurrentVersion)[0] == 0
+        assert device.fillMemory(0x20001000, 16, 0xab, 'byte')[0] == 0
+        assert device.execute(0x20000000, 0, 0x20001000)[0] == 0
+    finally:
+        device.close()
+    # Pinged once for the whole session
+    assert standIn.pingCount == 1
+    assert [tag for tag, params in standIn.commandLog][-2:] == [commands.kCommandTag_FillMemory, commands.kCommandTag_Execute]
+
+def test_write_and_read_memory(rom, tmp_path):
+    standIn, port = rom(nakDataPackets=2)
+    firmwareData = os.urandom(5000)
+    firmwareFile = tmp_path / 'fw.bin'
+    firmwareFile.write_bytes(firmwareData)
+    device = _createBootloader(port, tmp_path)
+    try:
+        assert device.writeMemory(0x20000000, str(firmwareFile))[0] == 0
+        assert standIn.memory[0x20000000] == firmwareData
+        device.readMemory(0x20000000, 100, 'readback.bin')
+    finally:
+        device.close()
+    assert (tmp_path / 'readback.bin').read_bytes() == firmwareData[:100]
+
+def test_load_image(rom, tmp_path):
+    standIn, port = rom()
+    imageData = os.urandom(3000)
+    imageFile = tmp_path / 'image.sb'
+    imageFile.write_bytes(imageData)
+    device = _createBootloader(port, tmp_path)
+    try:
+        assert device.loadImage(str(imageFile))[0] == 0
+    finally:
+        device.close()
+    assert bytes(standIn.loadedData) == imageData
+
+def test_silent_port_fails_fast(tmp_path):
+    pair = boardsim.ptyPair()
+    device = _createBootloader(pair.slaveName, tmp_path)
+    try:
+        startTime = time.time()
+        commandStatus = device.getProperty(properties.kPropertyTag_CurrentVersion)[0]
+        seconds = time.time() - startTime
+    finally:
+        device.close()
+        pair.close()
+    assert commandStatus != 0
+    assert seconds < 2
+
+def test_missing_port_fails(tmp_path):
+    device = _createBootloader('/dev/nonexistent-mcu-port', tmp_path)
+    try:
+        assert device.getProperty(properties.kPropertyTag_CurrentVersion)[0] != 0
+    finally:
+        device.close()
+
+def test_fill_memory_gets_fixed_timeout(rom, tmp_path):
+    standIn, port = rom()
+    device = _createBootloader(port, tmp_path)
+    try:
+        # A large fill must not be timed as if all of it went over the link
+        assert device.fillMemory(0x20000000, 64 * 1024 * 1024, 0x5a5a5a5a)[0] == 0
+        assert device.timeout == bltest.kCommandTimeoutInSeconds
+        firmwareFile = tmp_path / 'fw.bin'
+        firmwareFile.write_bytes(os.urandom(64 * 1024))
+        assert device.writeMemory(0x20000000, str(firmwareFile))[0] == 0
+        assert device.timeout > bltest.kCommandTimeoutInSeconds
+    finally:
+        device.close()
@@ -0,0 +1,126 @@
+#! /usr/bin/env python
+# -*- coding: utf-8 -*-
+
+# Copyright 2022 NXP
+# All rights reserved.
+# 
+# SPDX-License-Identifier: BSD-3-Clause
+
+import time
+import pytest
+
+from ui import uidef
+from ui import uivar
+from ui import uipacket
+from ui import ui_cfg_perf_test
+from run import runcore
+
+kMbwTestId = ui_cfg_perf_test.kPerfTestSubSet_Memcpy
+kMemtesterTestId = 0xE0
+
+@pytest.fixture
+def queueWin(mainWin, monkeypatch):
+    # Packets are only recorded, the tests play the firmware through handleCommandAck/handleTestDone
+    sentActions = []
+    messages = []
+    def _sendGoActionPacket( goAction ):
+        sentActions.append(goAction)
+        return True
+    monkeypatch.setattr(mainWin, 'sendGoActionPacket', _sendGoActionPacket)
+    monkeypatch.setattr(mainWin, 'sendTestStopPacket', lambda: sentActions.append('stop'))
+    monkeypatch.setattr(mainWin, 'showContentOnSecPacketWin', messages.append)
+    perfTestCfgDict = dict(uivar.getAdvancedSettings(uidef.kAdvancedSettings_PerfTest))
+    perfTestCfgDict['testSet'] = ui_cfg_perf_test.kPerfTestSet_Mbw
+    perfTestCfgDict['subTestSet'] = kMbwTestId
+    monkeypatch.setattr(uivar, 'g_mixspiPerfTestCfgDict', perfTestCfgDict)
+    stressTestCfgDict = dict(uivar.getAdvancedSettings(uidef.kAdvancedSettings_StressTest))
+    stressTestCfgDict['testSet'] = kMemtesterTestId
+    monkeypatch.setattr(uivar, 'g_mixspiStressTestCfgDict', stressTestCfgDict)
+    monkeypatch.setattr(mainWin, 'sentActions', sentActions, raising=False)
+    monkeypatch.setattr(mainWin, 'messages', messages, raising=False)
+    yield mainWin
+    mainWin.commandTimer.stop()
+    mainWin.commandQueue = []
+    mainWin.commandGoAction = None
+    mainWin.commandTestId = None
+    mainWin.isCommandAcked = False
+
+def _ack( win, goAction, status=uipacket.kAckStatus_Success ):
+    win.handleCommandAck(runcore.kGoActionCommandTagDict[goAction], status)
+
+def _done( win, testId ):
+    win.handleTestDone(uipacket.testResultRecord(testId, uipacket.kResultMetric_TestDone, 1, 0.0))
+
+def _waitForTimer( qapp, win, seconds=1 ):
+    deadline = time.time() + seconds
+    while win.commandTimer.isActive() and time.time() < deadline:
+        qapp.processEvents()
+        time.sleep(0.005)
+    qapp.processEvents()
+
+def test_steps_run_in_order(queueWin):
+    assert queueWin.runCommandQueue(uidef.kTestPlan_Default)
+    assert queueWin.sentActions == [uidef.kGoAction_ConfigSystem]
+    _ack(queueWin, uidef.kGoAction_ConfigSystem)
+    _ack(queueWin, uidef.kGoAction_RwTest)
+    assert queueWin.sentActions == [uidef.kGoAction_ConfigSystem, uidef.kGoAction_RwTest, uidef.kGoAction_PerfTest]
+    _ack(queueWin, uidef.kGoAction_PerfTest)
+    # Perf runs until its done record comes
+    assert queueWin.sentActions[-1] == uidef.kGoAction_PerfTest
+    _done(queueWin, kMbwTestId)
+    assert queueWin.sentActions[-1] == uidef.kGoAction_StressTest
+    _ack(queueWin, uidef.kGoAction_StressTest)
+    _done(queueWin, kMemtesterTestId)
+    assert queueWin.sentActions == uidef.kTestPlan_Default
+    assert not queueWin.isCommandQueueRunning()
+    assert 'done' in queueWin.messages[-1]
+
+def test_ack_of_other_command_is_ignored(queueWin):
+    queueWin.runCommandQueue([uidef.kGoAction_ConfigSystem, uidef.kGoAction_RwTest])
+    _ack(queueWin, uidef.kGoAction_RwTest)
+    assert queueWin.sentActions == [uidef.kGoAction_ConfigSystem]
+    assert queueWin.isCommandQueueRunning()
+
+def test_nak_aborts_queue(queueWin):
+    queueWin.runCommandQueue(uidef.kTestPlan_Default)
+    _ack(queueWin, uidef.kGoAction_ConfigSystem, uipacket.kAckStatus_Unsupported)
+    assert queueWin.sentActions == [uidef.kGoAction_ConfigSystem]
+    assert not queueWin.isCommandQueueRunning()
+    assert 'aborted' in queueWin.messages[-1]
+
+def test_missing_ack_times_out(qapp, queueWin, monkeypatch):
+    monkeypatch.setattr(uidef, 'kCommandAckTimeoutInSeconds', 0.05)
+    queueWin.runCommandQueue(uidef.kTestPlan_Default)
+    _waitForTimer(qapp, queueWin)
+    assert not queueWin.isCommandQueueRunning()
+    assert 'no ack' in queueWin.messages[-1]
+    # A late ack after the timeout starts nothing
+    _ack(queueWin, uidef.kGoAction_ConfigSystem)
+    assert queueWin.sentActions == [uidef.kGoAction_ConfigSystem]
+
+def test_unfinished_test_times_out(qapp, queueWin, monkeypatch):
+    monkeypatch.setitem(uidef.kCommandDoneTimeoutInSecondsDict, uidef.kGoAction_PerfTest, 0.05)
+    queueWin.runCommandQueue([uidef.kGoAction_PerfTest, uidef.kGoAction_StressTest])
+    _ack(queueWin, uidef.kGoAction_PerfTest)
+    _waitForTimer(qapp, queueWin)
+    assert queueWin.sentActions == [uidef.kGoAction_PerfTest, 'stop']
+    assert not queueWin.isCommandQueueRunning()
+    assert 'not done in time' in queueWin.messages[-1]
+
+def test_stale_result_is_ignored(queueWin):
+    queueWin.runCommandQueue([uidef.kGoAction_PerfTest, uidef.kGoAction_StressTest])
+    _ack(queueWin, uidef.kGoAction_PerfTest)
+    _done(queueWin, kMbwTestId)
+    _ack(queueWin, uidef.kGoAction_StressTest)
+    # Late done record of the perf step while stress runs
+    _done(queueWin, kMbwTestId)
+    assert queueWin.isCommandQueueRunning()
+    assert queueWin.commandGoAction == uidef.kGoAction_StressTest
+    _done(queueWin, kMemtesterTestId)
+    assert not queueWin.isCommandQueueRunning()
+
+def test_result_before_ack_is_ignored(queueWin):
+    queueWin.runCommandQueue([uidef.kGoAction_PerfTest, uidef.kGoAction_StressTest])
+    _done(queueWin, kMbwTestId)
+    assert queueWin.sentActions == [uidef.kGoAction_PerfTest]
+    assert not queueWin.isCommandAcked
@@ -0,0 +1,129 @@
+#! /usr/bin/env python
+# -*- coding: utf-8 -*-
+
+# Copyright 2022 NXP
+# All rights reserved.
+# 
+# SPDX-License-Identifier: BSD-3-Clause
+
+import os
+import time
+import shutil
+import collections
+import pytest
+
+from ui import uidef
+from ui import uivar
+from ui import uicore
+from ui import uimodel
+from ui import uipacket
+from tests import boardsim
+from tests.conftest import kSrcRoot
+
+kModelTypeDir = os.path.join(kSrcRoot, 'targets', 'mem_model', 'Winbond', uidef.kMemType_QuadSPI)
+kConfigSystemPacketSize = uipacket.kCommandPacketSchemaDict[uipacket.kCommandTag_ConfigSystem].size
+
+@pytest.fixture
+def configWin(mainWin, tmp_path, monkeypatch):
+    # Models come from a private copy so that they can be edited, packets go to a pty
+    typeDir = tmp_path / 'mem_model' / 'Winbond' / uidef.kMemType_QuadSPI
+    typeDir.mkdir(parents=True)
+    for pyfile in ['W25QxxxJV.py', 'custom_chip.py']:
+        shutil.copyfile(os.path.join(kModelTypeDir, pyfile), str(typeDir / pyfile))
+    registry = uimodel.memModelRegistry(str(tmp_path / 'mem_model'))
+    registry.refresh()
+    monkeypatch.setattr(mainWin, 'memModelRegistry', registry)
+    monkeypatch.setattr(uicore, 's_configSystemPacketCache', collections.OrderedDict())
+    monkeypatch.setattr(mainWin, '_negotiateUartBaudrate', lambda *args, **kwargs: None)
+    monkeypatch.setattr(mainWin, 'isReliableLinkEnabled', False)
+    monkeypatch.setattr(uivar, 'g_mixspiConnCfgDict', dict(uivar.getAdvancedSettings(uidef.kAdvancedSettings_Conn)))
+    mainWin.comboBox_memVendor.setCurrentText(uidef.kMemVendor_Winbond)
+    mainWin.setMemVendor()
+    mainWin.comboBox_memType.setCurrentText(uidef.kMemType_QuadSPI)
+    mainWin.setMemType()
+    mainWin.comboBox_memChip.setCurrentText('W25QxxxJV')
+    # Counts the packets that were built rather than taken from the cache
+    monkeypatch.setattr(mainWin, 'configBuildCount', 0, raising=False)
+    getMemChipInfo = mainWin._getMemChipInfo
+    def _getMemChipInfo():
+        mainWin.configBuildCount += 1
+        getMemChipInfo()
+    monkeypatch.setattr(mainWin, '_getMemChipInfo', _getMemChipInfo)
+    pair = boardsim.ptyPair()
+    mainWin.uartComPort = pair.slaveName
+    mainWin.uartBaudrate = str(uidef.kUartBaudrate_Default)
+    mainWin.openUartPort()
+    monkeypatch.setattr(mainWin, 'boardPort', pair.masterPort, raising=False)
+    yield mainWin
+    mainWin.closeUartPort()
+    pair.close()
+
+def _sendConfig( win ):
+    win.sendConfigSystemPacket()
+    packetBytes = b''
+    deadline = time.time() + 2
+    while len(packetBytes) < kConfigSystemPacketSize and time.time() < deadline:
+        packetBytes += win.boardPort.read(kConfigSystemPacketSize - len(packetBytes))
+    assert len(packetBytes) == kConfigSystemPacketSize
+    return packetBytes
+
+def test_identical_config_is_built_once(configWin):
+    packetBytes = _sendConfig(configWin)
+    assert _sendConfig(configWin) == packetBytes
+    assert configWin.configBuildCount == 1
+
+def test_other_chip_is_built_again(configWin):
+    packetBytes = _sendConfig(configWin)
+    configWin.comboBox_memChip.setCurrentText('custom_chip')
+    assert _sendConfig(configWin) != packetBytes
+    assert configWin.configBuildCount == 2
+    configWin.comboBox_memChip.setCurrentText('W25QxxxJV')
+    assert _sendConfig(configWin) == packetBytes
+    assert configWin.configBuildCount == 2
+
+def test_edited_lut_is_built_again(configWin):
+    packetBytes = _sendConfig(configWin)
+    modelDescFile = os.path.join(configWin.memModelRegistry.memModelRoot, 'Winbond', uidef.kMemType_QuadSPI, 'W25QxxxJV.py')
+    with open(modelDescFile, 'r') as fileObj:
+        modelDesc = fileObj.read()
+    # More dummy cycles in the READ sequence
+    newModelDesc = modelDesc.replace('kFLEXSPI_Command_DUMMY_SDR, uilut.kFLEXSPI_4PAD, 0x04', 'kFLEXSPI_Command_DUMMY_SDR, uilut.kFLEXSPI_4PAD, 0x06')
+    assert newModelDesc != modelDesc
+    with open(modelDescFile, 'w') as fileObj:
+        fileObj.write(newModelDesc)
+    fileStat = os.stat(modelDescFile)
+    os.utime(modelDescFile, ns=(fileStat.st_atime_ns, fileStat.st_mtime_ns + 1000000))
+    configWin.memModelRegistry.refresh()
+    newPacketBytes = _sendConfig(configWin)
+    assert newPacketBytes != packetBytes
+    assert configWin.configBuildCount == 2
+    assert list(configWin.memLut[0:4]) == uimodel.createModel(modelDescFile).mixspiLutDict['READ'].sequence
+
+def test_connection_setting_is_built_again(configWin):
+    packetBytes = _sendConfig(configWin)
+    uivar.getAdvancedSettings(uidef.kAdvancedSettings_Conn)['dataH4b'] ^= 0x01
+    assert _sendConfig(configWin) != packetBytes
+    assert configWin.configBuildCount == 2
+
+def test_reconnect_builds_again(configWin):
+    packetBytes = _sendConfig(configWin)
+    configWin.closeUartPort()
+    configWin.openUartPort()
+    assert _sendConfig(configWin) == packetBytes
+    assert configWin.configBuildCount == 2
+
+def test_prefetch_size_matches_lut_estimate(configWin, monkeypatch):
+    # The packet and the LUT read estimate both take the prefetch buffer size from the tool settings
+    monkeypatch.setattr(uivar, 'g_toolCommDict', configWin.toolCommDict)
+    monkeypatch.setitem(configWin.toolCommDict, 'enablePrefetch', 1)
+    monkeypatch.setitem(configWin.toolCommDict, 'prefetchBufSizeInByte', 2048)
+    schema = uipacket.kCommandPacketSchemaDict[uipacket.kCommandTag_ConfigSystem]
+    fieldsDict, isCrcValid = schema.unpack_from(_sendConfig(configWin))
+    assert fieldsDict['prefetchBufSizeInByte'] == 2048
+    burstSizes = []
+    def _estimateLutRead( memLut, memSpeed, burstSize ):
+        burstSizes.append(burstSize)
+        return None
+    monkeypatch.setattr(uicore.uilut, 'estimateLutRead', _estimateLutRead)
+    configWin.showLutReadEstimate()
+    assert burstSizes == [2048]
@@ -0,0 +1,86 @@
+#! /usr/bin/env python
+# -*- coding: utf-8 -*-
+
+# Copyright 2022 NXP
+# All rights reserved.
+# 
+# SPDX-License-Identifier: BSD-3-Clause
+
+import os
+import time
+import select
+import binascii
+import threading
+import pytest
+
+from ui import uipacket
+from tests import boardsim
+
+# Firmware left running on the board, it only answers the handshake
+class residentFirmware(threading.Thread):
+
+    def __init__( self, fd, imageData ):
+        super(residentFirmware, self).__init__(daemon=True)
+        self.fd = fd
+        self.imageData = imageData
+        self.handshakes = 0
+        self.working = True
+
+    def stop( self ):
+        self.working = False
+        self.join()
+
+    def run( self ):
+        data = b''
+        handshake = uipacket.s_packetTagBytes + bytes([uipacket.kCommandTag_Handshake])
+        while self.working:
+            if select.select([self.fd], [], [], 0.01)[0]:
+                data += os.read(self.fd, 4096)
+            idx = data.find(handshake)
+            if idx >= 0:
+                data = data[idx + len(handshake):]
+                self.handshakes += 1
+                os.write(self.fd, b'hello\r\n' + uipacket.encode_handshake_frame(0x010200, len(self.imageData), binascii.crc32(self.imageData)))
+
+def _selectPort( mainWin, port ):
+    mainWin.comboBox_comPort.addItem(port)
+    mainWin.comboBox_comPort.setCurrentIndex(mainWin.comboBox_comPort.findText(port))
+
+def test_resident_firmware_found_off_gui_thread(qapp, mainWin, cpuDir):
+    imageData = os.urandom(3000)
+    (cpuDir / 'boot_firmware.bin').write_bytes(imageData)
+    pair = boardsim.ptyPair()
+    board = residentFirmware(pair.masterFd, imageData)
+    board.start()
+    try:
+        _selectPort(mainWin, pair.slaveName)
+        mainWin.isLoadFirmwareEnabled = True
+        mainWin.callbackConnectToDevice()
+        # The handshake runs on the connection worker, the slot returns at once
+        assert mainWin.isConnecting()
+        deadline = time.time() + 5
+        while mainWin.isConnecting() and time.time() < deadline:
+            qapp.processEvents()
+            time.sleep(0.002)
+        assert mainWin.isDeviceConnected
+        assert board.handshakes == 1
+        assert u"is already running, skip loading" in mainWin.textEdit_packetWin.toPlainText()
+    finally:
+        mainWin.isDeviceConnected = False
+        mainWin.closeUartPort()
+        board.stop()
+        pair.close()
+
+def test_firmware_hash_follows_nanosecond_mtime(mainWin, cpuDir):
+    firmwareBinFile = cpuDir / 'boot_firmware.bin'
+    mtimeNs = 1700000000 * 10**9
+    firmwareBinFile.write_bytes(b'\x11' * 4096)
+    os.utime(firmwareBinFile, ns=(mtimeNs, mtimeNs))
+    assert mainWin.getFirmwareImageHash() == (4096, binascii.crc32(b'\x11' * 4096))
+    # Same size, and an mtime that st_mtime as a float cannot tell apart
+    firmwareBinFile.write_bytes(b'\x22' * 4096)
+    os.utime(firmwareBinFile, ns=(mtimeNs + 1, mtimeNs + 1))
+    assert os.stat(firmwareBinFile).st_mtime == mtimeNs / 1e9
+    assert mainWin.getFirmwareImageHash() == (4096, binascii.crc32(b'\x22' * 4096))
+    firmwareBinFile.unlink()
+    assert mainWin.getFirmwareImageHash() == None
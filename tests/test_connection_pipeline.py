@@ -0,0 +1,88 @@
+#! /usr/bin/env python
+# -*- coding: utf-8 -*-
+
+# Copyright 2022 NXP
+# All rights reserved.
+# 
+# SPDX-License-Identifier: BSD-3-Clause
+
+import os
+import time
+import pytest
+from PyQt5.QtCore import QTimer, QEventLoop, QThreadPool
+
+from ui import uidef
+from run import runcore
+from tests import boardsim
+from tests.conftest import kSrcRoot
+
+# Slow enough that the load takes a good share of a second
+kLineBaudrate = 115200
+
+def _runWorker( worker, timerIntervalInMs=10, cancelAfterInMs=None ):
+    # Runs worker on the global pool with the event loop otherwise idle, returns (result, stages,
+    # longest time in seconds the loop went without running the timer)
+    timerTicks = [time.time()]
+    timer = QTimer()
+    timer.timeout.connect(lambda: timerTicks.append(time.time()))
+    loop = QEventLoop()
+    results = []
+    stages = []
+    def _handleFinished( result ):
+        results.append(result)
+        loop.quit()
+    worker.signals.stageChanged.connect(stages.append)
+    worker.signals.finished.connect(_handleFinished)
+    if cancelAfterInMs != None:
+        QTimer.singleShot(cancelAfterInMs, worker.cancel)
+    timer.start(timerIntervalInMs)
+    QThreadPool.globalInstance().start(worker)
+    loop.exec_()
+    timer.stop()
+    timerTicks.append(time.time())
+    return results[0], stages, max([timerTicks[idx + 1] - timerTicks[idx] for idx in range(len(timerTicks) - 1)])
+
+@pytest.fixture
+def rt1060():
+    tgt, cpuDir = runcore.createTarget(uidef.kMcuDevice_iMXRT106x, kSrcRoot)
+    return tgt
+
+def test_load_keeps_event_loop_running(qapp, rt1060, tmp_path):
+    firmwareData = os.urandom(16 * 1024)
+    firmwareBinFile = tmp_path / 'boot_firmware.bin'
+    firmwareBinFile.write_bytes(firmwareData)
+    pair = boardsim.ptyPair()
+    standIn = boardsim.SdpStandIn(pair.masterPort, lineBaudrate=kLineBaudrate)
+    standIn.start()
+    progress = []
+    try:
+        worker = runcore.connectionWorker(rt1060, kSrcRoot, pair.slaveName, kLineBaudrate,
+                                          lambda bootDevice: runcore.loadBootFirmware(rt1060, bootDevice, str(firmwareBinFile)))
+        worker.signals.progress.connect(progress.append)
+        startTime = time.time()
+        result, stages, maxStallSeconds = _runWorker(worker)
+        seconds = time.time() - startTime
+    finally:
+        standIn.stop()
+        pair.close()
+    assert result.isDetected and result.loadResult == True and result.error == None
+    assert b''.join(standIn.memory.values()) == firmwareData
+    assert stages == [uidef.kConnectStage_Pinging, uidef.kConnectStage_Loading]
+    assert progress
+    # The load takes over a second on the line, the timer must keep running all through it
+    assert seconds > 1
+    assert maxStallSeconds < 0.2
+
+def test_cancel_while_pinging(qapp, rt1060):
+    pair = boardsim.ptyPair()
+    try:
+        worker = runcore.connectionWorker(rt1060, kSrcRoot, pair.slaveName, kLineBaudrate)
+        startTime = time.time()
+        result, stages, maxStallSeconds = _runWorker(worker, cancelAfterInMs=300)
+        seconds = time.time() - startTime
+    finally:
+        pair.close()
+    assert result.isCancelled and not result.isDetected
+    assert result.loadResult == None
+    assert seconds < 1
+    assert "ping attempts" in result.report
@@ -0,0 +1,151 @@
+#! /usr/bin/env python
+# -*- coding: utf-8 -*-
+
+# Copyright 2022 NXP
+# All rights reserved.
+# 
+# SPDX-License-Identifier: BSD-3-Clause
+
+import os
+import struct
+import collections
+import pytest
+
+import boot
+from ui import uidef
+from utils import elf
+from run import runcore
+
+kEhdrSize = struct.calcsize(elf.ELFObject.Elf32_Ehdr)
+kPhdrSize = struct.calcsize(elf.ELFProgramHeader.Elf32_Phdr)
+kShdrSize = struct.calcsize(elf.ELFSection.Elf32_Shdr)
+kSymSize = struct.calcsize(elf.ELFSymbol.Elf32_Sym)
+
+kItcmCode = bytes(range(256)) * 2
+kItcmRoData = b'\xa5' * 0x40
+kDtcmData = b'\x5a' * 0x20
+
+# (p_type, p_paddr, data, p_memsz), the ITCM ones touch each other, .bss has no file contents
+kSegments = [(elf.ELFProgramHeader.PT_LOAD, 0x00000000, kItcmCode, len(kItcmCode)),
+             (elf.ELFProgramHeader.PT_LOAD, 0x20000000, kDtcmData, 0x400),
+             (elf.ELFProgramHeader.PT_LOAD, 0x00000000 + len(kItcmCode), kItcmRoData, len(kItcmRoData)),
+             (elf.ELFProgramHeader.PT_LOAD, 0x20200000, b'', 0x1000),
+             (elf.ELFProgramHeader.PT_NOTE, 0x30000000, b'note', 4),
+            ]
+
+def _buildElf32( segments, isStripped=False ):
+    # Segment data follows the program headers, then .symtab, .strtab and .shstrtab unless stripped
+    dataOffset = kEhdrSize + kPhdrSize * len(segments)
+    phdrs = b''
+    body = b''
+    for pType, paddr, data, memsz in segments:
+        offset = dataOffset + len(body) if data else 0
+        phdrs += struct.pack(elf.ELFProgramHeader.Elf32_Phdr, pType, offset, paddr, paddr, len(data), memsz, elf.ELFProgramHeader.PF_R, 4)
+        body += data
+    sections = b''
+    shnum = 0
+    shstrndx = 0
+    if not isStripped:
+        strtab = b'\0Reset_Handler\0'
+        symtab = bytes(kSymSize) + struct.pack(elf.ELFSymbol.Elf32_Sym, 1, 0x101, 0, 0x12, 0, 1)
+        shstrtab = b'\0.symtab\0.strtab\0.shstrtab\0'
+        tableOffset = dataOffset + len(body)
+        body += symtab + strtab + shstrtab
+        sections = bytes(kShdrSize)
+        sections += struct.pack(elf.ELFSection.Elf32_Shdr, 1, elf.ELFSection.SHT_SYMTAB, 0, 0, tableOffset, len(symtab), 2, 1, 4, kSymSize)
+        sections += struct.pack(elf.ELFSection.Elf32_Shdr, 9, elf.ELFSection.SHT_STRTAB, 0, 0, tableOffset + len(symtab), len(strtab), 0, 0, 1, 0)
+        sections += struct.pack(elf.ELFSection.Elf32_Shdr, 17, elf.ELFSection.SHT_STRTAB, 0, 0, tableOffset + len(symtab) + len(strtab), len(shstrtab), 0, 0, 1, 0)
+        shnum = 4
+        shstrndx = 3
+    shoff = dataOffset + len(body) if shnum else 0
+    ident = b'\x7fELF' + bytes([elf.ELFObject.ELFCLASS32, elf.ELFObject.ELFDATA2LSB, 1]) + bytes(9)
+    ehdr = struct.pack(elf.ELFObject.Elf32_Ehdr, ident, elf.ELFObject.ET_EXEC, 40, 1, 0x101, kEhdrSize, shoff, 0x05000000,
+                       kEhdrSize, kPhdrSize, len(segments), kShdrSize, shnum, shstrndx)
+    return ehdr + phdrs + body + sections
+
+def _writeElf( tmp_path, elfData ):
+    elfFile = tmp_path / 'boot_firmware.elf'
+    elfFile.write_bytes(elfData)
+    return str(elfFile)
+
+def test_adjacent_segments_are_merged(tmp_path):
+    loadRanges = runcore.readElfLoadRanges(_writeElf(tmp_path, _buildElf32(kSegments)))
+    # .bss and the note segment are not sent, the two ITCM ones become one range
+    assert loadRanges == [(0x00000000, kItcmCode + kItcmRoData), (0x20000000, kDtcmData)]
+
+def test_stripped_file_is_loaded(tmp_path):
+    elfFile = _writeElf(tmp_path, _buildElf32(kSegments, isStripped=True))
+    assert runcore.readElfLoadRanges(elfFile) == [(0x00000000, kItcmCode + kItcmRoData), (0x20000000, kDtcmData)]
+    elfObj = elf.ELFObject()
+    with open(elfFile, 'rb') as fileObj:
+        elfObj.fromFile(fileObj)
+    assert elfObj.symbols == []
+    # Symbols still come out of the unstripped file
+    elfFile = _writeElf(tmp_path, _buildElf32(kSegments))
+    with open(elfFile, 'rb') as fileObj:
+        elfObj.fromFile(fileObj)
+    assert elfObj.getSymbol('Reset_Handler').st_value == 0x101
+
+def _truncated( elfData ):
+    return elfData[0:kEhdrSize + kPhdrSize * len(kSegments) + 16]
+
+def _badShstrndx( elfData ):
+    return elfData[0:kEhdrSize - 2] + struct.pack('<H', 9) + elfData[kEhdrSize:]
+
+@pytest.mark.parametrize('elfData', [b'',
+                                     b'\x7fELF',
+                                     b'MZ' + bytes(kEhdrSize),
+                                     _truncated(_buildElf32(kSegments)),
+                                     _badShstrndx(_buildElf32(kSegments)),
+                                     _buildElf32([seg for seg in kSegments if seg[2] == b''], isStripped=True),
+                                    ], ids=['empty', 'short', 'not_elf', 'truncated', 'bad_shstrndx', 'nothing_to_load'])
+def test_malformed_file_gives_elf_error(tmp_path, elfData):
+    with pytest.raises(elf.ELFException):
+        runcore.readElfLoadRanges(_writeElf(tmp_path, elfData))
+
+fakeTarget = collections.namedtuple('fakeTarget', ['mcuSeries', 'firmwareJumpAddr'])
+
+# Records what bltest would send, every call answers with status
+class fakeBootDevice(object):
+
+    def __init__( self, status ):
+        self.status = status
+        self.calls = []
+
+    def _writeData( self, name, address, binFile ):
+        with open(binFile, 'rb') as fileObj:
+            self.calls.append((name, address, fileObj.read()))
+        return self.status, None, ''
+
+    def writeFile( self, address, binFile ):
+        return self._writeData('writeFile', address, binFile)
+
+    def writeMemory( self, address, binFile ):
+        return self._writeData('writeMemory', address, binFile)
+
+    def jumpAddress( self, address ):
+        self.calls.append(('jumpAddress', address, None))
+        return self.status, None, ''
+
+kLoadRanges = [(0x00000000, kItcmCode + kItcmRoData), (0x20000000, kDtcmData)]
+
+def test_load_ranges_over_sdp(tmp_path, monkeypatch):
+    monkeypatch.setattr(runcore.tempfile, 'tempdir', str(tmp_path))
+    bootDevice = fakeBootDevice(boot.status.kSDP_Status_HabDisabled)
+    assert runcore.loadElfBootFirmware(fakeTarget(uidef.kMcuSeries_iMXRT10yy, 0x2000), bootDevice, kLoadRanges)
+    assert bootDevice.calls == [('writeFile',) + kLoadRanges[0], ('writeFile',) + kLoadRanges[1], ('jumpAddress', 0x2000, None)]
+    assert os.listdir(str(tmp_path)) == []
+
+def test_load_ranges_over_rom_bootloader(tmp_path, monkeypatch):
+    monkeypatch.setattr(runcore.tempfile, 'tempdir', str(tmp_path))
+    bootDevice = fakeBootDevice(boot.status.kStatus_Success)
+    assert runcore.loadElfBootFirmware(fakeTarget(uidef.kMcuSeries_iMXRTxxx, 0x2000), bootDevice, kLoadRanges)
+    assert bootDevice.calls == [('writeMemory',) + kLoadRanges[0], ('writeMemory',) + kLoadRanges[1]]
+    assert os.listdir(str(tmp_path)) == []
+
+def test_failed_write_stops_load(tmp_path, monkeypatch):
+    monkeypatch.setattr(runcore.tempfile, 'tempdir', str(tmp_path))
+    bootDevice = fakeBootDevice(boot.status.kStatus_Success + 1)
+    assert not runcore.loadElfBootFirmware(fakeTarget(uidef.kMcuSeries_iMXRT10yy, 0x2000), bootDevice, kLoadRanges)
+    assert [call[0] for call in bootDevice.calls] == ['writeFile']
+    assert os.listdir(str(tmp_path)) == []
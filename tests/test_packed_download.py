@@ -0,0 +1,207 @@
+#! /usr/bin/env python
+# -*- coding: utf-8 -*-
+
+# Copyright 2022 NXP
+# All rights reserved.
+# 
+# SPDX-License-Identifier: BSD-3-Clause
+
+import os
+import time
+import random
+import struct
+import binascii
+import threading
+import pytest
+
+from ui import uidef
+from ui import uipacket
+from boot import imagepack
+from run import runcore
+from tests import boardsim
+
+def _createSampleImage( size, seed ):
+    # Thumb-ish code out of a small instruction set, then literal pools and zeroed tables
+    rng = random.Random(seed)
+    opcodes = [rng.getrandbits(16) for idx in range(128)]
+    codeSize = size * 5 // 8
+    code = struct.pack('<%dH' % (codeSize // 2), *[rng.choice(opcodes) for idx in range(codeSize // 2)])
+    pools = bytes([rng.getrandbits(8) for idx in range(size // 8)])
+    return (code + pools + bytes(size))[0:size]
+
+def _changeMiddle( imageData, size=512 ):
+    newData = bytearray(imageData)
+    middle = len(newData) // 2
+    newData[middle:middle + size] = bytes([(value + 1) & 0xFF for value in newData[middle:middle + size]])
+    return bytes(newData)
+
+def test_pack_round_trip():
+    imageData = _createSampleImage(96 * 1024, 1)
+    packedData = imagepack.packImage(imageData, 0x20208000, 0x20208400)
+    assert len(packedData) < len(imageData) * 3 // 4
+    assert imagepack.unpackImage(packedData) == (0x20208000, 0x20208400, imageData)
+
+def test_delta_round_trip_and_base_check():
+    imageData = _createSampleImage(96 * 1024, 1)
+    newData = _changeMiddle(imageData)
+    deltaData = imagepack.packImage(newData, 0, 0, imageData)
+    assert len(deltaData) < len(imagepack.packImage(newData, 0, 0)) // 10
+    assert imagepack.unpackImage(deltaData, imageData)[2] == newData
+    with pytest.raises(imagepack.PackedImageError):
+        imagepack.unpackImage(deltaData, _changeMiddle(imageData, 8))
+    with pytest.raises(imagepack.PackedImageError):
+        imagepack.unpackImage(deltaData)
+
+def test_packed_image_cache():
+    imageData = _createSampleImage(16 * 1024, 2)
+    packedData = imagepack.getPackedImage(imageData, 0, 0)
+    assert imagepack.getPackedImage(bytes(imageData), 0, 0) is packedData
+    assert imagepack.getPackedImage(imageData, 0, 4) is not packedData
+
+def test_decompressor_features():
+    stubData = b'\x11' * 1500
+    assert imagepack.getDecompressorFeatures(stubData) == 0
+    assert imagepack.getDecompressorFeatures(b'') == 0
+    trailer = imagepack.kDecompressorTrailerStruct.pack(imagepack.kDecompressorTrailerMagic, imagepack.kDecompressorFeature_VerifyBase)
+    assert imagepack.getDecompressorFeatures(stubData + trailer) == imagepack.kDecompressorFeature_VerifyBase
+
+# i.MXRT10yy board: the ROM takes the stub and the packed image, then the stub expands it over
+# whatever is in memory and the firmware answers the handshake. A delta that does not apply to
+# memory is refused and nothing answers.
+class packedImageBoard(threading.Thread):
+
+    def __init__( self, pair, tgt, memoryData ):
+        super(packedImageBoard, self).__init__(daemon=True)
+        self.pair = pair
+        self.tgt = tgt
+        self.memoryData = memoryData
+        self.packedData = None
+        self.isRefused = False
+        self.expandedEvent = threading.Event()
+        self.working = True
+
+    def stop( self ):
+        self.working = False
+        self.join()
+
+    def run( self ):
+        rom = boardsim.SdpStandIn(self.pair.masterPort)
+        rom.start()
+        while rom.jumpAddress == None and self.working:
+            time.sleep(0.01)
+        rom.stop()
+        if not self.working:
+            return
+        assert rom.jumpAddress == self.tgt.decompressorJumpAddr
+        self.packedData = rom.memory[self.tgt.packedImageLoadAddr]
+        try:
+            destAddr, jumpAddr, self.memoryData = imagepack.unpackImage(self.packedData, self.memoryData)
+        except imagepack.PackedImageError:
+            self.isRefused = True
+            return
+        finally:
+            self.expandedEvent.set()
+        data = b''
+        handshake = uipacket.s_packetTagBytes + bytes([uipacket.kCommandTag_Handshake])
+        while self.working:
+            data += self.pair.masterPort.read(4096)
+            idx = data.find(handshake)
+            if idx >= 0:
+                data = data[idx + len(handshake):]
+                self.pair.masterPort.write(uipacket.encode_handshake_frame(0x010200, len(self.memoryData), binascii.crc32(self.memoryData)))
+
+    def isDelta( self ):
+        return (imagepack.kPackedImageHeaderStruct.unpack_from(self.packedData)[1] & imagepack.kPackedImageFlag_Delta) != 0
+
+@pytest.fixture
+def packedWin(mainWin, cpuDir):
+    mainWin.mcuDevice = uidef.kMcuDevice_iMXRT106x
+    mainWin.isLoadFirmwareEnabled = True
+    mainWin.menuToolsAction_packedDownload.setChecked(True)
+    pair = boardsim.ptyPair()
+    mainWin.comboBox_comPort.addItem(pair.slaveName)
+    mainWin.comboBox_comPort.setCurrentIndex(mainWin.comboBox_comPort.findText(pair.slaveName))
+    mainWin.updatePortSetupValue()
+    boards = []
+    def _connect( qapp, stubData, imageData, memoryData ):
+        (cpuDir / 'boot_decompressor.bin').write_bytes(stubData)
+        (cpuDir / 'boot_firmware.bin').write_bytes(imageData)
+        mainWin.createMcuTarget()
+        # Board reset, whatever the host sent to the last firmware is gone
+        pair.masterPort.reset_input_buffer()
+        board = packedImageBoard(pair, mainWin.tgt, memoryData)
+        board.start()
+        boards.append(board)
+        results = []
+        mainWin.handleConnectionFinished = lambda result, isFirmwareLoaded: results.append((result, isFirmwareLoaded))
+        mainWin.startConnection()
+        deadline = time.time() + 20
+        while mainWin.isConnecting() and time.time() < deadline:
+            qapp.processEvents()
+            time.sleep(0.002)
+        # The connection can be done before the stub got to the packed image
+        assert board.expandedEvent.wait(5)
+        board.stop()
+        result, isFirmwareLoaded = results[0]
+        assert result.error == None
+        return board, isFirmwareLoaded
+    yield _connect
+    del mainWin.handleConnectionFinished
+    mainWin.menuToolsAction_packedDownload.setChecked(False)
+    runcore.s_loadedImageDict.clear()
+    pair.close()
+
+def _verifyingStub():
+    return b'\x11' * 1500 + imagepack.kDecompressorTrailerStruct.pack(imagepack.kDecompressorTrailerMagic, imagepack.kDecompressorFeature_VerifyBase)
+
+def test_option_needs_decompressor(mainWin, cpuDir):
+    mainWin.mcuDevice = uidef.kMcuDevice_iMXRT106x
+    mainWin.menuToolsAction_packedDownload.setChecked(True)
+    mainWin.createMcuTarget()
+    assert not mainWin.menuToolsAction_packedDownload.isEnabled()
+    assert not mainWin.isPackedDownloadEnabled
+    (cpuDir / 'boot_decompressor.bin').write_bytes(b'\x11' * 1500)
+    mainWin.createMcuTarget()
+    assert mainWin.menuToolsAction_packedDownload.isEnabled()
+    assert mainWin.isPackedDownloadEnabled
+    mainWin.menuToolsAction_packedDownload.setChecked(False)
+    mainWin.setPackedDownloadOpt()
+    assert not mainWin.isPackedDownloadEnabled
+
+def test_no_delta_without_base_verification(qapp, mainWin, packedWin):
+    imageData = _createSampleImage(40 * 1024, 3)
+    newData = _changeMiddle(imageData)
+    board, isFirmwareLoaded = packedWin(qapp, b'\x11' * 1500, imageData, None)
+    assert isFirmwareLoaded and not board.isDelta()
+    # The host knows the base, but the stub would not check it
+    board, isFirmwareLoaded = packedWin(qapp, b'\x11' * 1500, newData, imageData)
+    assert isFirmwareLoaded and not board.isDelta()
+    assert board.memoryData == newData
+
+def test_delta_is_confirmed_by_firmware(qapp, mainWin, packedWin):
+    imageData = _createSampleImage(40 * 1024, 3)
+    newData = _changeMiddle(imageData)
+    board, isFirmwareLoaded = packedWin(qapp, _verifyingStub(), imageData, None)
+    assert isFirmwareLoaded and not board.isDelta()
+    mainWin.closeUartPort()
+    board, isFirmwareLoaded = packedWin(qapp, _verifyingStub(), newData, imageData)
+    assert isFirmwareLoaded and board.isDelta()
+    assert board.memoryData == newData
+    assert u"is sent as a delta" in mainWin.textEdit_packetWin.toPlainText()
+    mainWin.closeUartPort()
+
+def test_refused_delta_falls_back_to_full(qapp, mainWin, packedWin):
+    imageData = _createSampleImage(40 * 1024, 3)
+    newData = _changeMiddle(imageData)
+    board, isFirmwareLoaded = packedWin(qapp, _verifyingStub(), imageData, None)
+    assert isFirmwareLoaded
+    mainWin.closeUartPort()
+    # Memory was overwritten since, the stub refuses the delta
+    board, isFirmwareLoaded = packedWin(qapp, _verifyingStub(), newData, bytes(len(imageData)))
+    assert board.isDelta() and board.isRefused
+    assert not isFirmwareLoaded
+    assert u"does not answer after delta download" in mainWin.textEdit_packetWin.toPlainText()
+    # The next load does not rely on a base any more
+    board, isFirmwareLoaded = packedWin(qapp, _verifyingStub(), newData, bytes(len(imageData)))
+    assert isFirmwareLoaded and not board.isDelta()
+    mainWin.closeUartPort()
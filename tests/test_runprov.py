@@ -0,0 +1,75 @@
+#! /usr/bin/env python
+# -*- coding: utf-8 -*-
+
+# Copyright 2022 NXP
+# All rights reserved.
+# 
+# SPDX-License-Identifier: BSD-3-Clause
+
+import os
+import pytest
+
+from ui import uidef
+from run import runprov
+from tests import boardsim
+from tests.conftest import kSrcRoot
+
+# Slow enough that the line time, not the host, dominates a load
+kLineBaudrate = 230400
+
+@pytest.fixture
+def rack():
+    pairs = []
+    standIns = []
+    def _build( boardCount, deadBoards=() ):
+        boards = []
+        for idx in range(boardCount):
+            pair = boardsim.ptyPair()
+            pairs.append(pair)
+            if idx in deadBoards:
+                standIns.append(None)
+            else:
+                standIn = boardsim.SdpStandIn(pair.masterPort, lineBaudrate=kLineBaudrate)
+                standIn.start()
+                standIns.append(standIn)
+            boards.append((pair.slaveName, uidef.kMcuDevice_iMXRT106x))
+        return boards, standIns
+    yield _build
+    for standIn in standIns:
+        if standIn != None:
+            standIn.stop()
+    for pair in pairs:
+        pair.close()
+
+@pytest.fixture
+def firmwareBinFile(tmp_path):
+    firmwareFile = tmp_path / 'boot_firmware.bin'
+    firmwareFile.write_bytes(os.urandom(8 * 1024))
+    return firmwareFile
+
+def _provision( boards, firmwareBinFile ):
+    return runprov.provisionBoards(boards, kSrcRoot, kSrcRoot, uidef.kUartBaudrate_Default, str(firmwareBinFile))
+
+def test_boards_are_provisioned_concurrently(rack, firmwareBinFile):
+    boards, standIns = rack(1)
+    results, singleSeconds = _provision(boards, firmwareBinFile)
+    assert results[0].isSuccess
+    boards, standIns = rack(4)
+    results, wallSeconds = _provision(boards, firmwareBinFile)
+    assert [result.isSuccess for result in results] == [True] * 4
+    for standIn in standIns:
+        assert b''.join(standIn.memory.values()) == firmwareBinFile.read_bytes()
+    # Each board has a line of its own, so four take about as long as one
+    assert wallSeconds < 2 * singleSeconds
+    assert runprov.formatProvisionTable(results, wallSeconds).splitlines()[-1].startswith('4 of 4 boards provisioned')
+
+def test_dead_board_does_not_stop_the_rack(rack, firmwareBinFile):
+    boards, standIns = rack(3, deadBoards=[1])
+    results, wallSeconds = _provision(boards, firmwareBinFile)
+    assert [result.isSuccess for result in results] == [True, False, True]
+    assert results[1].stage == runprov.kProvisionStage_Ping
+    assert results[1].message == 'no answer from ROM'
+    assert [result.port for result in results] == [port for port, device in boards]
+    table = runprov.formatProvisionTable(results, wallSeconds)
+    assert 'FAIL' in table
+    assert table.splitlines()[-1].startswith('2 of 3 boards provisioned')
@@ -0,0 +1,75 @@
+#! /usr/bin/env python
+# -*- coding: utf-8 -*-
+
+# Copyright 2022 NXP
+# All rights reserved.
+#
+# SPDX-License-Identifier: BSD-3-Clause
+
+import os
+import pytest
+
+from boot import sdp
+from boot import status
+from tests import boardsim
+
+@pytest.fixture
+def rom():
+    pair = boardsim.ptyPair()
+    standIns = []
+    def _start( **kwargs ):
+        standIn = boardsim.SdpStandIn(pair.masterPort, **kwargs)
+        standIn.start()
+        standIns.append(standIn)
+        return standIn, pair.slaveName
+    yield _start
+    for standIn in standIns:
+        standIn.stop()
+    pair.close()
+
+def test_error_status_reports_hab_mode(rom):
+    standIn, port = rom(habMode=status.kSDP_Status_HabEnabled)
+    device = sdp.SdpUart(port, 115200)
+    try:
+        assert device.errorStatus() == (status.kSDP_Status_HabEnabled, [status.kSDP_Response_HabStatusSuccess])
+    finally:
+        device.close()
+
+def test_write_file_in_chunks(rom):
+    standIn, port = rom()
+    device = sdp.SdpUart(port, 115200, chunkSize=0x4000)
+    progress = []
+    device.progressFunc = progress.append
+    imageData = os.urandom(0x9000)
+    try:
+        habMode, response = device.writeFile(0x20208000, imageData)
+    finally:
+        device.close()
+    assert habMode == status.kSDP_Status_HabDisabled
+    assert response == [status.kSDP_Response_WriteFileComplete]
+    assert sorted(standIn.memory) == [0x20208000, 0x2020c000, 0x20210000]
+    assert b''.join([standIn.memory[address] for address in sorted(standIn.memory)]) == imageData
+    assert progress[-1] == len(imageData)
+
+def test_register_round_trip_and_jump(rom):
+    standIn, port = rom()
+    device = sdp.SdpUart(port, 115200)
+    try:
+        assert device.writeRegister(0x400fc068, 32, 0xffffffff)[1] == [status.kSDP_Response_WriteComplete]
+        habMode, words, data = device.readRegister(0x400fc068, 32, 4)
+        assert words == [0xffffffff]
+        assert data == b'\xff\xff\xff\xff'
+        assert device.jumpAddress(0x20208400) == (status.kSDP_Status_HabDisabled, [])
+    finally:
+        device.close()
+    assert standIn.jumpAddress == 0x20208400
+
+def test_silent_port_times_out():
+    pair = boardsim.ptyPair()
+    device = sdp.SdpUart(pair.slaveName, 115200, responseTimeout=0.2)
+    try:
+        with pytest.raises(sdp.SdpError):
+            device.errorStatus()
+    finally:
+        device.close()
+        pair.close()
@@ -0,0 +1,29 @@
+#! /usr/bin/env python
+# -*- coding: utf-8 -*-
+
+# Copyright 2022 NXP
+# All rights reserved.
+# 
+# SPDX-License-Identifier: BSD-3-Clause
+
+import os
+import sys
+import subprocess
+
+from ui import ui_cfg_pin_test
+from tests.conftest import kSrcRoot
+
+def test_main_import_defers_heavy_modules():
+    script = 'import sys, main; print(" ".join(sorted(set(name.split(".")[0] for name in sys.modules))))'
+    output = subprocess.check_output([sys.executable, '-c', script], cwd=kSrcRoot, env=dict(os.environ, QT_QPA_PLATFORM='offscreen'))
+    loadedModules = output.decode().split()
+    assert 'main' in loadedModules
+    # The pin waveform canvas is the only user of matplotlib
+    assert 'matplotlib' not in loadedModules
+
+def test_sub_windows_are_built_on_demand(mainWin):
+    assert mainWin.pinWaveFig == None
+    assert ui_cfg_pin_test.memTesterUiPinTest not in mainWin.subWindowDict
+    subWindow = mainWin._getSubWindow(ui_cfg_pin_test.memTesterUiPinTest, u"Pin Test Configuration")
+    assert mainWin._getSubWindow(ui_cfg_pin_test.memTesterUiPinTest, u"Pin Test Configuration") is subWindow
+    subWindow.close()
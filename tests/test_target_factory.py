@@ -0,0 +1,53 @@
+#! /usr/bin/env python
+# -*- coding: utf-8 -*-
+
+# Copyright 2022 NXP
+# All rights reserved.
+#
+# SPDX-License-Identifier: BSD-3-Clause
+
+import os
+import shutil
+import pytest
+
+from ui import uidef
+from run import runcore
+from boot import target
+from tests.conftest import kSrcRoot
+
+kExeBinRoot = os.path.join(os.path.dirname(kSrcRoot), 'bin')
+
+@pytest.fixture
+def targetDir(tmp_path, monkeypatch):
+    # A private copy of a shipped target, so that editing it leaves the tree and other tests alone
+    targetBaseDir = str(tmp_path / 'MIMXRT1062')
+    shutil.copytree(os.path.join(kSrcRoot, 'targets', 'MIMXRT1062'), targetBaseDir, ignore=shutil.ignore_patterns('__pycache__'))
+    monkeypatch.setattr(runcore, '_findTargetBaseDir', lambda cpu, exeBinRoot: targetBaseDir)
+    monkeypatch.setattr(runcore, 's_targetCache', {})
+    return targetBaseDir
+
+def test_freeze_rejects_writes():
+    tgt = target.Target('test')
+    tgt.board = 'evk'
+    tgt.freeze()
+    with pytest.raises(AttributeError):
+        tgt.board = 'other'
+    with pytest.raises(AttributeError):
+        tgt.newAttribute = 1
+    assert tgt.board == 'evk'
+
+def test_create_target_is_shared_and_frozen(targetDir):
+    tgt, targetBaseDir = runcore.createTarget(uidef.kMcuDevice_iMXRT106x, kExeBinRoot)
+    assert targetBaseDir == targetDir
+    assert runcore.createTarget(uidef.kMcuDevice_iMXRT106x, kExeBinRoot)[0] is tgt
+    with pytest.raises(AttributeError):
+        tgt.cpu = 'other'
+
+def test_edited_config_is_run_again(targetDir):
+    tgt = runcore.createTarget(uidef.kMcuDevice_iMXRT106x, kExeBinRoot)[0]
+    configFile = os.path.join(targetDir, 'bltargetconfig.py')
+    fileStat = os.stat(configFile)
+    os.utime(configFile, ns=(fileStat.st_atime_ns, fileStat.st_mtime_ns + 1000000))
+    newTgt = runcore.createTarget(uidef.kMcuDevice_iMXRT106x, kExeBinRoot)[0]
+    assert newTgt is not tgt
+    assert newTgt.cpu == tgt.cpu
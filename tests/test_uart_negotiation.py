@@ -0,0 +1,126 @@
+#! /usr/bin/env python
+# -*- coding: utf-8 -*-
+
+# Copyright 2022 NXP
+# All rights reserved.
+# 
+# SPDX-License-Identifier: BSD-3-Clause
+
+import os
+import pty
+import tty
+import time
+import select
+import struct
+import threading
+import pytest
+
+from ui import uidef
+from ui import uicore
+from ui import uipacket
+
+# Firmware side of the rate negotiation on the master end of a pty, it acks every
+# set/confirm packet and only switches to the rates listed in acceptedBaudrates.
+class fakeUartFirmware(threading.Thread):
+
+    def __init__( self, fd, acceptedBaudrates ):
+        super(fakeUartFirmware, self).__init__(daemon=True)
+        self.fd = fd
+        self.acceptedBaudrates = acceptedBaudrates
+        self.baudrate = uidef.kUartBaudrate_Default
+        self.pendingBaudrate = None
+        self.requests = []
+        self.working = True
+
+    def stop( self ):
+        self.working = False
+        self.join()
+
+    def run( self ):
+        data = b''
+        while self.working:
+            if select.select([self.fd], [], [], 0.01)[0]:
+                data += os.read(self.fd, 4096)
+            while True:
+                idx = data.find(uipacket.s_packetTagBytes)
+                if idx < 0 or len(data) < idx + 5:
+                    break
+                schema = uipacket.kCommandPacketSchemaDict.get(data[idx + 4])
+                if schema == None:
+                    data = data[idx + 1:]
+                    continue
+                if len(data) < idx + schema.size:
+                    break
+                self._handle(data[idx + 4], data[idx + 5:idx + schema.size])
+                data = data[idx + schema.size:]
+
+    def _handle( self, commandTag, body ):
+        status = uipacket.kAckStatus_Unsupported
+        if commandTag in [uipacket.kCommandTag_SetBaudrate, uipacket.kCommandTag_ConfirmBaudrate]:
+            baudrate = struct.unpack_from('<I', body)[0]
+            self.requests.append((commandTag, baudrate))
+            if commandTag == uipacket.kCommandTag_SetBaudrate:
+                if baudrate in self.acceptedBaudrates:
+                    self.pendingBaudrate = baudrate
+                    status = uipacket.kAckStatus_Success
+            elif baudrate == self.pendingBaudrate:
+                self.baudrate = baudrate
+                status = uipacket.kAckStatus_Success
+        os.write(self.fd, uipacket.s_packetTagBytes + bytes([commandTag, status]))
+
+@pytest.fixture
+def uartBoard(mainWin):
+    master, slave = pty.openpty()
+    tty.setraw(master)
+    tty.setraw(slave)
+    boards = []
+    def _open( acceptedBaudrates ):
+        board = fakeUartFirmware(master, acceptedBaudrates + [uidef.kUartBaudrate_Default])
+        board.start()
+        boards.append(board)
+        mainWin.uartComPort = os.ttyname(slave)
+        mainWin.uartBaudrate = str(uidef.kUartBaudrate_Default)
+        mainWin.openUartPort()
+        assert uicore.s_serialPort.isOpen()
+        return board
+    yield _open
+    mainWin.closeUartPort()
+    for board in boards:
+        board.stop()
+    os.close(master)
+    os.close(slave)
+
+def _setBaudrateRequests( board ):
+    return [baudrate for commandTag, baudrate in board.requests if commandTag == uipacket.kCommandTag_SetBaudrate]
+
+def test_negotiation_picks_fastest_accepted_rate(mainWin, uartBoard):
+    board = uartBoard([1000000, 460800])
+    assert uicore.s_serialPort.baudrate == 1000000
+    assert board.baudrate == 1000000
+    assert _setBaudrateRequests(board) == [3000000, 2000000, 1000000]
+    assert (uipacket.kCommandTag_ConfirmBaudrate, 1000000) in board.requests
+
+def test_negotiation_skips_rejected_rates(mainWin, uartBoard):
+    board = uartBoard([])
+    assert uicore.s_serialPort.baudrate == uidef.kUartBaudrate_Default
+    assert board.baudrate == uidef.kUartBaudrate_Default
+    assert _setBaudrateRequests(board) == uidef.kUartBaudrateNegotiationList
+    assert all(commandTag == uipacket.kCommandTag_SetBaudrate for commandTag, baudrate in board.requests)
+
+def _feedGarbage( qapp, fd, count ):
+    os.write(fd, b'\xff' * count)
+    deadline = time.time() + 1
+    while time.time() < deadline:
+        qapp.processEvents()
+        time.sleep(0.005)
+
+def test_fall_back_after_garbage(qapp, mainWin, uartBoard):
+    board = uartBoard([1000000, 460800])
+    assert uicore.s_serialPort.baudrate == 1000000
+    # One short glitch below the threshold keeps the rate
+    _feedGarbage(qapp, board.fd, uidef.kUartErrorCharsToFallBack - 1)
+    assert uicore.s_serialPort.baudrate == 1000000
+    _feedGarbage(qapp, board.fd, 1)
+    assert uicore.s_serialPort.baudrate == 460800
+    assert board.baudrate == 460800
+    assert _setBaudrateRequests(board)[-2:] == [921600, 460800]
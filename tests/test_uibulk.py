@@ -0,0 +1,177 @@
+#! /usr/bin/env python
+# -*- coding: utf-8 -*-
+
+# Copyright 2022 NXP
+# All rights reserved.
+# 
+# SPDX-License-Identifier: BSD-3-Clause
+
+import os
+import heapq
+import pytest
+
+from ui import uidef
+from ui import uipacket
+from ui import uiuart
+from ui import uibulk
+
+# Firmware side of the bulk channel
+class bulkReceiver(object):
+
+    def __init__( self, writeFunc ):
+        self.writeFunc = writeFunc
+        self.transferId = None
+        self.totalSize = 0
+        self.totalCrc16 = None
+        self.data = bytearray()
+        self.isMute = False
+
+    def handlePacket( self, commandTag, fieldsDict, isCrcValid ):
+        if self.isMute:
+            return
+        if commandTag == uipacket.kCommandTag_BulkStart:
+            if not isCrcValid:
+                return
+            if fieldsDict['transferId'] != self.transferId or fieldsDict['totalSize'] != self.totalSize or \
+               fieldsDict['totalCrc16'] != self.totalCrc16:
+                self.transferId = fieldsDict['transferId']
+                self.totalSize = fieldsDict['totalSize']
+                self.totalCrc16 = fieldsDict['totalCrc16']
+                self.data = bytearray()
+            self._ack(uipacket.kBulkStatus_Success)
+        elif commandTag == uipacket.kCommandTag_BulkData:
+            if not isCrcValid:
+                self._ack(uipacket.kBulkStatus_CrcError)
+            elif fieldsDict['transferId'] != self.transferId:
+                return
+            elif fieldsDict['offset'] == len(self.data):
+                self.data += fieldsDict['data']
+                self._ack(uipacket.kBulkStatus_Success)
+            elif fieldsDict['offset'] < len(self.data):
+                # Resent chunk we already have
+                self._ack(uipacket.kBulkStatus_Success)
+            else:
+                self._ack(uipacket.kBulkStatus_OutOfOrder)
+
+    def _ack( self, status ):
+        self.writeFunc(uipacket.encode_bulk_ack_frame(self.transferId or 0, status, len(self.data)))
+
+    def isComplete( self ):
+        return len(self.data) == self.totalSize and uipacket.calculate_crc16(self.data) == self.totalCrc16
+
+# Full duplex serial line, bytes arrive when their last stop bit is through plus a fixed
+# latency per direction (USB-UART bridges buffer for a few ms)
+class simulatedLine(object):
+
+    def __init__( self, baudrate, latency=0.002, corruptEvery=0, muteAfterChunks=None ):
+        self.baudrate = baudrate
+        self.latency = latency
+        self.corruptEvery = corruptEvery
+        self.muteAfterChunks = muteAfterChunks
+        self.events = []
+        # One per direction
+        self.busyUntil = [0.0, 0.0]
+        self.now = 0.0
+        self.count = 0
+        self.chunks = 0
+        self.hostParser = uiuart.uartPrintParser()
+        self.target = bulkReceiver(lambda frameBytes: self._write(1, self._toHost, frameBytes))
+        self.host = None
+
+    def _write( self, direction, deliverFunc, data ):
+        self.busyUntil[direction] = max(self.now, self.busyUntil[direction]) + len(data) * 10.0 / self.baudrate
+        self.count += 1
+        heapq.heappush(self.events, (self.busyUntil[direction] + self.latency, self.count, deliverFunc, data))
+
+    def _toTarget( self, packetBytes ):
+        commandTag, fieldsDict, isCrcValid, size = uipacket.parse_packet(packetBytes)
+        if commandTag == uipacket.kCommandTag_BulkData:
+            self.chunks += 1
+            if self.corruptEvery and self.chunks % self.corruptEvery == 0:
+                isCrcValid = False
+            if self.muteAfterChunks != None and self.chunks > self.muteAfterChunks:
+                self.target.isMute = True
+        self.target.handlePacket(commandTag, fieldsDict, isCrcValid)
+
+    def _toHost( self, frameBytes ):
+        for event, value in self.hostParser.feed(frameBytes):
+            if event == uiuart.kUartPrintEvent_BulkAck:
+                self.host.handleAck(*value)
+
+    def createTransfer( self, data, windowChunks=None ):
+        self.host = uibulk.bulkTransfer(lambda packetBytes: self._write(0, self._toTarget, packetBytes), 1,
+                                        uipacket.kBulkDataType_TestVector, data, self.baudrate,
+                                        windowChunks=windowChunks, clock=lambda: self.now)
+        return self.host
+
+    def run( self ):
+        while self.host.isActive():
+            if self.events and self.events[0][0] <= self.host.deadline:
+                self.now, idx, deliverFunc, payload = heapq.heappop(self.events)
+                deliverFunc(payload)
+            else:
+                self.now = self.host.deadline
+                self.host.poll()
+        # Let the acks still on the wire through
+        while self.events:
+            self.now, idx, deliverFunc, payload = heapq.heappop(self.events)
+            deliverFunc(payload)
+        return self.now
+
+@pytest.mark.parametrize('baudrate', [115200, 921600, 3000000])
+def test_window_sizing(baudrate):
+    windowChunks = uibulk.get_bulk_window_chunks(baudrate)
+    assert 2 <= windowChunks <= uidef.kBulkMaxWindowChunks
+    # The window covers one ack round trip on the line
+    assert windowChunks * uidef.kBulkChunkSize >= baudrate / 10.0 * uidef.kBulkRoundTripInSeconds
+
+@pytest.mark.parametrize('windowChunks', [1, None])
+def test_transfer_completes(windowChunks):
+    data = os.urandom(20 * 1024 + 17)
+    line = simulatedLine(921600)
+    transfer = line.createTransfer(data, windowChunks)
+    transfer.start()
+    line.run()
+    assert transfer.isDone()
+    assert line.target.isComplete()
+    assert bytes(line.target.data) == data
+    assert transfer.statsDict['resentChunks'] == 0
+
+def test_window_beats_stop_and_wait():
+    data = os.urandom(64 * 1024)
+    seconds = {}
+    for windowChunks in [1, None]:
+        line = simulatedLine(3000000)
+        line.createTransfer(data, windowChunks).start()
+        seconds[windowChunks] = line.run()
+    assert seconds[None] < seconds[1] / 2
+
+def test_corrupted_chunks_are_resent():
+    data = os.urandom(16 * 1024)
+    line = simulatedLine(921600, corruptEvery=7)
+    transfer = line.createTransfer(data)
+    transfer.start()
+    line.run()
+    assert transfer.isDone()
+    assert bytes(line.target.data) == data
+    assert transfer.statsDict['naks'] > 0
+    assert transfer.statsDict['resentChunks'] > 0
+
+def test_resume_after_failure():
+    data = os.urandom(16 * 1024)
+    line = simulatedLine(921600, muteAfterChunks=20)
+    transfer = line.createTransfer(data)
+    transfer.start()
+    line.run()
+    assert transfer.isFailed()
+    receivedSize = len(line.target.data)
+    assert 0 < receivedSize < len(data)
+    # The firmware is back, only what it does not have yet is sent again
+    line.target.isMute = False
+    line.muteAfterChunks = None
+    chunksBefore = transfer.statsDict['chunks']
+    transfer.start()
+    line.run()
+    assert transfer.isDone()
+    assert bytes(line.target.data) == data
+    assert transfer.statsDict['chunks'] - chunksBefore == -(-(len(data) - receivedSize) // uidef.kBulkChunkSize)
@@ -0,0 +1,73 @@
+#! /usr/bin/env python
+# -*- coding: utf-8 -*-
+
+# Copyright 2022 NXP
+# All rights reserved.
+# 
+# SPDX-License-Identifier: BSD-3-Clause
+
+import time
+import serial
+import pytest
+from PyQt5.QtCore import Qt
+
+from ui import uicore
+from ui import uiuart
+from ui import uilink
+from ui import uipacket
+from tests.test_uipacket_result import _encodeResultFrame
+
+@pytest.fixture
+def loopPort(monkeypatch):
+    port = serial.serial_for_url('loop://', timeout=uicore.s_recvTimeout)
+    monkeypatch.setattr(uicore, 's_serialPort', port)
+    yield port
+    port.close()
+
+def _collect( worker ):
+    chunks = []
+    worker.sinOut.connect(chunks.append, Qt.DirectConnection)
+    return chunks
+
+def test_recv_worker_delivers_every_byte(qapp, loopPort):
+    worker = uicore.uartRecvWorker()
+    chunks = _collect(worker)
+    worker.start()
+    payload = bytes(range(256)) * 4
+    for i in range(0, len(payload), 64):
+        loopPort.write(payload[i:i + 64])
+    deadline = time.time() + 5
+    while sum(len(c) for c in chunks) < len(payload) and time.time() < deadline:
+        time.sleep(0.01)
+    worker.stop()
+    assert b''.join(chunks) == payload
+
+def test_recv_worker_stop_right_after_start(qapp, loopPort):
+    for i in range(20):
+        worker = uicore.uartRecvWorker()
+        worker.stop()
+        worker.start()
+        worker.stop()
+        assert worker.wait(2000)
+        assert worker.isFinished()
+
+def test_link_data_frame_payload_is_shown(mainWin, loopPort, monkeypatch):
+    monkeypatch.setattr(uicore, 's_uartLink', uilink.reliableLink(loopPort.write))
+    monkeypatch.setattr(uicore, 's_uartPrintParser', uiuart.uartPrintParser())
+    monkeypatch.setattr(uicore, 's_uartLinkPrintParser', uiuart.uartPrintParser())
+    monkeypatch.setattr(mainWin, 'testResultRecords', [], raising=False)
+    shownText = []
+    monkeypatch.setattr(mainWin, 'showStreamOnMainDisplayWin', shownText.append)
+    resultFrame = _encodeResultFrame(0xC1, uipacket.kResultMetric_CopyMiBps, 1, 64.0)
+    # A result frame split across two data frames, the first one uses seq id 255 right after reset
+    frames = [uipacket.encode_link_frame(uipacket.kLinkFrameType_Data, 255, b'hello from firmware\r\n' + resultFrame[0:6]),
+              uipacket.encode_link_frame(uipacket.kLinkFrameType_Data, 0, resultFrame[6:] + b'bye\r\n'),
+             ]
+    # The second frame comes twice as if its ack got lost
+    mainWin.receiveUartData(frames[0] + frames[1][0:5])
+    mainWin.receiveUartData(frames[1][5:] + frames[1])
+    assert u''.join(shownText) == u'hello from firmware\r\nbye\r\n'
+    assert mainWin.testResultRecords == [(0xC1, uipacket.kResultMetric_CopyMiBps, 1, 64.0)]
+    assert uicore.s_uartLink.statsDict['duplicates'] == 1
+    acks = [uipacket.encode_link_frame(uipacket.kLinkFrameType_Ack, seqId) for seqId in [255, 0, 0]]
+    assert loopPort.read(len(b''.join(acks))) == b''.join(acks)
@@ -0,0 +1,130 @@
+#! /usr/bin/env python
+# -*- coding: utf-8 -*-
+
+# Copyright 2022 NXP
+# All rights reserved.
+# 
+# SPDX-License-Identifier: BSD-3-Clause
+
+import random
+import pytest
+
+from ui import uidef
+from ui import uipacket
+from ui import uiuart
+from ui import uilink
+
+# One direction of a serial line that flips every bit with probability bitErrorRate,
+# loseFrames drops whole writes by their index instead
+class faultyLoopbackChannel(object):
+
+    def __init__( self, bitErrorRate=0, rng=None, loseFrames=() ):
+        self.bitErrorRate = bitErrorRate
+        self.rng = rng
+        self.loseFrames = set(loseFrames)
+        self.writes = 0
+        self.buffer = bytearray()
+
+    def write( self, data ):
+        self.writes += 1
+        if self.writes - 1 in self.loseFrames:
+            return
+        data = bytearray(data)
+        if self.bitErrorRate > 0:
+            bits = len(data) * 8
+            # Jump straight to the next flipped bit instead of rolling for each one
+            bit = int(self.rng.expovariate(self.bitErrorRate))
+            while bit < bits:
+                data[bit >> 3] ^= 1 << (bit & 0x7)
+                bit += 1 + int(self.rng.expovariate(self.bitErrorRate))
+        self.buffer += data
+
+    def read( self ):
+        data = bytes(self.buffer)
+        self.buffer = bytearray()
+        return data
+
+def _feedLink( link, parser, data ):
+    delivered = []
+    for event, value in parser.feed(data):
+        if event == uiuart.kUartPrintEvent_LinkFrame:
+            delivered += link.handleFrame(value)
+        elif event == uiuart.kUartPrintEvent_LinkError:
+            link.handleBadFrame()
+    return delivered
+
+# Host and firmware ends joined by two channels, line time is simulated from baudrate
+def _runLinkPair( payloads, toTarget, toHost, maxRetransmits=uidef.kUartLinkMaxRetransmits, baudrate=uidef.kUartBaudrate_Default ):
+    clock = [0.0]
+    def _writer( channel ):
+        def _write( data ):
+            clock[0] += len(data) * 10.0 / baudrate
+            channel.write(data)
+        return _write
+    host = uilink.reliableLink(_writer(toTarget), baudrate, maxRetransmits=maxRetransmits, clock=lambda: clock[0])
+    target = uilink.reliableLink(_writer(toHost), baudrate, clock=lambda: clock[0])
+    hostParser = uiuart.uartPrintParser()
+    targetParser = uiuart.uartPrintParser()
+    for payload in payloads:
+        host.send(payload)
+    delivered = []
+    dropped = []
+    while not host.isIdle():
+        toTargetData = toTarget.read()
+        toHostData = toHost.read()
+        if toTargetData:
+            delivered += _feedLink(target, targetParser, toTargetData)
+        if toHostData:
+            _feedLink(host, hostParser, toHostData)
+        if not toTargetData and not toHostData:
+            # Nothing left on the wire, wait out the ack timeout
+            clock[0] = max(clock[0], host.txDeadline)
+            dropped += host.poll()
+    return host, target, delivered, dropped
+
+def _payloads( rng, count, size=32 ):
+    return [bytes(rng.getrandbits(8) for i in range(size)) for j in range(count)]
+
+def test_clean_line_delivers_in_order():
+    payloads = _payloads(random.Random(1), 50)
+    host, target, delivered, dropped = _runLinkPair(payloads, faultyLoopbackChannel(), faultyLoopbackChannel())
+    assert delivered == payloads
+    assert dropped == []
+    assert host.statsDict['retransmitted'] == 0
+    assert host.statsDict['acked'] == len(payloads)
+
+@pytest.mark.parametrize('bitErrorRate', [1e-4, 1e-3])
+def test_bit_errors_deliver_every_payload_exactly_once(bitErrorRate):
+    rng = random.Random(0)
+    payloads = _payloads(rng, 300)
+    host, target, delivered, dropped = _runLinkPair(payloads, faultyLoopbackChannel(bitErrorRate, rng),
+                                                    faultyLoopbackChannel(bitErrorRate, rng), maxRetransmits=100)
+    assert delivered == payloads
+    assert dropped == []
+    assert host.statsDict['retransmitted'] > 0
+
+def test_lost_ack_duplicate_is_dropped():
+    payloads = _payloads(random.Random(2), 3)
+    # The ack of the second data frame is lost, so it is resent and the firmware sees it twice
+    host, target, delivered, dropped = _runLinkPair(payloads, faultyLoopbackChannel(), faultyLoopbackChannel(loseFrames=[1]))
+    assert delivered == payloads
+    assert host.statsDict['retransmitted'] == 1
+    assert target.statsDict['duplicates'] == 1
+    assert target.statsDict['delivered'] == len(payloads)
+
+def test_dead_line_drops_after_max_retransmits():
+    payloads = _payloads(random.Random(3), 2)
+    host, target, delivered, dropped = _runLinkPair(payloads, faultyLoopbackChannel(loseFrames=range(100)), faultyLoopbackChannel())
+    assert delivered == []
+    assert dropped == payloads
+    assert host.statsDict['retransmitted'] == 2 * uidef.kUartLinkMaxRetransmits
+
+def test_first_data_frame_may_use_any_seq_id():
+    channel = faultyLoopbackChannel()
+    link = uilink.reliableLink(channel.write)
+    frame = (uipacket.kLinkFrameType_Data, 255, b'first')
+    assert link.handleFrame(frame) == [b'first']
+    assert link.handleFrame(frame) == []
+    assert link.statsDict['duplicates'] == 1
+    link.reset()
+    assert link.handleFrame(frame) == [b'first']
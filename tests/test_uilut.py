@@ -0,0 +1,106 @@
+#! /usr/bin/env python
+# -*- coding: utf-8 -*-
+
+# Copyright 2022 NXP
+# All rights reserved.
+#
+# SPDX-License-Identifier: BSD-3-Clause
+
+import os
+import glob
+import struct
+import pytest
+
+from ui import uidef
+from ui import uilut
+from ui import uimodel
+from tests.conftest import kSrcRoot
+
+kMemModelRoot = os.path.join(kSrcRoot, 'targets', 'mem_model')
+
+# The complete LUTs as they were built before compileLut(), one if per sequence name
+def _generateCompleteNorLut( mixspiLutDict ):
+    memLut = [0x0] * uilut.CUSTOM_LUT_LENGTH
+    for key in mixspiLutDict.keys():
+        if key == 'READ':
+            memLut[(uilut.NOR_CMD_LUT_SEQ_IDX_READ * 4):((uilut.NOR_CMD_LUT_SEQ_IDX_READ + 1) * 4)] = mixspiLutDict[key].sequence
+        if key == 'READSTATUS':
+            memLut[(uilut.NOR_CMD_LUT_SEQ_IDX_READSTATUS * 4):((uilut.NOR_CMD_LUT_SEQ_IDX_READSTATUS + 1) * 4)] = mixspiLutDict[key].sequence
+        if key == 'WRITEENABLE':
+            memLut[(uilut.NOR_CMD_LUT_SEQ_IDX_WRITEENABLE * 4):((uilut.NOR_CMD_LUT_SEQ_IDX_WRITEENABLE + 1) * 4)] = mixspiLutDict[key].sequence
+        if key == 'ENABLEQE':
+            memLut[(uilut.NOR_CMD_LUT_SEQ_IDX_ENABLEQE * 4):((uilut.NOR_CMD_LUT_SEQ_IDX_ENABLEQE + 1) * 4)] = mixspiLutDict[key].sequence
+        if key == 'READID':
+            memLut[(uilut.NOR_CMD_LUT_SEQ_IDX_READID * 4):((uilut.NOR_CMD_LUT_SEQ_IDX_READID + 1) * 4)] = mixspiLutDict[key].sequence
+        if key == 'READREG1':
+            memLut[(uilut.NOR_CMD_LUT_SEQ_IDX_READREG1 * 4):((uilut.NOR_CMD_LUT_SEQ_IDX_READREG1 + 1) * 4)] = mixspiLutDict[key].sequence
+        if key == 'READREG2':
+            memLut[(uilut.NOR_CMD_LUT_SEQ_IDX_READREG2 * 4):((uilut.NOR_CMD_LUT_SEQ_IDX_READREG2 + 1) * 4)] = mixspiLutDict[key].sequence
+        if key == 'ERASESECTOR':
+            memLut[(uilut.NOR_CMD_LUT_SEQ_IDX_ERASESECTOR * 4):((uilut.NOR_CMD_LUT_SEQ_IDX_ERASESECTOR + 1) * 4)] = mixspiLutDict[key].sequence
+        if key == 'PAGEPROGRAM':
+            memLut[(uilut.NOR_CMD_LUT_SEQ_IDX_PAGEPROGRAM * 4):((uilut.NOR_CMD_LUT_SEQ_IDX_PAGEPROGRAM + 1) * 4)] = mixspiLutDict[key].sequence
+    return memLut
+
+def _generateCompleteRamLut( mixspiLutDict ):
+    memLut = [0x0] * uilut.CUSTOM_LUT_LENGTH
+    for key in mixspiLutDict.keys():
+        if key == 'READDATA':
+            memLut[(uilut.PSRAM_CMD_LUT_SEQ_IDX_READDATA * 4):((uilut.PSRAM_CMD_LUT_SEQ_IDX_READDATA + 1) * 4)] = mixspiLutDict[key].sequence
+        if key == 'WRITEDATA':
+            memLut[(uilut.PSRAM_CMD_LUT_SEQ_IDX_WRITEDATA * 4):((uilut.PSRAM_CMD_LUT_SEQ_IDX_WRITEDATA + 1) * 4)] = mixspiLutDict[key].sequence
+        if key == 'READREG':
+            memLut[(uilut.PSRAM_CMD_LUT_SEQ_IDX_READREG * 4):((uilut.PSRAM_CMD_LUT_SEQ_IDX_READREG + 1) * 4)] = mixspiLutDict[key].sequence
+        if key == 'WRITEREG':
+            memLut[(uilut.PSRAM_CMD_LUT_SEQ_IDX_WRITEREG * 4):((uilut.PSRAM_CMD_LUT_SEQ_IDX_WRITEREG + 1) * 4)] = mixspiLutDict[key].sequence
+        if key == 'RESET':
+            memLut[(uilut.PSRAM_CMD_LUT_SEQ_IDX_RESET * 4):((uilut.PSRAM_CMD_LUT_SEQ_IDX_RESET + 1) * 4)] = mixspiLutDict[key].sequence
+        if key == 'READID':
+            memLut[(uilut.PSRAM_CMD_LUT_SEQ_IDX_READID * 4):((uilut.PSRAM_CMD_LUT_SEQ_IDX_READID + 1) * 4)] = mixspiLutDict[key].sequence
+    return memLut
+
+kOldLutGenerators = {uidef.kMemType_QuadSPI:  _generateCompleteNorLut,
+                     uidef.kMemType_OctalSPI: _generateCompleteNorLut,
+                     uidef.kMemType_PSRAM:    _generateCompleteRamLut,
+                     uidef.kMemType_HyperRAM: _generateCompleteRamLut,
+                    }
+
+def _listModelFiles():
+    modelFiles = []
+    for memType in sorted(kOldLutGenerators):
+        modelFiles += sorted(glob.glob(os.path.join(kMemModelRoot, '*', memType, '*.py')))
+    return modelFiles
+
+def _packLut( memLut ):
+    return struct.pack('<%dI' % uilut.CUSTOM_LUT_LENGTH, *memLut)
+
+@pytest.mark.parametrize('modelDescFile', _listModelFiles(), ids=lambda path: os.path.relpath(path, kMemModelRoot))
+def test_compiled_lut_matches_old_generator(modelDescFile):
+    memType = os.path.basename(os.path.dirname(modelDescFile))
+    mixspiLutDict = uimodel.createModel(modelDescFile).mixspiLutDict
+    memLut = uimodel.generateMemLut(memType, mixspiLutDict)
+    assert len(memLut) == uilut.CUSTOM_LUT_LENGTH
+    assert _packLut(memLut) == _packLut(kOldLutGenerators[memType](mixspiLutDict))
+
+def test_unknown_sequence_is_left_out():
+    readSeq = uilut.mixspiLutSequence(uilut.kFLEXSPI_Command_SDR, uilut.kFLEXSPI_1PAD, 0x03)
+    memLut = uilut.compileLut({'READ': readSeq, 'ENTERQPI': readSeq}, uilut.kNorLutSeqIdxDict)
+    assert _packLut(memLut) == _packLut(_generateCompleteNorLut({'READ': readSeq}))
+
+def test_read_estimate_of_w25qxxxjv():
+    # 0xEB fast read quad I/O: 8 command cycles on one pad, 24 address bits on four pads (6), mode
+    # byte on four pads (2) and 4 dummy cycles, plus 2 cycles of chip select overhead
+    mixspiLutDict = uimodel.createModel(os.path.join(kMemModelRoot, 'Winbond', uidef.kMemType_QuadSPI, 'W25QxxxJV.py')).mixspiLutDict
+    memLut = uimodel.generateMemLut(uidef.kMemType_QuadSPI, mixspiLutDict)
+    assert [instruction.operand for instruction in uilut.decodeLutSequence(memLut, 0)] == [0xEB, 0x18, 0xF0, 0x04, 0x04]
+    estimate = uilut.estimateLutRead(memLut, 133, 4096)
+    assert estimate.latencyCycles == 2 + 8 + 6 + 2 + 4
+    assert estimate.dataCycles == 4096 * 2
+    assert not estimate.isDdr
+    assert estimate.latencyNs == pytest.approx(22 * 1000.0 / 133)
+    assert estimate.bandwidthMiBps == pytest.approx(4096 / ((22 + 8192) / 133e6) / (1024 * 1024))
+    assert estimate.bandwidthMiBps == pytest.approx(63.25, abs=0.01)
+
+def test_read_estimate_without_read_sequence():
+    assert uilut.estimateLutRead(uilut.compileLut({}, uilut.kNorLutSeqIdxDict), 133, 32) == None
+    assert uilut.estimateLutRead(None, 133, 32) == None
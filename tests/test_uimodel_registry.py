@@ -0,0 +1,77 @@
+#! /usr/bin/env python
+# -*- coding: utf-8 -*-
+
+# Copyright 2022 NXP
+# All rights reserved.
+#
+# SPDX-License-Identifier: BSD-3-Clause
+
+import os
+import shutil
+import pytest
+
+from ui import uidef
+from ui import uimodel
+from tests.conftest import kSrcRoot
+
+kModelFile = os.path.join(kSrcRoot, 'targets', 'mem_model', 'Winbond', 'QuadSPI_NOR', 'W25QxxxJV.py')
+
+@pytest.fixture
+def modelTree(tmp_path):
+    typeDir = tmp_path / 'mem_model' / 'Winbond' / uidef.kMemType_QuadSPI
+    typeDir.mkdir(parents=True)
+    modelFile = str(typeDir / 'W25QxxxJV.py')
+    shutil.copyfile(kModelFile, modelFile)
+    return str(tmp_path / 'mem_model'), modelFile, str(tmp_path / 'mem_model_cache.json')
+
+def test_cache_file_is_reused(modelTree):
+    memModelRoot, modelFile, cacheFile = modelTree
+    assert uimodel.memModelRegistry(memModelRoot, cacheFile).refresh()
+    registry = uimodel.memModelRegistry(memModelRoot, cacheFile)
+    assert not registry.refresh()
+    assert registry.statsDict == {'loaded':0, 'reused':1, 'removed':0}
+    entry = registry.getEntry('Winbond', uidef.kMemType_QuadSPI, 'W25QxxxJV')
+    assert entry['error'] == None
+    assert entry['memLut'] == uimodel.generateMemLut(uidef.kMemType_QuadSPI, uimodel.createModel(kModelFile).mixspiLutDict)
+
+def test_mtime_change_invalidates_entry(modelTree):
+    memModelRoot, modelFile, cacheFile = modelTree
+    uimodel.memModelRegistry(memModelRoot, cacheFile).refresh()
+    fileStat = os.stat(modelFile)
+    os.utime(modelFile, ns=(fileStat.st_atime_ns, fileStat.st_mtime_ns + 1000000))
+    registry = uimodel.memModelRegistry(memModelRoot, cacheFile)
+    assert registry.refresh()
+    assert registry.statsDict == {'loaded':1, 'reused':0, 'removed':0}
+    # The rewritten cache file carries the new stamp
+    registry = uimodel.memModelRegistry(memModelRoot, cacheFile)
+    assert not registry.refresh()
+    assert registry.statsDict['reused'] == 1
+
+def test_removed_model_is_dropped(modelTree):
+    memModelRoot, modelFile, cacheFile = modelTree
+    registry = uimodel.memModelRegistry(memModelRoot, cacheFile)
+    registry.refresh()
+    os.remove(modelFile)
+    assert registry.refresh()
+    assert registry.statsDict['removed'] == 1
+    assert registry.getChips('Winbond', uidef.kMemType_QuadSPI) == []
+
+def test_broken_model_is_not_run_again(modelTree):
+    memModelRoot, modelFile, cacheFile = modelTree
+    brokenFile = os.path.join(os.path.dirname(modelFile), 'broken_chip.py')
+    with open(brokenFile, 'w') as fileObj:
+        fileObj.write('memPropertyDict = {\n')
+    registry = uimodel.memModelRegistry(memModelRoot, cacheFile)
+    assert registry.refresh()
+    assert registry.getEntry('Winbond', uidef.kMemType_QuadSPI, 'broken_chip')['error'] != None
+    cacheStat = os.stat(cacheFile)
+    assert not registry.refresh()
+    assert registry.statsDict == {'loaded':2, 'reused':2, 'removed':0}
+    assert os.stat(cacheFile).st_mtime_ns == cacheStat.st_mtime_ns
+    # Fixing the script is picked up
+    shutil.copyfile(modelFile, brokenFile)
+    fileStat = os.stat(brokenFile)
+    os.utime(brokenFile, ns=(fileStat.st_atime_ns, fileStat.st_mtime_ns + 1000000))
+    assert registry.refresh()
+    assert registry.statsDict['loaded'] == 3
+    assert registry.getEntry('Winbond', uidef.kMemType_QuadSPI, 'broken_chip')['error'] == None
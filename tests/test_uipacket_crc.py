@@ -0,0 +1,51 @@
+#! /usr/bin/env python
+# -*- coding: utf-8 -*-
+
+# Copyright 2022 NXP
+# All rights reserved.
+# 
+# SPDX-License-Identifier: BSD-3-Clause
+
+import os
+import binascii
+import pytest
+
+from ui import uipacket
+
+# CRC-16/XMODEM check values
+kCrc16Vectors = [(b'', 0x0000),
+                 (b'A', 0x58E5),
+                 (b'123456789', 0x31C3),
+                 (b'\x00' * 4, 0x0000),
+                 (b'\xff' * 4, 0x99CF),
+                ]
+
+@pytest.mark.parametrize('data, checksum', kCrc16Vectors)
+def test_crc16_reference_vectors(data, checksum):
+    assert binascii.crc_hqx(data, 0) == checksum
+    assert uipacket.calculate_crc16(data) == checksum
+    assert uipacket.calculate_crc16(bytearray(data)) == checksum
+    assert uipacket.calculate_crc16(memoryview(data)) == checksum
+
+@pytest.mark.parametrize('size', [1, 13, 268, 4096])
+def test_crc16_table_path_matches_crc_hqx(size):
+    data = os.urandom(size)
+    # Lists of ints are not accepted by binascii and go through the lookup table
+    assert uipacket.calculate_crc16(list(data)) == binascii.crc_hqx(data, 0)
+
+def test_crc16_incremental_matches_one_shot():
+    data = os.urandom(1000)
+    calculator = uipacket.crc16Calculator()
+    for i in range(0, len(data), 97):
+        calculator.update(data[i:i + 97])
+    assert calculator.checksum == uipacket.calculate_crc16(data)
+    calculator.reset()
+    assert calculator.update(b'123456789') == 0x31C3
+
+def test_crc16_matches_crc_package():
+    crc = pytest.importorskip('crc')
+    configuration = crc.Configuration(16, uipacket.kCrc16Poly, uipacket.kCrc16InitValue, 0x00, False, False)
+    calculator = crc.CrcCalculator(configuration, True)
+    for size in [13, 268, 4096]:
+        data = os.urandom(size)
+        assert calculator.calculate_checksum(data) == uipacket.calculate_crc16(data)
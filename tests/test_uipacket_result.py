@@ -0,0 +1,76 @@
+#! /usr/bin/env python
+# -*- coding: utf-8 -*-
+
+# Copyright 2022 NXP
+# All rights reserved.
+# 
+# SPDX-License-Identifier: BSD-3-Clause
+
+import struct
+import pytest
+
+from ui import uipacket
+from ui import uiuart
+
+def _encodeResultFrame( testId, metric, iteration, value ):
+    body = struct.pack('<BBIf', testId, metric, iteration, value)
+    return b'RTAG' + body + struct.pack('<H', uipacket.calculate_crc16(body))
+
+def test_decode_valid_frame():
+    frame = _encodeResultFrame(0xC1, uipacket.kResultMetric_CopyMiBps, 3, 180.5)
+    assert len(frame) == uipacket.kResultFrameSize
+    assert uipacket.decode_result_frame(frame) == (0xC1, uipacket.kResultMetric_CopyMiBps, 3, 180.5)
+    # Trailing bytes belong to whatever follows the frame
+    assert uipacket.decode_result_frame(frame + b'tail') == (0xC1, uipacket.kResultMetric_CopyMiBps, 3, 180.5)
+
+def test_decode_bad_crc():
+    frame = bytearray(_encodeResultFrame(0xC1, uipacket.kResultMetric_CopyMiBps, 3, 180.5))
+    frame[8] ^= 0x01
+    assert uipacket.decode_result_frame(bytes(frame)) == None
+    frame = _encodeResultFrame(0xC1, uipacket.kResultMetric_CopyMiBps, 3, 180.5)
+    assert uipacket.decode_result_frame(b'XTAG' + frame[4:]) == None
+
+@pytest.mark.parametrize('size', [0, 4, 10, uipacket.kResultFrameSize - 1])
+def test_decode_truncated_frame(size):
+    frame = _encodeResultFrame(0xE0, uipacket.kResultMetric_ErrorCount, 1, 0.0)
+    assert uipacket.decode_result_frame(frame[0:size]) == None
+
+def test_unknown_record_type_is_shown_raw():
+    record = uipacket.decode_result_frame(_encodeResultFrame(0x7E, 0x42, 2, 1.5))
+    assert record == (0x7E, 0x42, 2, 1.5)
+    assert uipacket.format_result_record(record) == '0x7e #2 0x42: 1.500'
+
+def test_format_known_record_with_lut_limit():
+    record = uipacket.testResultRecord(0xC1, uipacket.kResultMetric_CopyMiBps, 1, 50.0)
+    resultStr = uipacket.format_result_record(record, 200.0)
+    assert resultStr.endswith('#1 copy: 50.000 MiB/s (25% of LUT read limit 200.000 MiB/s)')
+    # The limit only applies to mbw copy throughput
+    record = uipacket.testResultRecord(0xC1, uipacket.kResultMetric_ElapsedSec, 1, 50.0)
+    assert 'LUT' not in uipacket.format_result_record(record, 200.0)
+
+def test_summarize_records():
+    records = [uipacket.testResultRecord(0xC1, uipacket.kResultMetric_CopyMiBps, 1, 100.0),
+               uipacket.testResultRecord(0xC2, uipacket.kResultMetric_CopyMiBps, 1, 10.0),
+               uipacket.testResultRecord(0xC1, uipacket.kResultMetric_CopyMiBps, 2, 200.0),
+               uipacket.testResultRecord(0xC1, uipacket.kResultMetric_CopyMiBps, 3, 150.0),
+              ]
+    summaryDict = uipacket.summarize_result_records(records)
+    assert list(summaryDict.keys()) == [(0xC1, uipacket.kResultMetric_CopyMiBps), (0xC2, uipacket.kResultMetric_CopyMiBps)]
+    assert summaryDict[(0xC1, uipacket.kResultMetric_CopyMiBps)] == (3, 150.0, 100.0, 200.0)
+    assert summaryDict[(0xC2, uipacket.kResultMetric_CopyMiBps)] == (1, 10.0, 10.0, 10.0)
+    assert uipacket.summarize_result_records([]) == {}
+
+def test_frame_in_text_stream():
+    frame = _encodeResultFrame(0xC1, uipacket.kResultMetric_CopyMiBps, 1, 64.0)
+    badFrame = bytearray(frame)
+    badFrame[-1] ^= 0xFF
+    parser = uiuart.uartPrintParser()
+    events = []
+    for data in [b'before ', frame[0:5], frame[5:], b' after', bytes(badFrame)]:
+        events += parser.feed(data)
+    assert (uiuart.kUartPrintEvent_Result, (0xC1, uipacket.kResultMetric_CopyMiBps, 1, 64.0)) in events
+    assert [event for event, value in events].count(uiuart.kUartPrintEvent_Result) == 1
+
+def test_packets_ask_for_ascii_results_by_default():
+    assert uipacket.perfTestPacket().resultFormat == uipacket.kResultFormat_Ascii
+    assert uipacket.stressTestPacket().resultFormat == uipacket.kResultFormat_Ascii
@@ -0,0 +1,111 @@
+#! /usr/bin/env python
+# -*- coding: utf-8 -*-
+
+# Copyright 2022 NXP
+# All rights reserved.
+# 
+# SPDX-License-Identifier: BSD-3-Clause
+
+import os
+import binascii
+import pytest
+
+from ui import uidef
+from ui import uivar
+from ui import uimodel
+from ui import uipacket
+from tests.conftest import kSrcRoot
+
+def _baudratePacket( baudrate, isConfirm=False ):
+    mypacket = uipacket.uartBaudratePacket()
+    mypacket.set_members(baudrate, isConfirm)
+    return mypacket
+
+def test_pack_returns_independent_bytes():
+    first = _baudratePacket(1000000).out_buffer()
+    second = _baudratePacket(460800).out_buffer()
+    assert isinstance(first, bytes)
+    assert first != second
+    assert first == _baudratePacket(1000000).out_bytes()
+
+def test_pack_round_trip():
+    mypacket = _baudratePacket(921600, True)
+    packetBytes = mypacket.out_buffer()
+    schema = uipacket.kCommandPacketSchemaDict[uipacket.kCommandTag_ConfirmBaudrate]
+    assert len(packetBytes) == schema.size
+    assert packetBytes[:5] == uipacket.s_packetTagBytes + bytes([uipacket.kCommandTag_ConfirmBaudrate])
+    fieldsDict, isCrcValid = schema.unpack_from(packetBytes)
+    assert isCrcValid
+    assert fieldsDict['baudrate'] == 921600
+    assert mypacket.crcCheckSum == uipacket.calculate_crc16(packetBytes[5:5 + schema.bodySchema.size])
+    corrupted = bytearray(packetBytes)
+    corrupted[5] ^= 0x01
+    assert not schema.unpack_from(corrupted)[1]
+
+def test_header_only_packet():
+    mypacket = uipacket.testStopPacket()
+    mypacket.set_members()
+    assert mypacket.out_bytes() == uipacket.s_packetTagBytes + bytes([uipacket.kCommandTag_TestStop])
+
+# Settings with every byte of the multi-byte fields different, so byte order and offsets show
+kSettingsDict = {uidef.kAdvancedSettings_Tool:       {'cpuSpeedMHz':0x03E4, 'enableL1Cache':1, 'enablePrefetch':1,
+                                                      'prefetchBufSizeInByte':4096},
+                 uidef.kAdvancedSettings_Conn:       {'instance':0x01, 'dataL4b':0x02, 'dataH4b':0x03, 'dataT8b':0xFF, 'ssb':0x05,
+                                                      'sclk':0x06, 'sclkn':0xFF, 'dqs0':0x08, 'dqs1':0x09, 'rstb':0x0A},
+                 uidef.kAdvancedSettings_PadCtrl:    {'dataL4b_u32':0x10F1, 'dataH4b_u32':0x20F2, 'dataT8b_u32':0x30F3,
+                                                      'ssb_u32':0x40F4, 'sclk_u32':0x50F5, 'sclkn_u32':0x60F6,
+                                                      'dqs0_u32':0x70F7, 'dqs1_u32':0x80F8, 'rstb_u32':0x12345678},
+                 uidef.kAdvancedSettings_Pintest:    {'wavePulse':0x01020304, 'waveSample':1,
+                                                      'dataL4b_dis':0, 'dataH4b_dis':1, 'dataT8b_dis':1, 'ssb_dis':0, 'sclk_dis':0,
+                                                      'sclkn_dis':1, 'dqs0_dis':0, 'dqs1_dis':1, 'rstb_dis':0},
+                 uidef.kAdvancedSettings_RwTest:     {'testSet':0x91, 'testMemStart':0x20500010, 'testMemSize':0x00012345,
+                                                      'fillPatternWord':0x5AA5FF00},
+                 uidef.kAdvancedSettings_PerfTest:   {'testSet':0xC0, 'subTestSet':0xC2, 'enableAverageShow':1, 'iterations':0x0102,
+                                                      'testMemStart':0x30000000, 'testMemSize':0x00400000, 'testBlockSize':0x1000},
+                 uidef.kAdvancedSettings_StressTest: {'testSet':0xE1, 'enableStopWhenFail':1, 'iterations':0x0A0B0C0D,
+                                                      'testMemStart':0x80000000, 'testMemSize':0x00100000, 'testPageSize':0x800},
+                }
+kMemUserSettingDict = {'memType':1, 'memSpeed':0x0085}
+
+def _applySettings( uivarModule ):
+    for group, cfgDict in kSettingsDict.items():
+        uivarModule.setAdvancedSettings(group, dict(cfgDict))
+
+def _loadMemModel():
+    modelDescFile = os.path.join(kSrcRoot, 'targets', 'mem_model', 'Winbond', uidef.kMemType_QuadSPI, 'W25QxxxJV.py')
+    memModel = uimodel.createModel(modelDescFile)
+    return uimodel.generateMemLut(uidef.kMemType_QuadSPI, memModel.mixspiLutDict), memModel.memPropertyDict
+
+# Bytes of the hand-built encodings before the packets moved to struct schemas, for kSettingsDict
+kPinnedPackets = {'configSystemPacket':['46544147f2e403010100100000010203ff0506ff08090a0000f1100000f2200000f3300000f4400000f5500000f66000',
+                                        '00f7700000f880000078563412010085000000000002000100eb04180af01e0432042600000000000020041808000000',
+                                        '000000000000000000310401200000000000000000000000000000000000000000000000000000000005040124000000',
+                                        '000000000000000000000000000000000000000000000000000000000000000000000000000000000006040000000000',
+                                        '000000000000000000350401240000000000000000000000000000000000000000000000000000000002041808042000',
+                                        '000000000000000000150401240000000000000000000000009f04042400000000000000000000000000000000000000',
+                                        '00000000000000000000000000000000000000000000000000000000000000000000000000000000003d640000'],
+                  'pinTestPacket':['46544147f1010203ff0506ff08090a000004030201010000005901000007dc0000'],
+                  'rwTestPacket':['46544147f491000000100050204523010000ffa55a926e0000'],
+                  'perfTestPacket':['46544147f5c0c2010002010000000000300000400000100000e1eb0000'],
+                  'stressTestPacket':['46544147f6e10100000d0c0b0a000000800000100000080000db840000'],
+                  'testStopPacket':['46544147f0'],
+                  'memRegsPacket':['46544147f3'],
+                 }
+
+@pytest.fixture
+def settings(monkeypatch):
+    for name in ['g_toolCommDict', 'g_mixspiConnCfgDict', 'g_mixspiPadCtrlDict', 'g_mixspiPintestCfgDict',
+                 'g_mixspiRwTestCfgDict', 'g_mixspiPerfTestCfgDict', 'g_mixspiStressTestCfgDict']:
+        monkeypatch.setattr(uivar, name, None)
+    _applySettings(uivar)
+
+@pytest.mark.parametrize('packetName', sorted(kPinnedPackets))
+def test_packet_bytes_match_old_encoding(settings, packetName):
+    if packetName == 'configSystemPacket':
+        memLut, memPropertyDict = _loadMemModel()
+        mypacket = uipacket.configSystemPacket(memLut, memPropertyDict)
+        mypacket.set_members(kMemUserSettingDict)
+    else:
+        mypacket = getattr(uipacket, packetName)()
+        mypacket.set_members()
+    assert mypacket.out_bytes() == binascii.unhexlify(''.join(kPinnedPackets[packetName]))
@@ -0,0 +1,89 @@
+#! /usr/bin/env python
+# -*- coding: utf-8 -*-
+
+# Copyright 2022 NXP
+# All rights reserved.
+# 
+# SPDX-License-Identifier: BSD-3-Clause
+
+import pytest
+
+from ui import uiuart
+
+kSamples1 = bytes(range(1, 21))
+kSamples2 = bytes(range(101, 121))
+
+# Text with multi-byte characters, two HEX8B sections each holding one whole sample block and
+# a partial one that is dropped at the mode switch
+kStream = (u'Mem test started ✓\r\n'.encode('utf-8') +
+           uiuart.kUartPrintMagic_Hex8bMode + kSamples1 + b'\x01\x02\x03' +
+           uiuart.kUartPrintMagic_AsciiMode + u'温度 ok\r\n'.encode('utf-8') +
+           uiuart.kUartPrintMagic_Hex8bMode + kSamples2 +
+           uiuart.kUartPrintMagic_AsciiMode + b'done\r\n')
+
+kExpectedEvents = [(uiuart.kUartPrintEvent_Text, u'Mem test started ✓\r\n'),
+                   (uiuart.kUartPrintEvent_Hex8bMode, None),
+                   (uiuart.kUartPrintEvent_PinSamples, kSamples1),
+                   (uiuart.kUartPrintEvent_AsciiMode, None),
+                   (uiuart.kUartPrintEvent_Text, u'温度 ok\r\n'),
+                   (uiuart.kUartPrintEvent_Hex8bMode, None),
+                   (uiuart.kUartPrintEvent_PinSamples, kSamples2),
+                   (uiuart.kUartPrintEvent_AsciiMode, None),
+                   (uiuart.kUartPrintEvent_Text, u'done\r\n'),
+                  ]
+
+def _feedChunks( parser, chunks ):
+    # Adjacent text events are merged, how text is cut into events depends on the reads
+    events = []
+    for chunk in chunks:
+        for event, value in parser.feed(chunk):
+            if event == uiuart.kUartPrintEvent_Text and events and events[-1][0] == event:
+                events[-1] = (event, events[-1][1] + value)
+            else:
+                events.append((event, value))
+    return events
+
+def test_whole_stream():
+    assert _feedChunks(uiuart.uartPrintParser(), [kStream]) == kExpectedEvents
+
+@pytest.mark.parametrize('splitIdx', range(1, len(kStream)))
+def test_stream_split_in_two(splitIdx):
+    parser = uiuart.uartPrintParser()
+    assert _feedChunks(parser, [kStream[0:splitIdx], kStream[splitIdx:]]) == kExpectedEvents
+
+def test_stream_byte_by_byte():
+    parser = uiuart.uartPrintParser()
+    assert _feedChunks(parser, [kStream[idx:idx + 1] for idx in range(len(kStream))]) == kExpectedEvents
+
+@pytest.mark.parametrize('chunkSize', [3, 7, 13])
+def test_stream_through_small_ring(chunkSize):
+    # The ring is smaller than the stream, so markers and blocks straddle its wrap point
+    parser = uiuart.uartPrintParser(ringSize=48)
+    chunks = [kStream[idx:idx + chunkSize] for idx in range(0, len(kStream), chunkSize)]
+    assert _feedChunks(parser, chunks * 3) == _feedChunks(uiuart.uartPrintParser(), [kStream * 3])
+    assert _feedChunks(uiuart.uartPrintParser(ringSize=48), chunks) == kExpectedEvents
+
+def test_only_latest_sample_block_is_kept():
+    parser = uiuart.uartPrintParser()
+    events = parser.feed(uiuart.kUartPrintMagic_Hex8bMode + kSamples1 + kSamples2)
+    assert events == [(uiuart.kUartPrintEvent_Hex8bMode, None), (uiuart.kUartPrintEvent_PinSamples, kSamples2)]
+
+def test_ring_buffer_wraps():
+    ring = uiuart.uartRingBuffer(16)
+    assert ring.write(b'0123456789') == 10
+    ring.consume(8)
+    # Physically split at the end of the buffer
+    assert ring.write(b'abcdefghijklmnop') == 14
+    assert len(ring) == 16
+    assert ring.freeSpace() == 0
+    assert b''.join(ring.segments(0, 16)) == b'89abcdefghijklmn'
+    assert len(ring.segments(0, 16)) == 2
+    assert ring.find(b'9abc') == 1
+    assert ring.find(b'fgh') == 7
+    assert ring.find(b'xyz') == -1
+    assert ring[15] == ord('n')
+    assert ring.matchPrefixAtEnd(b'mnop') == 2
+    ring.consume(16)
+    assert len(ring) == 0
+    assert ring.write(b'xy') == 2
+    assert b''.join(ring.segments(0, 2)) == b'xy'